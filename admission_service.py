@@ -0,0 +1,204 @@
+"""
+Controle de admissão das rotas /api: limita quantas requisições de cada classe rodam ao
+mesmo tempo, para que a concorrência acompanhe a capacidade do pool MySQL.
+
+Cada classe tem `limite` (em execução), `fila` (máximo aguardando, em ordem de chegada)
+e `espera_segundos` (prazo na fila). Fila cheia ou prazo vencido -> 503 imediato com
+Retry-After, em vez de a requisição ficar presa em ConnectionPool.get_connection.
+
+Os limites padrão somam o tamanho do pool (`db_pool_max`, padrão 10): 20% pesada, 40%
+busca e o restante leve, no mínimo 1 cada. A vaga só é devolvida quando a resposta termina
+de ser enviada (inclusive o corpo de StreamingResponse, como /api/os/export).
+
+Classes e padrões podem ser sobrescritos em config.json:
+  "admissao_classes": {"pesada": {"limite": 2, "fila": 10, "espera_segundos": 10}, ...}
+  "admissao_rotas": [["pesada", "^/api/reports/"], ...]   (primeiro padrão que casar)
+"""
+import asyncio
+import logging
+import math
+import re
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from config_manager import config_manager
+
+logger = logging.getLogger(__name__)
+
+
+def default_classes(pool_max: int) -> Dict[str, dict]:
+    """Limites por classe somando `pool_max` conexões (a soma passa do pool só se pool_max < 3)."""
+    pool_max = max(1, int(pool_max))
+    pesada = max(1, round(pool_max * 0.2))
+    busca = max(1, round(pool_max * 0.4))
+    leve = max(1, pool_max - pesada - busca)
+    return {
+        # Relatórios/PDF, prévias, envio de e-mail e downloads
+        "pesada": {"limite": pesada, "fila": 10, "espera_segundos": 10.0},
+        # Leituras quentes das telas (busca, painel, filas)
+        "busca": {"limite": busca, "fila": 50, "espera_segundos": 3.0},
+        # Demais chamadas da API
+        "leve": {"limite": leve, "fila": 100, "espera_segundos": 2.0},
+    }
+
+
+DEFAULT_CLASSES = default_classes(config_manager.get("db_pool_max", 10))
+
+DEFAULT_ROUTES = [
+    (None, r"^/api/admin/"),  # diagnóstico precisa responder mesmo saturado
+    ("pesada", r"^/api/(client/report|reports)/"),
+    ("pesada", r"^/api/(analise/)?preview$"),
+    ("pesada", r"^/api/analise/finalize/"),
+    ("pesada", r"^/api/pt-html/"),
+    ("pesada", r"^/api/email/send"),
+    ("pesada", r"/download$"),
+    ("pesada", r"^/api/os/export$"),
+    ("busca", r"^/api/os/(search|panel)"),
+    ("busca", r"^/api/pcp/queue$"),
+    ("busca", r"^/api/gravacao/"),
+    ("leve", r"^/api/"),
+]
+
+
+class AdmissionGate:
+    """Semáforo com fila FIFO limitada e prazo de espera."""
+
+    def __init__(self, name: str, limite: int, fila: int, espera_segundos: float):
+        self.name = name
+        self.limite = limite
+        self.fila = fila
+        self.espera_segundos = espera_segundos
+        self.active = 0
+        self._waiters: deque = deque()
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.max_active = 0
+
+    async def acquire(self) -> bool:
+        if self.active < self.limite and not self._waiters:
+            self._admit()
+            return True
+        if len(self._waiters) >= self.fila:
+            self.rejected_full += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.espera_segundos)
+            return True
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Vaga concedida no mesmo instante do prazo
+                return True
+            future.cancel()
+            self.rejected_timeout += 1
+            return False
+        except asyncio.CancelledError:
+            # Cliente desistiu: se a vaga já tinha sido transferida, devolve
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(future)
+            except ValueError:
+                pass
+
+    def _admit(self):
+        self.active += 1
+        self.admitted += 1
+        self.max_active = max(self.max_active, self.active)
+
+    def release(self):
+        # Transfere a vaga direto para o próximo da fila (ordem de chegada)
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(True)
+                self.admitted += 1
+                return
+        self.active -= 1
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.espera_segundos))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "limite": self.limite,
+            "fila_max": self.fila,
+            "espera_segundos": self.espera_segundos,
+            "ativas": self.active,
+            "aguardando": len(self._waiters),
+            "pico_ativas": self.max_active,
+            "admitidas": self.admitted,
+            "rejeitadas_fila_cheia": self.rejected_full,
+            "rejeitadas_prazo": self.rejected_timeout,
+        }
+
+
+class AdmissionController:
+    def __init__(self, classes: Dict[str, dict], routes: List[Tuple[Optional[str], str]]):
+        self.gates = {
+            name: AdmissionGate(name, int(cfg["limite"]), int(cfg["fila"]), float(cfg["espera_segundos"]))
+            for name, cfg in classes.items()
+        }
+        self.routes = [(name, re.compile(pattern)) for name, pattern in routes]
+
+    def classify(self, path: str) -> Optional[AdmissionGate]:
+        for name, pattern in self.routes:
+            if pattern.search(path):
+                return self.gates.get(name) if name else None
+        return None
+
+    def stats(self) -> Dict[str, object]:
+        return {name: gate.stats() for name, gate in self.gates.items()}
+
+
+def _load_controller() -> AdmissionController:
+    classes = {name: dict(cfg) for name, cfg in DEFAULT_CLASSES.items()}
+    for name, cfg in (config_manager.get("admissao_classes", {}) or {}).items():
+        classes.setdefault(name, dict(DEFAULT_CLASSES["leve"])).update(cfg)
+    routes = config_manager.get("admissao_rotas", None) or DEFAULT_ROUTES
+    return AdmissionController(classes, [tuple(r) for r in routes])
+
+
+admission_controller = _load_controller()
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware ASGI puro: a vaga fica presa até o app terminar de enviar a resposta. Com
+    BaseHTTPMiddleware ela seria devolvida antes do corpo de um StreamingResponse.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        gate = admission_controller.classify(scope["path"])
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await gate.acquire():
+            logger.warning("Admissão recusada (%s): %s %s", gate.name, scope["method"], scope["path"])
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Servidor ocupado, tente novamente em instantes.", "classe": gate.name},
+                headers={"Retry-After": str(gate.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
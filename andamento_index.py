@@ -0,0 +1,88 @@
+"""
+Modelo em memória dos andamentos lidos pela sincronização MySQL ↔ Access.
+
+Cada leitura de fonte vira um `AndamentoIndex`: dicionário por CodStatus, montado uma
+única vez. A comparação entre as fontes
+(`diff_sources`) e as buscas de inserção/exclusão passam a ser O(1) por código, em vez de
+percorrer a lista inteira a cada código novo.
+
+Sem dependências de banco: usado por sync_andamentos_v2.py e pelo benchmark
+benchmarks/bench_sync_diff.py.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+OsKey = Tuple[int, int]
+
+
+def os_key(andamento: Dict) -> OsKey:
+    return andamento['NroProtocoloLink'], andamento['AnoProtocoloLink']
+
+
+class AndamentoIndex:
+    """Andamentos de uma fonte, por CodStatus."""
+
+    def __init__(self, origem: str = "", rows: Iterable[Dict] = ()):
+        self.origem = origem
+        self.by_code: Dict[str, Dict] = {}
+        for row in rows:
+            self.add(row)
+
+    def add(self, andamento: Dict):
+        self.by_code[andamento['CodStatus']] = andamento
+
+    def remove(self, code: str) -> Optional[Dict]:
+        return self.by_code.pop(code, None)
+
+    def get(self, code: str) -> Optional[Dict]:
+        return self.by_code.get(code)
+
+    def codes(self) -> Set[str]:
+        return set(self.by_code)
+
+    def __contains__(self, code) -> bool:
+        return code in self.by_code
+
+    def __len__(self) -> int:
+        return len(self.by_code)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.by_code.values())
+
+
+@dataclass
+class SyncPlan:
+    """Inserções pendentes em cada sentido, em ordem de OS e CodStatus."""
+    # (andamento, origem) presentes em algum MDB e ausentes do MySQL
+    para_mysql: List[Tuple[Dict, str]] = field(default_factory=list)
+    # andamentos presentes no MySQL e ausentes dos dois MDBs
+    para_mdb: List[Dict] = field(default_factory=list)
+
+
+def find_mdb(code: str, *mdbs: AndamentoIndex) -> Tuple[Optional[Dict], Optional[AndamentoIndex]]:
+    """Andamento e índice do primeiro MDB que contém `code` (OS_Atual tem precedência)."""
+    for mdb in mdbs:
+        andamento = mdb.get(code)
+        if andamento is not None:
+            return andamento, mdb
+    return None, None
+
+
+def _by_os_order(item: Dict) -> Tuple[int, int, str]:
+    return item['AnoProtocoloLink'], item['NroProtocoloLink'], item['CodStatus']
+
+
+def diff_sources(mysql: AndamentoIndex, mdb_os: AndamentoIndex, mdb_pap: AndamentoIndex) -> SyncPlan:
+    """Códigos novos de cada lado; os andamentos de uma mesma OS ficam contíguos."""
+    plan = SyncPlan()
+    for mdb in (mdb_os, mdb_pap):
+        for code, andamento in mdb.by_code.items():
+            if code in mysql or (mdb is mdb_pap and code in mdb_os):
+                continue
+            plan.para_mysql.append((andamento, mdb.origem))
+    for code, andamento in mysql.by_code.items():
+        if code not in mdb_os and code not in mdb_pap:
+            plan.para_mdb.append(andamento)
+    plan.para_mysql.sort(key=lambda item: _by_os_order(item[0]))
+    plan.para_mdb.sort(key=_by_os_order)
+    return plan
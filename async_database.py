@@ -0,0 +1,240 @@
+"""
+Fachada assíncrona do banco para rotas `async def` (mesma semântica de database.Database).
+
+- `await adb.execute_query(query, params)` -> lista de dicts (fetchall de DictCursor);
+- `await adb.execute_transaction(operations)` -> operações são tuplas (query, params) ou
+  funções `async def op(cursor)`; commit no fim, rollback em erro;
+- `await adb.cached_query(name, query, params, tables=...)` -> usa o mesmo cache de
+  `db.query_cache` (escritas feitas por aqui também invalidam as tabelas).
+
+Usa aiomysql (dependência opcional: `pip install aiomysql`), que aceita os mesmos
+placeholders do PyMySQL (%s / %(nome)s). Sem aiomysql, executa o `database.db` síncrono
+no threadpool, preservando a interface.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from typing import Any, Callable, List, Optional
+
+from config_manager import config_manager
+from database import record_query, written_tables
+
+try:
+    import aiomysql
+except ImportError:  # dependência opcional
+    aiomysql = None
+
+logger = logging.getLogger(__name__)
+
+
+def _run_in_thread(fn, *args):
+    """run_in_executor levando o contexto (contabilidade de consultas da requisição)."""
+    ctx = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(None, functools.partial(ctx.run, fn, *args))
+
+
+class _ThreadedCursor:
+    """Cursor PyMySQL com métodos assíncronos (cada chamada roda no threadpool)."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    async def _run(self, fn, *args):
+        return await _run_in_thread(fn, *args)
+
+    async def execute(self, query, params=None):
+        return await self._run(self._cursor.execute, query, params)
+
+    async def executemany(self, query, params):
+        return await self._run(self._cursor.executemany, query, params)
+
+    async def fetchone(self):
+        return await self._run(self._cursor.fetchone)
+
+    async def fetchall(self):
+        return await self._run(self._cursor.fetchall)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+
+class _AsyncTrackedCursor:
+    """Cursor assíncrono que anota as tabelas escritas em `written`."""
+
+    def __init__(self, cursor, written: set):
+        self._cursor = cursor
+        self._written = written
+
+    async def execute(self, query, params=None):
+        start = time.perf_counter()
+        try:
+            result = await self._cursor.execute(query, params)
+        finally:
+            record_query(query, params, (time.perf_counter() - start) * 1000.0)
+        self._written.update(written_tables(query))
+        return result
+
+    async def executemany(self, query, params):
+        start = time.perf_counter()
+        try:
+            result = await self._cursor.executemany(query, params)
+        finally:
+            record_query(query, params, (time.perf_counter() - start) * 1000.0)
+        self._written.update(written_tables(query))
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _invalidate(tables):
+    if tables:
+        from database import db
+        db.query_cache.invalidate(tables)
+
+
+class AsyncDatabase:
+    def __init__(self):
+        self.host = config_manager.get("db_host", "10.120.1.125")
+        self.port = int(config_manager.get("db_port", 3306))
+        self.user = config_manager.get("db_user", "root")
+        self.password = config_manager.get("db_password", "")
+        self.db = config_manager.get("db_name", "sagrafulldb")
+        self.minsize = int(config_manager.get("db_async_pool_min", 1))
+        self.maxsize = int(config_manager.get("db_async_pool_max", 20))
+        self._pool = None
+        self._pool_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def backend(self) -> str:
+        return "aiomysql" if aiomysql is not None else "threadpool"
+
+    async def _get_pool(self):
+        if self._pool is not None:
+            return self._pool
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await aiomysql.create_pool(
+                    host=self.host,
+                    port=self.port,
+                    user=self.user,
+                    password=self.password,
+                    db=self.db,
+                    minsize=self.minsize,
+                    maxsize=self.maxsize,
+                    autocommit=True,
+                    charset='utf8mb4',
+                    cursorclass=aiomysql.DictCursor,
+                )
+                logger.info("Pool aiomysql criado (min=%s, max=%s)", self.minsize, self.maxsize)
+        return self._pool
+
+    async def execute_query(self, query, params=None):
+        if aiomysql is None:
+            from database import db
+            return await _run_in_thread(db.execute_query, query, params)
+
+        pool = await self._get_pool()
+        written: set = set()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                cursor = _AsyncTrackedCursor(cursor, written)
+                await cursor.execute(query, params)
+                rows = await cursor.fetchall()
+        _invalidate(written)
+        return rows
+
+    async def cached_query(self, name, query, params=None, tables=(), ttl=None):
+        """Mesma semântica de `db.cached_query` (cache compartilhado com o acesso síncrono)."""
+        from database import db
+        cache = db.query_cache
+        tables = tuple(t.lower() for t in tables)
+        hit, rows = cache.get(name, query, params, tables)
+        if hit:
+            return rows
+        versions = cache.versions(tables)
+        rows = await self.execute_query(query, params)
+        cache.put(name, query, params, versions, rows, ttl)
+        return rows
+
+    async def _run_operations(self, cursor, operations: List[Any], written: set) -> List[Any]:
+        cursor = _AsyncTrackedCursor(cursor, written)
+        results = []
+        for op in operations:
+            if callable(op):
+                res = op(cursor)
+                if asyncio.iscoroutine(res):
+                    res = await res
+                results.append(res)
+            else:
+                query, params = op
+                await cursor.execute(query, params)
+                results.append(await cursor.fetchall())
+        return results
+
+    async def execute_transaction(self, operations: List[Any]):
+        if aiomysql is None:
+            return await self._execute_transaction_threaded(operations)
+
+        pool = await self._get_pool()
+        written: set = set()
+        async with pool.acquire() as conn:
+            await conn.begin()
+            try:
+                async with conn.cursor() as cursor:
+                    results = await self._run_operations(cursor, operations, written)
+                start = time.perf_counter()
+                await conn.commit()
+                record_query("COMMIT", None, (time.perf_counter() - start) * 1000.0)
+                _invalidate(written)
+                return results
+            except Exception as e:
+                await conn.rollback()
+                logger.error(f"Transaction failed: {e}")
+                raise e
+
+    async def _execute_transaction_threaded(self, operations: List[Any]):
+        from database import db
+
+        def _call(fn: Callable, *args):
+            return _run_in_thread(fn, *args)
+
+        conn = await _call(db.pool.get_connection)
+        written: set = set()
+        try:
+            await _call(conn.begin)
+            try:
+                cursor = conn.cursor()
+                try:
+                    results = await self._run_operations(_ThreadedCursor(cursor), operations, written)
+                finally:
+                    cursor.close()
+                start = time.perf_counter()
+                await _call(conn.commit)
+                record_query("COMMIT", None, (time.perf_counter() - start) * 1000.0)
+                _invalidate(written)
+                return results
+            except Exception as e:
+                await _call(conn.rollback)
+                logger.error(f"Transaction failed: {e}")
+                raise e
+        finally:
+            db.pool.return_connection(conn)
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+
+adb = AsyncDatabase()
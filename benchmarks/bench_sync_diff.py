@@ -0,0 +1,171 @@
+"""
+Benchmark da comparação MySQL ↔ MDB da sincronização de andamentos (sem banco).
+
+Gera andamentos sintéticos para as três fontes (MySQL, OS_Atual, Papelaria) com uma fração
+de códigos novos em cada lado e mede, para cada volume, o ciclo em memória de
+sync_andamentos_v2: montar os índices (`AndamentoIndex`), calcular o plano
+(`diff_sources`) e localizar os andamentos a excluir. O custo por andamento deve ficar
+estável até 100k; a versão antiga (varredura da lista a cada código novo) é medida até
+`--legado-max` para comparação.
+
+    python benchmarks/bench_sync_diff.py
+    python benchmarks/bench_sync_diff.py --tamanhos 10000,50000,100000 --divergencia 0.02 --saida resultados/sync.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from andamento_index import AndamentoIndex, diff_sources, find_mdb, os_key  # noqa: E402
+
+SETORES = ["SEFOC", "SEIMP", "SEACA", "SEDIG", "SECAP", "EXPEDICAO"]
+
+
+def gerar_fontes(total, divergencia, rng):
+    """Andamentos em cadeia por OS; `divergencia` de cada lado só existe naquele lado."""
+    base = datetime(2025, 1, 1)
+    andamentos = []
+    nro, ano = 1, 2025
+    while len(andamentos) < total:
+        # OSs de papelaria (>= 5000) em ~20% dos casos
+        os_nro = nro if rng.random() > 0.2 else 5000 + nro
+        for seq in range(1, rng.randint(2, 12) + 1):
+            andamentos.append({
+                'CodStatus': f"{os_nro:05d}{ano}-{seq:02d}",
+                'NroProtocoloLink': os_nro,
+                'AnoProtocoloLink': ano,
+                'SituacaoLink': "Em Execução",
+                'SetorLink': rng.choice(SETORES),
+                'Data': base + timedelta(minutes=len(andamentos)),
+                'UltimoStatus': False,
+                'Observaçao': None,
+                'Ponto': None,
+            })
+        nro += 1
+        if nro >= 5000:
+            nro, ano = 1, ano - 1
+    andamentos = andamentos[:total]
+
+    mysql, mdb_os, mdb_pap = [], [], []
+    for a in andamentos:
+        mdb = mdb_os if a['NroProtocoloLink'] < 5000 else mdb_pap
+        sorteio = rng.random()
+        if sorteio < divergencia:
+            mdb.append(a)          # novo no MDB
+        elif sorteio < 2 * divergencia:
+            mysql.append(a)        # novo no MySQL
+        else:
+            mysql.append(a)
+            mdb.append(a)
+    excluidos = [a['CodStatus'] for a in rng.sample(andamentos, max(1, int(total * divergencia / 4)))]
+    return mysql, mdb_os, mdb_pap, excluidos
+
+
+def ciclo_indexado(mysql_data, mdb_os_data, mdb_pap_data, excluidos):
+    mysql = AndamentoIndex('MySQL', mysql_data)
+    mdb_os = AndamentoIndex('OS_Atual', mdb_os_data)
+    mdb_pap = AndamentoIndex('Papelaria', mdb_pap_data)
+    plan = diff_sources(mysql, mdb_os, mdb_pap)
+    # OSs com UltimoStatus/projeção a acertar, agrupadas como em _apply_plan
+    oss = {os_key(a) for a, _ in plan.para_mysql} | {os_key(a) for a in plan.para_mdb}
+    encontrados = sum(1 for code in excluidos if mysql.get(code) or find_mdb(code, mdb_os, mdb_pap)[0])
+    return len(plan.para_mysql), len(plan.para_mdb), len(oss), encontrados
+
+
+def ciclo_legado(mysql_data, mdb_os_data, mdb_pap_data, excluidos):
+    """Reprodução da busca anterior: conjuntos de códigos + varredura da lista por código."""
+    mysql_codes = {a['CodStatus'] for a in mysql_data}
+    mdb_os_codes = {a['CodStatus'] for a in mdb_os_data}
+    mdb_pap_codes = {a['CodStatus'] for a in mdb_pap_data}
+    mdb_all_codes = mdb_os_codes | mdb_pap_codes
+    para_mysql = para_mdb = encontrados = 0
+    for code in mdb_all_codes - mysql_codes:
+        and_ = next((a for a in mdb_os_data if a['CodStatus'] == code), None)
+        if not and_:
+            and_ = next((a for a in mdb_pap_data if a['CodStatus'] == code), None)
+        para_mysql += and_ is not None
+    for code in mysql_codes - mdb_all_codes:
+        para_mdb += next((a for a in mysql_data if a['CodStatus'] == code), None) is not None
+    for code in excluidos:
+        achou = next((a for a in mysql_data if a['CodStatus'] == code), None)
+        if not achou:
+            achou = next((a for a in mdb_os_data + mdb_pap_data if a['CodStatus'] == code), None)
+        encontrados += achou is not None
+    return para_mysql, para_mdb, None, encontrados
+
+
+def medir(funcao, fontes, repeticoes):
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*fontes)
+        tempos.append((time.perf_counter() - inicio) * 1000.0)
+    tempos.sort()
+    return tempos[len(tempos) // 2], resultado
+
+
+def executar(args):
+    rng = random.Random(args.seed)
+    linhas = []
+    for total in args.tamanhos:
+        fontes = gerar_fontes(total, args.divergencia, rng)
+        ms, (para_mysql, para_mdb, oss, encontrados) = medir(ciclo_indexado, fontes, args.repeticoes)
+        linha = {
+            "andamentos": total,
+            "novos_mdb": para_mysql,
+            "novos_mysql": para_mdb,
+            "oss_afetadas": oss,
+            "excluidos_encontrados": encontrados,
+            "indexado_ms": round(ms, 2),
+            "indexado_us_por_andamento": round(ms * 1000.0 / total, 3),
+            "legado_ms": None,
+        }
+        if total <= args.legado_max:
+            ms_legado, resultado = medir(ciclo_legado, fontes, 1)
+            assert (resultado[0], resultado[1], resultado[3]) == (para_mysql, para_mdb, encontrados)
+            linha["legado_ms"] = round(ms_legado, 2)
+        linhas.append(linha)
+        print(
+            f"{total:>8} andamentos: indexado {linha['indexado_ms']:>9.2f} ms "
+            f"({linha['indexado_us_por_andamento']:.3f} us/andamento)"
+            + (f", legado {linha['legado_ms']:>10.2f} ms" if linha["legado_ms"] is not None else ""),
+            file=sys.stderr,
+        )
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {"divergencia": args.divergencia, "repeticoes": args.repeticoes, "seed": args.seed},
+        "resultados": linhas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da comparação em memória da sincronização de andamentos")
+    parser.add_argument("--tamanhos", default="1000,10000,25000,50000,100000",
+                        help="Volumes de andamentos na janela monitorada, separados por vírgula")
+    parser.add_argument("--divergencia", type=float, default=0.01, help="Fração de códigos novos em cada lado")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Repetições por volume (mediana)")
+    parser.add_argument("--legado-max", type=int, default=25000,
+                        help="Maior volume em que a versão antiga (quadrática) também é medida")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--saida", help="Arquivo JSON de resultado (padrão: stdout)")
+    args = parser.parse_args()
+    args.tamanhos = [int(t) for t in args.tamanhos.split(",") if t.strip()]
+
+    texto = json.dumps(executar(args), ensure_ascii=False, indent=2)
+    if args.saida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+        print(f"Resultado gravado em {args.saida}", file=sys.stderr)
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
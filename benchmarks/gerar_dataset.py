@@ -0,0 +1,434 @@
+"""
+Gera uma base SAGRA sintética (MySQL/MariaDB local) para os benchmarks.
+
+Cria as tabelas lidas pelas rotas quentes com as colunas usadas pela API e preenche com
+volumes realistas:
+- tabProtocolos / tabDetalhesServico / tabMidiaDigital: `--anos` anos x `--os-por-ano` OSs;
+- tabAndamento: cadeia de 2 a 12 andamentos por OS, apenas o último com UltimoStatus = 1
+  (CodStatus no formato NNNNNAAAA-SS, como em add_os_history);
+- tab_pcp_fila: filas ordenadas por setor para parte das OSs abertas;
+- tabAnalises / tabAnaliseItens / tabProblemasPadrao;
+- ct_gravacao_jobs / ct_gravacao_chapas / ct_gravacao_eventos;
+- listas auxiliares (categorias, papéis, cores, setores) e a projeção tab_os_status_atual.
+
+A geração é determinística (`--seed`). Por segurança o banco precisa ser informado e não
+pode ser o de produção:
+
+    python benchmarks/gerar_dataset.py --database sagra_bench --recriar
+    python benchmarks/gerar_dataset.py --database sagra_bench --anos 5 --os-por-ano 8000
+
+Depois, aponte o servidor para a base (db_name no config.json) e rode run_benchmark.py.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pymysql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from os_status_service import ensure_os_status_table  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+PRODUCAO = "sagrafulldb"
+LOTE = 2000
+
+SETORES = ["SEFOC", "SEIMP", "SEACA", "SEDIG", "SECAP", "EXPEDICAO"]
+SITUACOES_ABERTAS = (
+    ["Recebido", "Em Execução", "Aguardando acabamento", "Gravação", "Gravação Parcial"]
+    + [f"Saída p/ {s}" for s in SETORES]
+    + [f"Tramit. de Prova p/ {s}" for s in ("SEFOC", "SEDIG")]
+)
+SITUACOES_FINAIS = ["Entregue", "Cancelada"]
+PRAZOS = ["Prometido p/", "Solicitado p/", "Normal", "Urgente"]
+PRODUTOS = ["Cartão de Visita", "Folder", "Cartaz", "Livro", "Revista", "Convite", "Banner", "Envelope",
+            "Papel Timbrado", "Relatório", "Cartilha", "Bloco de Notas", "Pasta", "Marcador de Página"]
+MAQUINAS = ["Speedmaster", "Indigo", "Xerox 1000", "Roland 700", "Plotter HP"]
+PAPEIS = ["Couché 115g", "Couché 150g", "Offset 75g", "Offset 90g", "Supremo 250g", "Reciclado 90g"]
+CORES = ["4x0", "4x4", "1x0", "1x1", "2x0"]
+CATEGORIAS = ["Deputado", "Comissão", "Liderança", "Órgão Administrativo", "Gabinete"]
+ORGAOS = ["CD", "SECOM", "DG", "DEAPA", "CEDI", "DETEC", "CONLE", "SGM", "PRES"]
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Eduarda", "Fábio", "Gabriela", "Heitor", "Íris", "João",
+         "Larissa", "Márcio", "Natália", "Otávio", "Paula", "Renato", "Sílvia", "Tiago", "Vânia", "Wagner"]
+SOBRENOMES = ["Silva", "Souza", "Oliveira", "Pereira", "Costa", "Rodrigues", "Almeida", "Nascimento",
+              "Lima", "Araújo", "Fernandes", "Gonçalves", "Ribeiro", "Martins", "Conceição"]
+TEMAS = ["Orçamento", "Saúde", "Educação", "Segurança Pública", "Meio Ambiente", "Cultura", "Transporte",
+         "Agricultura", "Direitos Humanos", "Ciência e Tecnologia", "Esporte", "Turismo", "Previdência"]
+
+SCHEMA = [
+    """
+    CREATE TABLE tabProtocolos (
+        NroProtocolo INT NOT NULL, AnoProtocolo INT NOT NULL,
+        CodigoRequisic VARCHAR(50), CategoriaLink VARCHAR(100), NomeUsuario VARCHAR(150), Titular VARCHAR(150),
+        SiglaOrgao VARCHAR(50), GabSalaUsuario VARCHAR(50), Andar VARCHAR(20), Localizacao VARCHAR(100),
+        RamalUsuario VARCHAR(30), OrgInteressado VARCHAR(150), CodUsuarioLink VARCHAR(30),
+        DataEntrada DATE, ProcessoSolicit VARCHAR(50), CSnro VARCHAR(30), CotaRepro INT, CotaCartao INT,
+        EntregPrazoLink VARCHAR(100), EntregData DATE, EntregPeriodo VARCHAR(30), EntregaFormaLink VARCHAR(50),
+        ResponsavelGrafLink VARCHAR(100), ContatoTrab VARCHAR(150),
+        PRIMARY KEY (NroProtocolo, AnoProtocolo)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE tabDetalhesServico (
+        ID INT AUTO_INCREMENT PRIMARY KEY,
+        NroProtocoloLinkDet INT NOT NULL, AnoProtocoloLinkDet INT NOT NULL,
+        TiragemSolicitada INT, Tiragem INT, CotaTotal INT, Titulo TEXT, TipoPublicacaoLink VARCHAR(100),
+        MaquinaLink VARCHAR(100), Pags INT, FrenteVerso VARCHAR(10), ModelosArq VARCHAR(255),
+        PapelLink VARCHAR(100), PapelDescricao VARCHAR(255), Cores VARCHAR(20), CoresDescricao VARCHAR(255),
+        FormatoLink VARCHAR(50), DescAcabamento TEXT, Observ TEXT, MaterialFornecido VARCHAR(255),
+        Fotolito VARCHAR(10), ModeloDobra VARCHAR(50), ProvaImpressa VARCHAR(10), InsumosFornecidos VARCHAR(255),
+        ElemGrafBrasao TINYINT, ElemGrafTimbre TINYINT, ElemGrafArteGab TINYINT, ElemGrafAssinatura TINYINT,
+        KEY idx_det_os (NroProtocoloLinkDet, AnoProtocoloLinkDet)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE tabMidiaDigital (
+        ID INT AUTO_INCREMENT PRIMARY KEY,
+        NroProtocoloLinkMidia INT NOT NULL, AnoProtocoloLinkMidia INT NOT NULL,
+        MidiaDigitalLink VARCHAR(100), MidiaDigitDescricao VARCHAR(255),
+        KEY idx_midia_os (NroProtocoloLinkMidia, AnoProtocoloLinkMidia)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE tabAndamento (
+        CodStatus VARCHAR(20) NOT NULL PRIMARY KEY,
+        NroProtocoloLink INT NOT NULL, AnoProtocoloLink INT NOT NULL,
+        SituacaoLink VARCHAR(120), SetorLink VARCHAR(120), `Data` DATETIME, UltimoStatus TINYINT,
+        `Observaçao` TEXT, Ponto VARCHAR(20),
+        KEY idx_andamento_os (NroProtocoloLink, AnoProtocoloLink),
+        KEY idx_andamento_ultimo (UltimoStatus)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE tabProblemasPadrao (
+        ID INT AUTO_INCREMENT PRIMARY KEY, TituloPT VARCHAR(255), ProbTecHTML TEXT, Categoria VARCHAR(100)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE tabAnalises (
+        ID INT AUTO_INCREMENT PRIMARY KEY, OS INT NOT NULL, Ano INT NOT NULL, Versao VARCHAR(50),
+        Componente VARCHAR(100), Usuario VARCHAR(100), DataCriacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY unique_os_analise (OS, Ano)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE tabAnaliseItens (
+        ID INT AUTO_INCREMENT PRIMARY KEY, ID_Analise INT NOT NULL, ID_ProblemaPadrao INT, Obs TEXT,
+        HTML_Snapshot LONGTEXT, Componente VARCHAR(255),
+        FOREIGN KEY (ID_Analise) REFERENCES tabAnalises(ID) ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    "CREATE TABLE tabcategorias (Categoria VARCHAR(100)) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4",
+    "CREATE TABLE tabPapel (Papel VARCHAR(100)) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4",
+    "CREATE TABLE tabCores (Cor VARCHAR(50)) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4",
+    "CREATE TABLE tabSetor (Setor VARCHAR(100)) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4",
+    """
+    CREATE TABLE tab_pcp_fila (
+        id INT AUTO_INCREMENT PRIMARY KEY, setor VARCHAR(64) NOT NULL, nro_os INT NOT NULL, ano INT NOT NULL,
+        ordem INT NOT NULL, ultima_atualizacao DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        UNIQUE KEY uniq_setor_os (setor, nro_os, ano), INDEX idx_setor_ordem (setor, ordem)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE ct_gravacao_jobs (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY, os_ano INT NULL, os_numero INT NOT NULL,
+        nome_original VARCHAR(255) NOT NULL, solicitante VARCHAR(120), produto VARCHAR(180),
+        template VARCHAR(180), status_gravacao VARCHAR(50), prioridade INT, created_at DATETIME,
+        printed_at DATETIME NULL, media_name VARCHAR(100), media_width INT, media_height INT,
+        machine_serial VARCHAR(50), origem ENUM('JOBS','PRINTED') NOT NULL, hash_estado CHAR(64) NOT NULL,
+        last_sync TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        UNIQUE KEY uk_os (os_ano, os_numero)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE ct_gravacao_chapas (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY, job_id BIGINT NOT NULL, caderno VARCHAR(20), cor CHAR(1),
+        status_chapa VARCHAR(30), printed_at DATETIME NULL, hotplate_id VARCHAR(50), hash_estado CHAR(64) NOT NULL,
+        last_sync TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        UNIQUE KEY uk_chapa (job_id, caderno, cor),
+        FOREIGN KEY (job_id) REFERENCES ct_gravacao_jobs(id) ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE ct_gravacao_eventos (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY, job_id BIGINT NOT NULL, chapa_identificador VARCHAR(255),
+        event_time DATETIME, event_type VARCHAR(50), event_text TEXT, hash_evento CHAR(64),
+        UNIQUE KEY uk_evento (job_id, event_time, hash_evento),
+        FOREIGN KEY (job_id) REFERENCES ct_gravacao_jobs(id) ON DELETE CASCADE
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+]
+
+# Ordem de DROP (filhas antes das tabelas referenciadas)
+TABELAS = [
+    "ct_gravacao_eventos", "ct_gravacao_chapas", "ct_gravacao_jobs", "tab_pcp_fila", "tabAnaliseItens",
+    "tabAnalises", "tabProblemasPadrao", "tabAndamento", "tabMidiaDigital", "tabDetalhesServico",
+    "tabProtocolos", "tabcategorias", "tabPapel", "tabCores", "tabSetor", "tab_os_status_atual",
+]
+
+
+def _nome(rng):
+    return f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+
+def _hash(*partes):
+    return hashlib.sha256("|".join(str(p) for p in partes).encode("utf-8")).hexdigest()
+
+
+class Gerador:
+    def __init__(self, conn, rng, anos, os_por_ano, ano_final):
+        self.conn = conn
+        self.rng = rng
+        self.anos = list(range(ano_final - anos + 1, ano_final + 1))
+        self.os_por_ano = os_por_ano
+        self.agora = datetime.now().replace(microsecond=0)
+        self.abertas = []  # (nro, ano, setor, situacao)
+
+    def _inserir(self, tabela, colunas, linhas):
+        if not linhas:
+            return
+        cols = ", ".join(f"`{c}`" for c in colunas)
+        marcadores = ", ".join(["%s"] * len(colunas))
+        sql = f"INSERT INTO {tabela} ({cols}) VALUES ({marcadores})"
+        with self.conn.cursor() as cur:
+            for i in range(0, len(linhas), LOTE):
+                cur.executemany(sql, linhas[i:i + LOTE])
+        self.conn.commit()
+
+    def recriar_schema(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SET FOREIGN_KEY_CHECKS = 0")
+            for tabela in TABELAS:
+                cur.execute(f"DROP TABLE IF EXISTS {tabela}")
+            cur.execute("SET FOREIGN_KEY_CHECKS = 1")
+            for ddl in SCHEMA:
+                cur.execute(ddl)
+        self.conn.commit()
+        logger.info("Schema recriado (%d tabelas)", len(SCHEMA))
+
+    def auxiliares(self):
+        self._inserir("tabcategorias", ["Categoria"], [(c,) for c in CATEGORIAS])
+        self._inserir("tabPapel", ["Papel"], [(p,) for p in PAPEIS])
+        self._inserir("tabCores", ["Cor"], [(c,) for c in CORES])
+        self._inserir("tabSetor", ["Setor"], [(s,) for s in SETORES])
+        problemas = []
+        for i in range(60):
+            categoria = self.rng.choice(["Arquivo", "Imagem", "Texto", "Formato", "Cores", "Fontes"])
+            titulo = f"{categoria}: problema técnico {i + 1:02d}"
+            problemas.append((titulo, f"<p>{titulo} - descrição padrão para o cliente.</p>", categoria))
+        self._inserir("tabProblemasPadrao", ["TituloPT", "ProbTecHTML", "Categoria"], problemas)
+
+    def ordens_de_servico(self):
+        rng = self.rng
+        protocolos, detalhes, midias, andamentos = [], [], [], []
+        for ano in self.anos:
+            inicio_ano = datetime(ano, 1, 2, 8, 0)
+            fim_ano = min(datetime(ano, 12, 20, 18, 0), self.agora)
+            span = max(1, int((fim_ano - inicio_ano).total_seconds()))
+            for nro in range(1, self.os_por_ano + 1):
+                entrada = inicio_ano + timedelta(seconds=span * (nro - 1) // self.os_por_ano)
+                produto = rng.choice(PRODUTOS)
+                solicitante = _nome(rng)
+                titulo = f"{produto} - {rng.choice(TEMAS)} {rng.choice(['2ª edição', 'campanha', 'seminário', 'audiência', ''])}".strip()
+                tiragem = rng.choice([50, 100, 200, 500, 1000, 2000, 5000, 10000])
+                prazo = rng.choices(PRAZOS, weights=[15, 25, 55, 5])[0]
+                entrega = (entrada + timedelta(days=rng.randint(3, 45))).date()
+                protocolos.append((
+                    nro, ano, f"REQ-{ano}-{nro:05d}", rng.choice(CATEGORIAS), solicitante, _nome(rng),
+                    rng.choice(ORGAOS), f"Gab {rng.randint(100, 999)}", str(rng.randint(1, 10)), "Anexo IV",
+                    str(rng.randint(60000, 69999)), rng.choice(ORGAOS), str(rng.randint(100000, 999999)),
+                    entrada.date(), f"{rng.randint(10000, 99999)}/{ano}", str(rng.randint(1, 999)),
+                    rng.randint(0, 5000), rng.randint(0, 500),
+                    prazo if prazo in ("Normal", "Urgente") else f"{prazo} {entrega:%d/%m}",
+                    entrega, rng.choice(["Manhã", "Tarde"]), rng.choice(["Retirada", "Entrega"]),
+                    rng.choice(NOMES), f"{solicitante.split()[0].lower()}@camara.leg.br",
+                ))
+                detalhes.append((
+                    nro, ano, tiragem, tiragem, tiragem, titulo, produto, rng.choice(MAQUINAS),
+                    rng.choice([1, 2, 4, 8, 16, 32, 64, 120]), rng.choice(["F", "FV"]), "modelo.pdf",
+                    rng.choice(PAPEIS), "", rng.choice(CORES), "", rng.choice(["A4", "A5", "A3", "9x5"]),
+                    rng.choice(["Refile", "Dobra", "Grampo", "Laminação", "Wire-o"]), "", "Arquivo digital",
+                    "N", "", rng.choice(["S", "N"]), "", rng.randint(0, 1), rng.randint(0, 1),
+                    rng.randint(0, 1), rng.randint(0, 1),
+                ))
+                if rng.random() < 0.3:
+                    midias.append((nro, ano, rng.choice(["PDF", "CD", "Pendrive"]), "Arquivo enviado por e-mail"))
+                andamentos.extend(self._andamentos(nro, ano, entrada))
+        logger.info("Inserindo %d OSs e %d andamentos", len(protocolos), len(andamentos))
+        self._inserir("tabProtocolos", [
+            "NroProtocolo", "AnoProtocolo", "CodigoRequisic", "CategoriaLink", "NomeUsuario", "Titular",
+            "SiglaOrgao", "GabSalaUsuario", "Andar", "Localizacao", "RamalUsuario", "OrgInteressado",
+            "CodUsuarioLink", "DataEntrada", "ProcessoSolicit", "CSnro", "CotaRepro", "CotaCartao",
+            "EntregPrazoLink", "EntregData", "EntregPeriodo", "EntregaFormaLink", "ResponsavelGrafLink",
+            "ContatoTrab",
+        ], protocolos)
+        self._inserir("tabDetalhesServico", [
+            "NroProtocoloLinkDet", "AnoProtocoloLinkDet", "TiragemSolicitada", "Tiragem", "CotaTotal", "Titulo",
+            "TipoPublicacaoLink", "MaquinaLink", "Pags", "FrenteVerso", "ModelosArq", "PapelLink",
+            "PapelDescricao", "Cores", "CoresDescricao", "FormatoLink", "DescAcabamento", "Observ",
+            "MaterialFornecido", "Fotolito", "ModeloDobra", "ProvaImpressa", "InsumosFornecidos",
+            "ElemGrafBrasao", "ElemGrafTimbre", "ElemGrafArteGab", "ElemGrafAssinatura",
+        ], detalhes)
+        self._inserir("tabMidiaDigital", [
+            "NroProtocoloLinkMidia", "AnoProtocoloLinkMidia", "MidiaDigitalLink", "MidiaDigitDescricao",
+        ], midias)
+        self._inserir("tabAndamento", [
+            "CodStatus", "NroProtocoloLink", "AnoProtocoloLink", "SituacaoLink", "SetorLink", "Data",
+            "UltimoStatus", "Observaçao", "Ponto",
+        ], andamentos)
+
+    def _andamentos(self, nro, ano, entrada):
+        rng = self.rng
+        idade_dias = (self.agora - entrada).days
+        # OSs antigas quase sempre finalizadas; as recentes ficam abertas nas filas
+        finalizada = rng.random() < (0.98 if idade_dias > 60 else 0.35)
+        total = rng.randint(2, 12)
+        linhas = []
+        data = entrada
+        setor = rng.choice(SETORES)
+        situacao = "Recebido"
+        for seq in range(1, total + 1):
+            ultimo = seq == total
+            if seq > 1:
+                data = min(data + timedelta(hours=rng.randint(1, 96)), self.agora)
+                setor = rng.choice(SETORES)
+                if ultimo and finalizada:
+                    situacao = rng.choices(SITUACOES_FINAIS, weights=[95, 5])[0]
+                else:
+                    situacao = rng.choice(SITUACOES_ABERTAS)
+            linhas.append((
+                f"{nro:05d}{ano}-{seq:02d}", nro, ano, situacao, setor, data, 1 if ultimo else 0,
+                f"[{data:%H:%M}] {situacao} ({setor})", f"{rng.randint(1, 9)}.{rng.randint(100, 999)}",
+            ))
+        if situacao not in SITUACOES_FINAIS:
+            self.abertas.append((nro, ano, setor, situacao))
+        return linhas
+
+    def filas_pcp(self):
+        por_setor = {}
+        for nro, ano, setor, _ in self.abertas:
+            if self.rng.random() < 0.6:
+                por_setor.setdefault(setor, []).append((nro, ano))
+        linhas = []
+        for setor, itens in por_setor.items():
+            self.rng.shuffle(itens)
+            linhas.extend((setor, nro, ano, ordem) for ordem, (nro, ano) in enumerate(itens, 1))
+        self._inserir("tab_pcp_fila", ["setor", "nro_os", "ano", "ordem"], linhas)
+        logger.info("Filas PCP: %d itens em %d setores", len(linhas), len(por_setor))
+
+    def analises(self, fracao=0.25):
+        rng = self.rng
+        candidatos = [(nro, ano) for ano in self.anos for nro in range(1, self.os_por_ano + 1)]
+        escolhidos = rng.sample(candidatos, int(len(candidatos) * fracao))
+        self._inserir("tabAnalises", ["OS", "Ano", "Versao", "Componente", "Usuario"], [
+            (nro, ano, str(rng.randint(1, 3)), rng.choice(["Capa", "Miolo", "Único"]), rng.choice(NOMES))
+            for nro, ano in escolhidos
+        ])
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT ID FROM tabAnalises")
+            ids = [row[0] for row in cur.fetchall()]
+        itens = []
+        for id_analise in ids:
+            for _ in range(rng.randint(1, 5)):
+                problema = rng.randint(1, 60)
+                itens.append((id_analise, problema, "", f"<div>Problema {problema}</div>", "Miolo"))
+        self._inserir("tabAnaliseItens", ["ID_Analise", "ID_ProblemaPadrao", "Obs", "HTML_Snapshot", "Componente"], itens)
+        logger.info("Análises: %d (%d itens)", len(ids), len(itens))
+
+    def gravacao(self, jobs=400):
+        rng = self.rng
+        abertas = rng.sample(self.abertas, min(jobs, len(self.abertas)))
+        linhas = []
+        for nro, ano, _, situacao in abertas:
+            impresso = situacao != "Gravação" and rng.random() < 0.5
+            criado = self.agora - timedelta(minutes=rng.randint(5, 60 * 24 * 7))
+            linhas.append((
+                ano, nro, f"{ano}_{nro:05d}_{rng.choice(PRODUTOS).replace(' ', '_')}", _nome(rng),
+                rng.choice(PRODUTOS), rng.choice(["Offset_4C", "Offset_1C", "Digital"]),
+                "Printed" if impresso else rng.choice(["Ready", "Printing", "Held"]), rng.randint(1, 5), criado,
+                criado + timedelta(minutes=rng.randint(5, 120)) if impresso else None, "Chapa 745x605", 745, 605,
+                "CTP-01", "PRINTED" if impresso else "JOBS", _hash(nro, ano, impresso),
+            ))
+        self._inserir("ct_gravacao_jobs", [
+            "os_ano", "os_numero", "nome_original", "solicitante", "produto", "template", "status_gravacao",
+            "prioridade", "created_at", "printed_at", "media_name", "media_width", "media_height",
+            "machine_serial", "origem", "hash_estado",
+        ], linhas)
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT id, status_gravacao, created_at FROM ct_gravacao_jobs")
+            jobs_db = cur.fetchall()
+        chapas, eventos = [], []
+        for job_id, status, criado in jobs_db:
+            for caderno in range(1, rng.randint(1, 4) + 1):
+                for cor in rng.choice(["CMYK", "K", "CK"]):
+                    chapas.append((job_id, str(caderno), cor, status, None, f"HP{rng.randint(1, 99):02d}",
+                                   _hash(job_id, caderno, cor)))
+            for n in range(rng.randint(1, 6)):
+                quando = criado + timedelta(minutes=n * 3)
+                eventos.append((job_id, f"{caderno}-{cor}", quando, rng.choice(["Imaged", "Queued", "Error"]),
+                                "Evento sintético", _hash(job_id, n)))
+        self._inserir("ct_gravacao_chapas", [
+            "job_id", "caderno", "cor", "status_chapa", "printed_at", "hotplate_id", "hash_estado",
+        ], chapas)
+        self._inserir("ct_gravacao_eventos", [
+            "job_id", "chapa_identificador", "event_time", "event_type", "event_text", "hash_evento",
+        ], eventos)
+        logger.info("Gravação: %d jobs, %d chapas, %d eventos", len(jobs_db), len(chapas), len(eventos))
+
+    def projecao(self):
+        with self.conn.cursor(pymysql.cursors.DictCursor) as cur:
+            # Tabela recém-recriada (vazia): ensure_os_status_table já faz a carga completa
+            ensure_os_status_table(cur)
+        self.conn.commit()
+        logger.info("Projeção tab_os_status_atual carregada")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera base SAGRA sintética para benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", required=True, help="Base de destino (criada se não existir)")
+    parser.add_argument("--anos", type=int, default=3)
+    parser.add_argument("--os-por-ano", type=int, default=5000)
+    parser.add_argument("--ano-final", type=int, default=datetime.now().year)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--recriar", action="store_true", help="Apaga e recria as tabelas da base de destino")
+    args = parser.parse_args()
+
+    if args.database.lower() == PRODUCAO:
+        parser.error(f"'{PRODUCAO}' é a base de produção; use outro nome (ex.: sagra_bench)")
+
+    conn = pymysql.connect(host=args.host, port=args.port, user=args.user, password=args.password,
+                           charset="utf8mb4", autocommit=False)
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}` CHARACTER SET utf8mb4")
+        cur.execute(f"USE `{args.database}`")
+        cur.execute("SHOW TABLES LIKE 'tabProtocolos'")
+        existe = cur.fetchone() is not None
+    if existe and not args.recriar:
+        parser.error(f"A base '{args.database}' já tem dados; use --recriar para apagar e gerar de novo")
+
+    inicio = time.perf_counter()
+    gerador = Gerador(conn, random.Random(args.seed), args.anos, args.os_por_ano, args.ano_final)
+    gerador.recriar_schema()
+    gerador.auxiliares()
+    gerador.ordens_de_servico()
+    gerador.filas_pcp()
+    gerador.analises()
+    gerador.gravacao()
+    gerador.projecao()
+    conn.close()
+    logger.info("Base '%s' gerada em %.1fs", args.database, time.perf_counter() - inicio)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Benchmark de carga das rotas quentes da API, reproduzindo a mistura de uso real das telas.
+
+Cenários (peso padrão):
+- search   (40): GET /os/search com filtros variados (número, título, produto, situação, setor)
+- panel    (15): GET /os/panel por setor
+- pcp      (15): GET /pcp/queue por setor
+- details  (15): GET /os/{ano}/{id}/details
+- history  (10): GET /os/{ano}/{id}/history
+- gravacao  (5): GET /gravacao/status
+
+Cada worker (thread) sorteia um cenário pelo peso e repete até o fim da duração (ou até
+atingir --requisicoes). O resultado sai em JSON (p50/p95/p99, média, máximo, erros e
+vazão por cenário e no total), para comparar execuções:
+
+    python benchmarks/run_benchmark.py --base-url http://localhost:8001/api --concurrencia 16 \
+        --duracao 60 --saida resultados/antes.json
+    python benchmarks/run_benchmark.py ... --saida resultados/depois.json --comparar resultados/antes.json
+
+Só usa a biblioteca padrão. Use contra a base sintética de gerar_dataset.py, nunca contra
+produção.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+DEFAULT_MIX = "search=40,panel=15,pcp=15,details=15,history=10,gravacao=5"
+SETORES = ["SEFOC", "SEIMP", "SEACA", "SEDIG", "SECAP", "EXPEDICAO", "Gravação"]
+SITUACOES = ["Recebido", "Em Execução", "Saída p/ SEIMP", "Tramit. de Prova p/ SEFOC"]
+TERMOS = ["Folder", "Cartaz", "Livro", "Convite", "Saúde", "Educação", "Orçamento", "Cultura", "seminário"]
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return None
+    k = (len(valores_ordenados) - 1) * p / 100.0
+    i = int(k)
+    j = min(i + 1, len(valores_ordenados) - 1)
+    return valores_ordenados[i] + (valores_ordenados[j] - valores_ordenados[i]) * (k - i)
+
+
+def parse_mix(texto):
+    mix = {}
+    for parte in texto.split(","):
+        nome, _, peso = parte.partition("=")
+        nome = nome.strip()
+        if nome not in CENARIOS:
+            raise ValueError(f"Cenário desconhecido: {nome} (disponíveis: {', '.join(CENARIOS)})")
+        if float(peso or 0) > 0:
+            mix[nome] = float(peso)
+    if not mix:
+        raise ValueError("Mistura vazia")
+    return mix
+
+
+class Cliente:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def get(self, caminho, params=None):
+        url = f"{self.base_url}{caminho}"
+        if params:
+            url += "?" + urllib.parse.urlencode(params, doseq=True)
+        req = urllib.request.Request(url, headers={"Accept": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            corpo = resp.read()
+            return resp.status, corpo
+
+
+# Cada cenário recebe (rng, chaves de OS) e devolve (caminho, params)
+def _search(rng, chaves):
+    filtro = rng.random()
+    params = {"limit": 16, "page": rng.choice([1, 1, 1, 2, 3])}
+    if filtro < 0.25 and chaves:
+        nro, ano = rng.choice(chaves)
+        params.update(nr_os=nro, ano=ano)
+    elif filtro < 0.55:
+        params["q"] = rng.choice(TERMOS)
+    elif filtro < 0.70:
+        params["produto"] = rng.choice(TERMOS[:4])
+    elif filtro < 0.85:
+        params["situacao"] = rng.sample(SITUACOES, 2)
+    else:
+        params["setor"] = rng.choice(SETORES[:6])
+    if rng.random() < 0.2:
+        params["include_finished"] = "true"
+    return "/os/search", params
+
+
+def _panel(rng, chaves):
+    return "/os/panel", {"setor": rng.choice(SETORES[:6])}
+
+
+def _pcp(rng, chaves):
+    return "/pcp/queue", {"setor": rng.choice(SETORES)}
+
+
+def _details(rng, chaves):
+    nro, ano = rng.choice(chaves)
+    return f"/os/{ano}/{nro}/details", None
+
+
+def _history(rng, chaves):
+    nro, ano = rng.choice(chaves)
+    return f"/os/{ano}/{nro}/history", None
+
+
+def _gravacao(rng, chaves):
+    return "/gravacao/status", None
+
+
+CENARIOS = {
+    "search": _search,
+    "panel": _panel,
+    "pcp": _pcp,
+    "details": _details,
+    "history": _history,
+    "gravacao": _gravacao,
+}
+
+
+def carregar_chaves(cliente, quantidade):
+    """OSs reais da base para os cenários de detalhes/histórico (abertas e finalizadas)."""
+    chaves = set()
+    for include_finished in ("false", "true"):
+        status, corpo = cliente.get("/os/search", {"limit": quantidade, "include_finished": include_finished})
+        for row in json.loads(corpo).get("data", []):
+            chaves.add((int(row["nr_os"]), int(row["ano"])))
+    return sorted(chaves)
+
+
+class Coletor:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias = {}
+        self.erros = {}
+        self.status = {}
+
+    def registrar(self, cenario, ms, status, erro):
+        with self.lock:
+            if erro:
+                self.erros[cenario] = self.erros.get(cenario, 0) + 1
+            else:
+                self.latencias.setdefault(cenario, []).append(ms)
+            chave = f"{cenario}:{status}"
+            self.status[chave] = self.status.get(chave, 0) + 1
+
+
+def _resumo(latencias, erros, duracao):
+    ordenadas = sorted(latencias)
+    total = len(ordenadas) + erros
+    return {
+        "requisicoes": total,
+        "erros": erros,
+        "taxa_erro": round(erros / total, 4) if total else 0.0,
+        "vazao_rps": round(total / duracao, 2) if duracao else 0.0,
+        "media_ms": round(sum(ordenadas) / len(ordenadas), 2) if ordenadas else None,
+        "p50_ms": _arred(percentil(ordenadas, 50)),
+        "p95_ms": _arred(percentil(ordenadas, 95)),
+        "p99_ms": _arred(percentil(ordenadas, 99)),
+        "max_ms": _arred(ordenadas[-1] if ordenadas else None),
+    }
+
+
+def _arred(valor):
+    return round(valor, 2) if valor is not None else None
+
+
+def _git_commit():
+    try:
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=raiz,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def executar(args):
+    mix = parse_mix(args.mix)
+    cliente = Cliente(args.base_url, args.timeout)
+    chaves = carregar_chaves(cliente, args.chaves)
+    if not chaves and ({"details", "history"} & set(mix)):
+        raise SystemExit("Nenhuma OS encontrada em /os/search; gere a base com gerar_dataset.py")
+
+    nomes = list(mix)
+    pesos = [mix[n] for n in nomes]
+    coletor = Coletor()
+    parar = threading.Event()
+    medindo = threading.Event()
+    restantes = [args.requisicoes] if args.requisicoes else None
+    contador_lock = threading.Lock()
+
+    def worker(indice):
+        rng = random.Random(args.seed * 1000 + indice)
+        while not parar.is_set():
+            # Só conta requisições iniciadas depois do aquecimento
+            medida = medindo.is_set()
+            if restantes is not None and medida:
+                with contador_lock:
+                    if restantes[0] <= 0:
+                        return
+                    restantes[0] -= 1
+            cenario = rng.choices(nomes, weights=pesos)[0]
+            caminho, params = CENARIOS[cenario](rng, chaves)
+            inicio = time.perf_counter()
+            status, erro = 0, False
+            try:
+                status, _ = cliente.get(caminho, params)
+                erro = status >= 400
+            except urllib.error.HTTPError as exc:
+                status, erro = exc.code, True
+            except Exception:
+                status, erro = "excecao", True
+            ms = (time.perf_counter() - inicio) * 1000.0
+            if medida:
+                coletor.registrar(cenario, ms, status, erro)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrencia)]
+    for t in threads:
+        t.start()
+    if args.aquecimento > 0:
+        print(f"Aquecimento por {args.aquecimento}s...", file=sys.stderr)
+        time.sleep(args.aquecimento)
+    medindo.set()
+    inicio = time.perf_counter()
+    limite = inicio + args.duracao if not args.requisicoes else None
+    while any(t.is_alive() for t in threads):
+        if limite is not None and time.perf_counter() >= limite:
+            break
+        time.sleep(0.1)
+    parar.set()
+    duracao = time.perf_counter() - inicio
+    for t in threads:
+        t.join(timeout=args.timeout)
+
+    todas = [ms for lista in coletor.latencias.values() for ms in lista]
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "config": {
+            "base_url": args.base_url,
+            "concurrencia": args.concurrencia,
+            "duracao_s": round(duracao, 2),
+            "aquecimento_s": args.aquecimento,
+            "requisicoes": args.requisicoes,
+            "mix": mix,
+            "seed": args.seed,
+            "chaves_os": len(chaves),
+        },
+        "total": _resumo(todas, sum(coletor.erros.values()), duracao),
+        "cenarios": {
+            nome: _resumo(coletor.latencias.get(nome, []), coletor.erros.get(nome, 0), duracao)
+            for nome in nomes
+        },
+        "status": coletor.status,
+    }
+
+
+def comparar(atual, base):
+    """Imprime a variação de p50/p95/p99 e vazão em relação a uma execução anterior."""
+    linhas = [f"{'cenário':<10} {'métrica':<10} {'base':>10} {'atual':>10} {'variação':>10}"]
+    grupos = [("total", atual["total"], base.get("total", {}))]
+    grupos += [(nome, dados, base.get("cenarios", {}).get(nome, {})) for nome, dados in atual["cenarios"].items()]
+    for nome, dados, anterior in grupos:
+        for metrica in ("p50_ms", "p95_ms", "p99_ms", "vazao_rps"):
+            a, b = dados.get(metrica), anterior.get(metrica)
+            if a is None or not b:
+                continue
+            linhas.append(f"{nome:<10} {metrica:<10} {b:>10.2f} {a:>10.2f} {(a - b) / b * 100:>+9.1f}%")
+    print("\n".join(linhas), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das rotas quentes da API SAGRA")
+    parser.add_argument("--base-url", default="http://localhost:8001/api")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--duracao", type=float, default=30.0, help="Segundos de medição")
+    parser.add_argument("--requisicoes", type=int, default=0, help="Total de requisições (substitui --duracao)")
+    parser.add_argument("--aquecimento", type=float, default=5.0, help="Segundos de aquecimento não medidos")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Pesos dos cenários (padrão: {DEFAULT_MIX})")
+    parser.add_argument("--chaves", type=int, default=500, help="OSs carregadas para detalhes/histórico")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--saida", help="Arquivo JSON de resultado (padrão: stdout)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    try:
+        resultado = executar(args)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+        print(f"Resultado gravado em {args.saida}", file=sys.stderr)
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            comparar(resultado, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Feed de mudanças para os dashboards (um único poller no servidor).
+
+Em vez de cada tela consultar o MySQL em intervalo fixo, um watcher acompanha:
+- tab_os_status_atual.atualizado_em (a projeção do andamento atual é atualizada por todos
+  os caminhos de escrita da API e pelos scripts de sincronização);
+- tab_pcp_fila.ultima_atualizacao por setor.
+
+Quando algo muda, envia deltas compactos pelo WebSocket (routers.realtime.manager):
+- {"type": "os_delta", "changes": [{nr_os, ano, situacao, setor, situacao_anterior, setor_anterior, ...}]}
+  completo no tópico "os" (e para conexões sem assinatura), e recortado por
+  "setor:<SETOR>" (setor novo ou anterior) e "os:<NRO>/<ANO>"; mudanças de prioridade, data
+  de entrega, título ou produto também geram delta, e OSs que saem da projeção chegam com
+  "removida": true e setor None (detectadas comparando as chaves a cada recarga);
+- {"type": "pcp_delta", "setor": ..., "ordem": [{nr_os, ano, ordem}, ...]} em "pcp" e "setor:<SETOR>".
+"""
+import asyncio
+import logging
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from routers.realtime import manager, setor_topics
+
+from config_manager import config_manager
+from database import db
+from os_status_service import TABLE_NAME, ensure_os_status_table
+from pcp_queue_service import ensure_pcp_table
+
+logger = logging.getLogger(__name__)
+
+OsKey = Tuple[int, int]
+
+# Campos da projeção que as telas mostram: mudança em qualquer um gera delta
+_STATE_FIELDS = ("situacao", "setor", "prioridade", "data_entrega", "titulo", "produto")
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class ChangeFeedWatcher:
+    def __init__(self, intervalo: float = 2.0, max_deltas: int = 500, janela: int = 30,
+                 recarga: float = 60.0):
+        self.intervalo = intervalo
+        # Reler os últimos `janela` segundos cobre transações que gravaram atualizado_em
+        # antes da marca atual mas só fizeram commit depois da última leitura
+        self.janela = janela
+        # Acima disso o ciclo vira um único "system_update" (ex.: rebuild da projeção)
+        self.max_deltas = max_deltas
+        self._task: Optional[asyncio.Task] = None
+        self._os_high_water = None
+        # Último estado conhecido de cada OS (valores de _STATE_FIELDS)
+        self._os_state: Dict[OsKey, tuple] = {}
+        # A cada `recarga` segundos compara as chaves da projeção com o estado para achar
+        # OSs removidas (sem andamento atual), que não aparecem por atualizado_em
+        self.recarga = recarga
+        self._last_reload = 0.0
+        # setor -> (MAX(ultima_atualizacao), COUNT(*)) da fila PCP
+        self._pcp_marks: Dict[str, object] = {}
+        self._ready = False
+
+    # ------------------------------------------------------------------
+    # Consultas (executadas em thread para não bloquear o event loop)
+    # ------------------------------------------------------------------
+    def _load_initial(self):
+        ensure_os_status_table()
+        ensure_pcp_table()
+        rows = db.execute_query(f"SELECT nro_os, ano, {', '.join(_STATE_FIELDS)}, atualizado_em FROM {TABLE_NAME}")
+        self._os_state = {(int(r['nro_os']), int(r['ano'])): self._state_of(r) for r in rows}
+        self._last_reload = time.monotonic()
+        self._os_high_water = max((r['atualizado_em'] for r in rows if r.get('atualizado_em')), default=None)
+        self._pcp_marks = self._read_pcp_marks()
+        self._ready = True
+        logger.info("Feed de mudanças iniciado: %d OSs, %d filas PCP", len(self._os_state), len(self._pcp_marks))
+
+    def _read_pcp_marks(self) -> Dict[str, object]:
+        rows = db.execute_query(
+            "SELECT setor, MAX(ultima_atualizacao) AS marca, COUNT(*) AS total FROM tab_pcp_fila GROUP BY setor"
+        )
+        return {r['setor']: (r['marca'], r['total']) for r in rows}
+
+    @staticmethod
+    def _state_of(row: dict) -> tuple:
+        return tuple(row.get(campo) for campo in _STATE_FIELDS)
+
+    def _poll_removed(self) -> List[dict]:
+        """OSs que saíram da projeção desde a última recarga de chaves."""
+        rows = db.execute_query(f"SELECT nro_os, ano FROM {TABLE_NAME}")
+        self._last_reload = time.monotonic()
+        presentes = {(int(r['nro_os']), int(r['ano'])) for r in rows}
+        changes = []
+        for key in [k for k in self._os_state if k not in presentes]:
+            anterior = dict(zip(_STATE_FIELDS, self._os_state.pop(key)))
+            changes.append({
+                "nr_os": key[0],
+                "ano": key[1],
+                "removida": True,
+                "situacao": None,
+                "setor": None,
+                "situacao_anterior": anterior['situacao'],
+                "setor_anterior": anterior['setor'],
+            })
+        return changes
+
+    def _poll_os(self) -> List[dict]:
+        query = f"""
+            SELECT nro_os, ano, {', '.join(_STATE_FIELDS)}, data_andamento, atualizado_em
+            FROM {TABLE_NAME}
+        """
+        params = None
+        if self._os_high_water is not None:
+            # Repetições dentro da janela são filtradas pelo estado conhecido
+            query += " WHERE atualizado_em >= DATE_SUB(%s, INTERVAL %s SECOND)"
+            params = (self._os_high_water, self.janela)
+        rows = db.execute_query(query, params)
+
+        changes = []
+        for r in rows:
+            key = (int(r['nro_os']), int(r['ano']))
+            atual = self._state_of(r)
+            anterior = self._os_state.get(key)
+            if r.get('atualizado_em') and (self._os_high_water is None or r['atualizado_em'] > self._os_high_water):
+                self._os_high_water = r['atualizado_em']
+            if anterior == atual:
+                continue
+            self._os_state[key] = atual
+            changes.append({
+                "nr_os": key[0],
+                "ano": key[1],
+                "situacao": r['situacao'],
+                "setor": r['setor'],
+                "situacao_anterior": anterior[0] if anterior else None,
+                "setor_anterior": anterior[1] if anterior else None,
+                "prioridade": r.get('prioridade'),
+                "data_entrega": _json_value(r.get('data_entrega')),
+                "titulo": r.get('titulo'),
+                "produto": r.get('produto'),
+                "last_update": _json_value(r.get('data_andamento')),
+            })
+        if time.monotonic() - self._last_reload >= self.recarga:
+            changes.extend(self._poll_removed())
+        return changes
+
+    @staticmethod
+    def _os_messages(changes: List[dict]) -> List[tuple]:
+        """(mensagem, tópicos, incluir conexões sem assinatura) para um lote de mudanças de OS."""
+        messages = [({"type": "os_delta", "changes": changes}, ["os"], True)]
+
+        por_setor: Dict[str, List[dict]] = {}
+        for change in changes:
+            for setor in {change['setor'], change['setor_anterior']}:
+                if setor:
+                    por_setor.setdefault(setor, []).append(change)
+        for setor, itens in por_setor.items():
+            messages.append(({"type": "os_delta", "setor": setor, "changes": itens}, setor_topics(setor), False))
+
+        for change in changes:
+            topic = f"os:{change['nr_os']}/{change['ano']}"
+            messages.append(({"type": "os_delta", "changes": [change]}, [topic], False))
+        return messages
+
+    def _poll_pcp(self) -> List[tuple]:
+        marcas = self._read_pcp_marks()
+        alterados = [s for s, m in marcas.items() if self._pcp_marks.get(s) != m]
+        # Setor cuja fila foi esvaziada some do GROUP BY
+        alterados += [s for s in self._pcp_marks if s not in marcas]
+        self._pcp_marks = marcas
+        if alterados:
+            db.query_cache.invalidate(["tab_pcp_fila"])
+
+        deltas = []
+        for setor in alterados:
+            rows = db.execute_query(
+                "SELECT nro_os, ano, ordem FROM tab_pcp_fila WHERE setor = %s ORDER BY ordem ASC",
+                (setor,),
+            )
+            deltas.append(({
+                "type": "pcp_delta",
+                "setor": setor,
+                "ordem": [{"nr_os": r['nro_os'], "ano": r['ano'], "ordem": r['ordem']} for r in rows],
+            }, ["pcp"] + setor_topics(setor), True))
+        return deltas
+
+    def _poll(self) -> List[tuple]:
+        if not self._ready:
+            self._load_initial()
+            return []
+
+        messages = []
+        changes = self._poll_os()
+        if changes:
+            # Mudanças feitas por outros processos (sync, outros workers) também descartam o cache
+            db.query_cache.invalidate([TABLE_NAME])
+        if len(changes) > self.max_deltas:
+            setores = sorted({c['setor'] for c in changes if c['setor']} | {c['setor_anterior'] for c in changes if c['setor_anterior']})
+            messages.append(({"type": "system_update", "setores": setores}, None, True))
+        elif changes:
+            messages.extend(self._os_messages(changes))
+        messages.extend(self._poll_pcp())
+        return messages
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                messages = await loop.run_in_executor(None, self._poll)
+                for message, topics, include_unsubscribed in messages:
+                    await manager.broadcast(message, topics=topics, include_unsubscribed=include_unsubscribed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error("Erro no feed de mudanças: %s", exc)
+            await asyncio.sleep(self.intervalo)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+change_feed = ChangeFeedWatcher(
+    intervalo=float(config_manager.get("change_feed_intervalo_segundos", 2)),
+    max_deltas=int(config_manager.get("change_feed_max_deltas", 500)),
+    janela=int(config_manager.get("change_feed_janela_segundos", 30)),
+    recarga=float(config_manager.get("change_feed_recarga_segundos", 60)),
+)
@@ -725,6 +725,14 @@ createApp({
             }, interval);
         };
 
+        // Tópicos do setor do painel (Gravação é lida a partir do SEFOC)
+        const sectorTopics = () => {
+            const sector = config.value.sector;
+            const topics = [`setor:${sector}`];
+            if (sector === 'Gravação') topics.push('setor:SEFOC');
+            return topics;
+        };
+
         const startWebSocket = () => {
             const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
             const wsUrl = `${protocol}//${window.location.hostname}:${apiPort}/ws`;
@@ -742,6 +750,7 @@ createApp({
                     socket.onopen = () => {
                         console.log("[WebSocket] Conectado com sucesso");
                         connectionStatus.value = 'connected';
+                        socket.send(JSON.stringify({ type: 'subscribe', topics: sectorTopics() }));
                         
                         if (reconnectTimeout) {
                             clearTimeout(reconnectTimeout);
@@ -758,7 +767,7 @@ createApp({
                     socket.onmessage = (event) => {
                         try {
                             const data = JSON.parse(event.data);
-                            if (data.type === 'system_update' || data.type === 'pcp_queue_update') {
+                            if (['system_update', 'pcp_queue_update', 'os_delta', 'pcp_delta'].includes(data.type)) {
                                 console.log("[WebSocket] Atualização recebida:", data);
                                 fetchData();
                             }
@@ -473,6 +473,14 @@ createApp({
             }, interval);
         };
 
+        // Tópicos do setor do painel (Gravação é lida a partir do SEFOC)
+        const sectorTopics = () => {
+            const sector = config.value.sector;
+            const topics = [`setor:${sector}`];
+            if (sector === 'Gravação') topics.push('setor:SEFOC');
+            return topics;
+        };
+
         const startWebSocket = () => {
             const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
             const port = window.SAGRA_API_PORT || 8000;
@@ -486,12 +494,13 @@ createApp({
 
                 socket.onopen = () => {
                     console.log("WebSocket connected");
+                    socket.send(JSON.stringify({ type: 'subscribe', topics: sectorTopics() }));
                 };
 
                 socket.onmessage = (event) => {
                     try {
                         const data = JSON.parse(event.data);
-                        if (data.type === 'system_update' || data.type === 'pcp_queue_update') {
+                        if (['system_update', 'pcp_queue_update', 'os_delta', 'pcp_delta'].includes(data.type)) {
                             // Debounce or just call? For now direct call is fine.
                             console.log("System update received:", data);
                             fetchData();
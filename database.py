@@ -1,51 +1,178 @@
 import pymysql
 import pymysql.cursors
 from contextlib import contextmanager
+import contextvars
 import logging
-from queue import Queue, Empty
+import bisect
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Limites (ms) do histograma de tempo de espera por conexão
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
 class ConnectionPool:
-    def __init__(self, max_connections=10, **db_config):
-        self.pool = Queue(maxsize=max_connections)
+    """
+    Pool de conexões PyMySQL.
+
+    - `max_connections`: teto de conexões abertas (emprestadas + ociosas);
+    - `min_connections`: ociosas mantidas mesmo após `idle_timeout`;
+    - `ping_after_idle`: só faz ping na conexão ociosa há mais que isso (s);
+    - `max_lifetime`: conexões mais velhas que isso (s) são fechadas ao voltar/sair do pool;
+    - `idle_timeout`: ociosas além disso (s) são fechadas (respeitando o mínimo);
+    - `timeout`: espera máxima (s) por uma conexão livre antes de "Connection pool exhausted".
+    """
+
+    def __init__(self, max_connections=10, min_connections=0, timeout=5.0, ping_after_idle=30.0,
+                 max_lifetime=3600.0, idle_timeout=300.0, **db_config):
         self.max_connections = max_connections
+        self.min_connections = min(min_connections, max_connections)
+        self.timeout = timeout
+        self.ping_after_idle = ping_after_idle
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
         self.db_config = db_config
+
+        self._cond = threading.Condition()
+        # Ociosas: (conn, criada_em, devolvida_em); a mais recente fica à direita
+        self._idle = deque()
+        self._created_at = {}
+        self._in_use = 0
+        self._waiting = 0
+
         self.created_connections = 0
-        
-        # Pre-fill tokens
-        for _ in range(max_connections):
-            self.pool.put(None)
+        self._stats = {
+            "borrows": 0,
+            "timeouts": 0,
+            "reconnects": 0,
+            "pings": 0,
+            "closed_idle": 0,
+            "closed_lifetime": 0,
+            "closed_broken": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+        self._wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    @property
+    def _total(self):
+        return self._in_use + len(self._idle)
+
+    def _expired(self, conn, now):
+        created = self._created_at.get(id(conn), now)
+        return self.max_lifetime and now - created > self.max_lifetime
+
+    def _evict_idle(self, now):
+        """Remove ociosas vencidas (chamado com o lock). Retorna as conexões a fechar."""
+        to_close = []
+        kept = deque()
+        total = self._total
+        # Da mais antiga para a mais recente
+        for conn, created, returned in self._idle:
+            if self._expired(conn, now):
+                self._stats["closed_lifetime"] += 1
+                to_close.append(conn)
+                total -= 1
+            elif self.idle_timeout and now - returned > self.idle_timeout and total > self.min_connections:
+                self._stats["closed_idle"] += 1
+                to_close.append(conn)
+                total -= 1
+            else:
+                kept.append((conn, created, returned))
+        self._idle = kept
+        return to_close
+
+    def _close(self, conns):
+        for conn in conns:
+            self._created_at.pop(id(conn), None)
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _record_wait(self, wait_ms):
+        self._stats["borrows"] += 1
+        self._stats["wait_ms_total"] += wait_ms
+        self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+        self._wait_histogram[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
 
     def get_connection(self):
-        try:
-            conn = self.pool.get(block=True, timeout=5)
-            
-            if conn is None:
-                return self._create_new_connection()
-            
+        start = time.monotonic()
+        deadline = start + self.timeout
+        to_close = []
+        conn = None
+        last_used = None
+        create = False
+
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                to_close.extend(self._evict_idle(now))
+                if self._idle:
+                    conn, _, last_used = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._total < self.max_connections:
+                    self._in_use += 1
+                    create = True
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    self._close(to_close)
+                    raise Exception("Connection pool exhausted")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._record_wait((time.monotonic() - start) * 1000.0)
+            # Fechadas por lifetime/ociosidade liberam vaga para quem espera
+            if to_close:
+                self._cond.notify(len(to_close))
+
+        self._close(to_close)
+
+        if create:
+            return self._create_or_release()
+
+        if self.ping_after_idle is not None and time.monotonic() - last_used >= self.ping_after_idle:
+            self._stats["pings"] += 1
             try:
-                conn.ping(reconnect=True)
-                return conn
+                conn.ping(reconnect=False)
             except Exception:
                 logger.warning("Connection in pool was dead, creating new one.")
-                try:
-                    conn.close()
-                except:
-                    pass
-                return self._create_new_connection()
-                
-        except Empty:
-            raise Exception("Connection pool exhausted")
+                self._stats["reconnects"] += 1
+                self._stats["closed_broken"] += 1
+                self._close([conn])
+                return self._create_or_release()
+        return conn
+
+    def _create_or_release(self):
+        """Cria uma conexão para uma vaga já reservada; devolve a vaga se falhar."""
+        try:
+            conn = self._create_new_connection()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        self._created_at[id(conn)] = time.monotonic()
+        return conn
 
     def _create_new_connection(self):
-        import time
         retries = 3
         for attempt in range(retries):
             try:
                 conn = pymysql.connect(**self.db_config)
+                self.created_connections += 1
                 return conn
             except pymysql.MySQLError as e:
                 if attempt < retries - 1:
@@ -53,18 +180,321 @@ class ConnectionPool:
                     time.sleep(1)
                 else:
                     logger.error(f"Error connecting after {retries} attempts: {e}")
-                    self.pool.put(None)
                     raise
 
     def return_connection(self, conn):
+        now = time.monotonic()
+        to_close = []
+        with self._cond:
+            self._in_use -= 1
+            if not getattr(conn, "open", True):
+                self._stats["closed_broken"] += 1
+                to_close.append(conn)
+            elif self._expired(conn, now):
+                self._stats["closed_lifetime"] += 1
+                to_close.append(conn)
+            else:
+                self._idle.append((conn, self._created_at.get(id(conn), now), now))
+            self._cond.notify()
+        self._close(to_close)
+
+    def discard_connection(self, conn):
+        """Fecha uma conexão emprestada em vez de devolvê-la (ex.: leitura em streaming interrompida)."""
+        with self._cond:
+            self._in_use -= 1
+            self._stats["closed_broken"] += 1
+            self._cond.notify()
+        self._close([conn])
+
+    def stats(self):
+        with self._cond:
+            borrows = self._stats["borrows"]
+            histogram = {}
+            for i, count in enumerate(self._wait_histogram):
+                label = f"<={WAIT_BUCKETS_MS[i]}ms" if i < len(WAIT_BUCKETS_MS) else f">{WAIT_BUCKETS_MS[-1]}ms"
+                histogram[label] = count
+            return {
+                "max_connections": self.max_connections,
+                "min_connections": self.min_connections,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "created": self.created_connections,
+                "borrows": borrows,
+                "timeouts": self._stats["timeouts"],
+                "reconnects": self._stats["reconnects"],
+                "pings": self._stats["pings"],
+                "closed": {
+                    "idle": self._stats["closed_idle"],
+                    "lifetime": self._stats["closed_lifetime"],
+                    "broken": self._stats["closed_broken"],
+                },
+                "wait_ms": {
+                    "avg": round(self._stats["wait_ms_total"] / borrows, 3) if borrows else 0.0,
+                    "max": round(self._stats["wait_ms_max"], 3),
+                    "histogram": histogram,
+                },
+                "config": {
+                    "timeout": self.timeout,
+                    "ping_after_idle": self.ping_after_idle,
+                    "max_lifetime": self.max_lifetime,
+                    "idle_timeout": self.idle_timeout,
+                },
+            }
+
+# ---------------------------------------------------------------------------
+# Cache de resultados por tabela
+# ---------------------------------------------------------------------------
+_IDENT = r"`?(?:\w+`?\.`?)?(\w+)`?"
+_WRITE_VERB = re.compile(r"^\s*(?:/\*.*?\*/\s*)*(INSERT|REPLACE|UPDATE|DELETE|TRUNCATE|ALTER|DROP|RENAME)\b", re.I | re.S)
+_INTO_TABLE = re.compile(r"\bINTO\s+" + _IDENT, re.I)
+_UPDATE_TABLES = re.compile(r"(?:\bUPDATE|\bJOIN|,)\s+" + _IDENT, re.I)
+_DELETE_TABLES = re.compile(r"(?:\bFROM|\bJOIN|\bUSING|,)\s+" + _IDENT, re.I)
+_TRUNCATE_TABLE = re.compile(r"^\s*(?:TABLE\s+)?" + _IDENT, re.I)
+_DDL_TABLES = re.compile(r"(?:\bTABLE(?:\s+IF\s+EXISTS)?|\bTO|,)\s+" + _IDENT, re.I)
+_UNTIL_SET = re.compile(r"\bSET\b", re.I)
+_UNTIL_WHERE = re.compile(r"\bWHERE\b", re.I)
+
+
+@lru_cache(maxsize=2048)
+def written_tables(query):
+    """Tabelas (minúsculas) escritas por um comando INSERT/REPLACE/UPDATE/DELETE/TRUNCATE/ALTER/DROP/RENAME."""
+    if not isinstance(query, str):
+        return frozenset()
+    match = _WRITE_VERB.match(query)
+    if not match:
+        return frozenset()
+    verb = match.group(1).upper()
+    body = query[match.end():]
+    if verb in ("INSERT", "REPLACE"):
+        found = _INTO_TABLE.findall(body)[:1]
+    elif verb == "UPDATE":
+        # "UPDATE a JOIN b ON ... SET ..." -> só o trecho antes do SET
+        head = _UNTIL_SET.split(body, 1)[0]
+        found = _UPDATE_TABLES.findall("UPDATE " + head)
+    elif verb == "DELETE":
+        head = _UNTIL_WHERE.split(body, 1)[0]
+        found = _DELETE_TABLES.findall(head)
+    elif verb == "TRUNCATE":
+        found = _TRUNCATE_TABLE.findall(body)[:1]
+    else:
+        found = _DDL_TABLES.findall(body)
+    return frozenset(t.lower() for t in found)
+
+
+class QueryCache:
+    """
+    Cache LRU (limitado em entradas) com TTL para leituras que declaram as tabelas que usam.
+
+    Cada tabela tem uma versão, incrementada a cada escrita feita por este processo
+    (Database.cursor/execute_transaction e o adb). A entrada guarda as versões lidas ANTES
+    da consulta e só vale enquanto elas não mudarem. Escritas de outros processos (scripts
+    de sincronização, outros workers) só expiram pelo TTL ou por `invalidate` explícito.
+    """
+
+    def __init__(self, max_entries=512, default_ttl=60.0, enabled=True):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._counters = {}
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(name, query, params):
+        return (name, query, repr(params))
+
+    def _count(self, name, field):
+        counters = self._counters.setdefault(name, {"hits": 0, "misses": 0, "stale": 0})
+        counters[field] += 1
+
+    def versions(self, tables):
+        """Versões atuais das tabelas (chamar antes de executar a consulta)."""
+        with self._lock:
+            return tuple(self._versions.get(t, 0) for t in tables)
+
+    def get(self, name, query, params, tables):
+        """Retorna (True, linhas) se houver entrada válida; senão (False, None)."""
+        if not self.enabled:
+            return False, None
+        key = self._key(name, query, params)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, versions, rows = entry
+                current = tuple(self._versions.get(t, 0) for t in tables)
+                if expires_at > now and versions == current:
+                    self._entries.move_to_end(key)
+                    self._count(name, "hits")
+                    return True, [dict(r) for r in rows]
+                del self._entries[key]
+                self._count(name, "stale")
+            self._count(name, "misses")
+        return False, None
+
+    def put(self, name, query, params, versions, rows, ttl=None):
+        if not self.enabled:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        key = self._key(name, query, params)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, versions, tuple(dict(r) for r in rows))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tables):
+        """Incrementa a versão das tabelas: entradas que as leram deixam de valer."""
+        if not tables:
+            return
+        with self._lock:
+            for table in tables:
+                table = table.lower()
+                self._versions[table] = self._versions.get(table, 0) + 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            queries = {}
+            for name, counters in self._counters.items():
+                total = counters["hits"] + counters["misses"]
+                queries[name] = dict(counters, hit_ratio=round(counters["hits"] / total, 3) if total else 0.0)
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "default_ttl": self.default_ttl,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "table_versions": dict(self._versions),
+                "queries": queries,
+            }
+
+
+# ---------------------------------------------------------------------------
+# Contabilidade de consultas por requisição
+# ---------------------------------------------------------------------------
+def _compact_sql(query, limit=300):
+    text = " ".join(str(query).split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class QueryStats:
+    """Consultas de uma requisição: quantidade, tempo total no banco e a mais lenta."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+
+    def record(self, query, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms >= self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = query
+
+    def as_dict(self):
+        return {
+            "queries": self.count,
+            "db_ms": round(self.total_ms, 1),
+            "slowest_ms": round(self.slowest_ms, 1),
+            "slowest_sql": _compact_sql(self.slowest_sql, 120) if self.slowest_sql else None,
+        }
+
+
+_query_stats = contextvars.ContextVar("query_stats", default=None)
+
+# Consultas acima disso (ms) vão para o log com os parâmetros; 0 desliga (ver Database.__init__)
+slow_query_ms = 0.0
+
+
+def begin_query_stats():
+    """Abre a contabilidade da requisição atual. Retorna (stats, token para end_query_stats)."""
+    stats = QueryStats()
+    return stats, _query_stats.set(stats)
+
+
+def end_query_stats(token):
+    _query_stats.reset(token)
+
+
+def record_query(query, params, elapsed_ms):
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.record(query, elapsed_ms)
+    if slow_query_ms and elapsed_ms >= slow_query_ms:
+        logger.warning("Consulta lenta (%.1f ms): %s | params=%s",
+                       elapsed_ms, _compact_sql(query, 2000), _compact_sql(repr(params), 1000))
+
+
+def iter_cursor(conn, query, params=None, as_dict=True, batch_size=1000):
+    """
+    Gera as linhas de `query` com cursor sem buffer (SSCursor/SSDictCursor): o servidor
+    envia o resultado aos poucos e a memória fica limitada a `batch_size` linhas.
+    `as_dict=False` devolve tuplas (mais leve para tabelas largas).
+
+    A conexão fica ocupada até o gerador terminar: não use outro cursor nela enquanto isso.
+    """
+    cursor_class = pymysql.cursors.SSDictCursor if as_dict else pymysql.cursors.SSCursor
+    cursor = conn.cursor(cursor_class)
+    try:
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        record_query(query, params, (time.perf_counter() - start) * 1000.0)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+class _TrackedCursor:
+    """Cursor PyMySQL que mede cada comando (record_query) e repassa as tabelas escritas para `on_write`."""
+
+    def __init__(self, cursor, on_write):
+        self._cursor = cursor
+        self._on_write = on_write
+
+    def execute(self, query, args=None):
+        start = time.perf_counter()
         try:
-            self.pool.put(conn, block=False)
-        except Exception:
-            logger.warning("Pool full, closing returned connection")
-            try:
-                conn.close()
-            except:
-                pass
+            result = self._cursor.execute(query, args)
+        finally:
+            record_query(query, args, (time.perf_counter() - start) * 1000.0)
+        tables = written_tables(query)
+        if tables:
+            self._on_write(tables)
+        return result
+
+    def executemany(self, query, args):
+        start = time.perf_counter()
+        try:
+            result = self._cursor.executemany(query, args)
+        finally:
+            record_query(query, args, (time.perf_counter() - start) * 1000.0)
+        tables = written_tables(query)
+        if tables:
+            self._on_write(tables)
+        return result
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
 
 from config_manager import config_manager
 
@@ -78,7 +508,12 @@ class Database:
         self.db = config_manager.get("db_name", "sagrafulldb")
         
         self.pool = ConnectionPool(
-            max_connections=10,
+            max_connections=int(config_manager.get("db_pool_max", 10)),
+            min_connections=int(config_manager.get("db_pool_min", 0)),
+            timeout=float(config_manager.get("db_pool_timeout_segundos", 5)),
+            ping_after_idle=float(config_manager.get("db_pool_ping_ocioso_segundos", 30)),
+            max_lifetime=float(config_manager.get("db_pool_vida_maxima_segundos", 3600)),
+            idle_timeout=float(config_manager.get("db_pool_ocioso_maximo_segundos", 300)),
             host=self.host,
             port=self.port,
             user=self.user,
@@ -88,6 +523,13 @@ class Database:
             autocommit=True,
             charset='utf8mb4' # [IMPORTANTE] Garante que acentos funcionem nos filtros
         )
+        self.query_cache = QueryCache(
+            max_entries=int(config_manager.get("db_cache_max_entradas", 512)),
+            default_ttl=float(config_manager.get("db_cache_ttl_segundos", 60)),
+            enabled=bool(config_manager.get("db_cache_habilitado", True)),
+        )
+        global slow_query_ms
+        slow_query_ms = float(config_manager.get("db_log_consulta_lenta_ms", 500))
 
     @contextmanager
     def cursor(self):
@@ -95,7 +537,8 @@ class Database:
         try:
             cursor = conn.cursor()
             try:
-                yield cursor
+                # autocommit: a escrita já está visível, invalida na hora
+                yield _TrackedCursor(cursor, self.query_cache.invalidate)
             finally:
                 cursor.close()
         finally:
@@ -106,12 +549,56 @@ class Database:
             cursor.execute(query, params)
             return cursor.fetchall()
 
+    def iter_query(self, query, params=None, as_dict=True, batch_size=None):
+        """
+        Versão em streaming de `execute_query` (ver `iter_cursor`), para exportações e
+        leituras de tabelas inteiras. Pode ser passada direto a um StreamingResponse.
+
+        Se o consumidor parar antes do fim, a conexão é descartada: fechar um SSCursor
+        com linhas pendentes obrigaria a ler o resto do resultado.
+        """
+        if batch_size is None:
+            batch_size = int(config_manager.get("db_stream_lote", 1000))
+        conn = self.pool.get_connection()
+        rows = iter_cursor(conn, query, params, as_dict=as_dict, batch_size=batch_size)
+        finished = False
+        try:
+            # for explícito (e não yield from): ao interromper, o socket é fechado antes do cursor
+            for row in rows:
+                yield row
+            finished = True
+        finally:
+            if finished:
+                self.pool.return_connection(conn)
+            else:
+                self.pool.discard_connection(conn)
+                try:
+                    rows.close()
+                except Exception:
+                    pass
+
+    def cached_query(self, name, query, params=None, tables=(), ttl=None):
+        """
+        `execute_query` com cache. `tables` lista as tabelas lidas pela consulta; escritas
+        nelas por este processo descartam o resultado. `name` agrupa os contadores de hit/miss.
+        """
+        tables = tuple(t.lower() for t in tables)
+        hit, rows = self.query_cache.get(name, query, params, tables)
+        if hit:
+            return rows
+        versions = self.query_cache.versions(tables)
+        rows = self.execute_query(query, params)
+        self.query_cache.put(name, query, params, versions, rows, ttl)
+        return rows
+
     def execute_transaction(self, operations):
         conn = self.pool.get_connection()
         conn.begin()
+        written = set()
         try:
             results = []
-            with conn.cursor() as cursor:
+            with conn.cursor() as raw_cursor:
+                cursor = _TrackedCursor(raw_cursor, written.update)
                 for op in operations:
                     if callable(op):
                         res = op(cursor)
@@ -120,7 +607,11 @@ class Database:
                         query, params = op
                         cursor.execute(query, params)
                         results.append(cursor.fetchall())
+            start = time.perf_counter()
             conn.commit()
+            record_query("COMMIT", None, (time.perf_counter() - start) * 1000.0)
+            # Só depois do commit: leituras feitas durante a transação ficam com versão antiga
+            self.query_cache.invalidate(written)
             return results
         except Exception as e:
             conn.rollback()
@@ -0,0 +1,210 @@
+"""
+Barramento de eventos do tempo real entre processos (workers do uvicorn).
+
+Os sockets ficam no `routers.realtime.manager` de cada processo. Quem gera um evento
+publica no barramento, que entrega aos sockets locais e aos dos outros workers.
+
+Backends (config "realtime_event_bus"):
+- "local" (padrão): apenas o processo atual, como antes (um único worker);
+- "mysql": outbox em tab_realtime_eventos. Cada worker entrega localmente na hora,
+  grava o evento e lê periodicamente os eventos dos outros workers (id > último lido).
+  Com publicadores concorrentes um id menor pode ser confirmado depois de um maior já
+  lido: os ids pulados viram lacunas, consultadas de novo a cada ciclo até aparecerem
+  ou vencerem (`realtime_event_bus_lacuna_segundos`, padrão 30 s; rollback também deixa lacuna).
+
+O feed de mudanças (change_feed_service) não passa pelo barramento: cada worker roda o
+seu e atende os próprios sockets.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict, Iterable, Optional
+
+from config_manager import config_manager
+from routers.realtime import manager
+
+logger = logging.getLogger(__name__)
+
+
+class LocalEventBus:
+    """Entrega apenas aos sockets deste processo."""
+
+    name = "local"
+
+    async def publish(self, message: Dict[str, Any], topics: Optional[Iterable[str]] = None,
+                      include_unsubscribed: bool = True):
+        await manager.broadcast(message, topics=topics, include_unsubscribed=include_unsubscribed)
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class MySQLOutboxEventBus(LocalEventBus):
+    """Outbox no MySQL: publica com INSERT e consome por polling do id."""
+
+    name = "mysql"
+
+    _CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS tab_realtime_eventos (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        origem VARCHAR(100) NOT NULL,
+        payload MEDIUMTEXT NOT NULL,
+        topics TEXT NULL,
+        incluir_sem_assinatura TINYINT(1) NOT NULL DEFAULT 1,
+        criado_em DATETIME DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_criado_em (criado_em)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    """
+
+    # Acima disso o salto de ids não é tratado como lacuna (ex.: auto_increment_increment alto)
+    _MAX_LACUNA = 1000
+
+    def __init__(self, intervalo: float = 0.5, retencao_minutos: int = 10, lacuna_segundos: float = 30.0):
+        self.intervalo = intervalo
+        self.retencao_minutos = retencao_minutos
+        self.lacuna_segundos = lacuna_segundos
+        # id ainda não visto -> instante (monotonic) em que a lacuna foi detectada
+        self._gaps: Dict[int, float] = {}
+        self.origem = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._last_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._table_ready = False
+        self._ciclos = 0
+
+    def _ensure_table(self):
+        if self._table_ready:
+            return
+        from database import db
+        db.execute_query(self._CREATE_SQL)
+        self._table_ready = True
+
+    def _insert(self, message: Dict[str, Any], topics: Optional[Iterable[str]], include_unsubscribed: bool):
+        from database import db
+        self._ensure_table()
+        db.execute_query(
+            "INSERT INTO tab_realtime_eventos (origem, payload, topics, incluir_sem_assinatura) VALUES (%s, %s, %s, %s)",
+            (
+                self.origem,
+                json.dumps(message, ensure_ascii=False, default=str),
+                json.dumps(list(topics)) if topics is not None else None,
+                1 if include_unsubscribed else 0,
+            ),
+        )
+
+    async def publish(self, message: Dict[str, Any], topics: Optional[Iterable[str]] = None,
+                      include_unsubscribed: bool = True):
+        if topics is not None:
+            topics = list(topics)
+        # Sockets locais não esperam o round-trip pelo banco
+        await manager.broadcast(message, topics=topics, include_unsubscribed=include_unsubscribed)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._insert, message, topics, include_unsubscribed)
+        except Exception as exc:
+            logger.error("Erro ao publicar evento no outbox: %s", exc)
+
+    def _fetch(self):
+        from database import db
+        self._ensure_table()
+        if self._last_id is None:
+            # Começa do fim: eventos anteriores à subida do worker não interessam
+            rows = db.execute_query("SELECT COALESCE(MAX(id), 0) AS ultimo FROM tab_realtime_eventos")
+            self._last_id = int(rows[0]['ultimo']) if rows else 0
+            return []
+
+        rows = list(db.execute_query(
+            "SELECT id, origem, payload, topics, incluir_sem_assinatura FROM tab_realtime_eventos "
+            "WHERE id > %s ORDER BY id ASC LIMIT 500",
+            (self._last_id,),
+        ))
+        rows = self._fill_gaps(db) + rows
+        anterior = self._last_id
+        agora = time.monotonic()
+        for row in rows:
+            row_id = int(row['id'])
+            if row_id <= anterior:
+                continue
+            if row_id - anterior <= self._MAX_LACUNA:
+                for faltando in range(anterior + 1, row_id):
+                    self._gaps[faltando] = agora
+            anterior = row_id
+        self._last_id = anterior
+
+        self._ciclos += 1
+        if self._ciclos % 120 == 0:
+            db.execute_query(
+                "DELETE FROM tab_realtime_eventos WHERE criado_em < NOW() - INTERVAL %s MINUTE",
+                (self.retencao_minutos,),
+            )
+        return [r for r in rows if r['origem'] != self.origem]
+
+    def _fill_gaps(self, db):
+        """Eventos das lacunas que já foram confirmados; lacunas vencidas são descartadas."""
+        if not self._gaps:
+            return []
+        limite = time.monotonic() - self.lacuna_segundos
+        for gap_id in [i for i, desde in self._gaps.items() if desde < limite]:
+            del self._gaps[gap_id]
+        if not self._gaps:
+            return []
+        ids = sorted(self._gaps)[:500]
+        rows = list(db.execute_query(
+            "SELECT id, origem, payload, topics, incluir_sem_assinatura FROM tab_realtime_eventos "
+            f"WHERE id IN ({', '.join(['%s'] * len(ids))}) ORDER BY id ASC",
+            tuple(ids),
+        ))
+        for row in rows:
+            self._gaps.pop(int(row['id']), None)
+        return rows
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                for row in await loop.run_in_executor(None, self._fetch):
+                    topics = json.loads(row['topics']) if row.get('topics') else None
+                    await manager.broadcast(
+                        json.loads(row['payload']),
+                        topics=topics,
+                        include_unsubscribed=bool(row['incluir_sem_assinatura']),
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error("Erro ao ler outbox de eventos: %s", exc)
+            await asyncio.sleep(self.intervalo)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def create_event_bus():
+    backend = str(config_manager.get("realtime_event_bus", "local")).lower()
+    if backend == "mysql":
+        return MySQLOutboxEventBus(
+            intervalo=float(config_manager.get("realtime_event_bus_intervalo_segundos", 0.5)),
+            retencao_minutos=int(config_manager.get("realtime_event_bus_retencao_minutos", 10)),
+            lacuna_segundos=float(config_manager.get("realtime_event_bus_lacuna_segundos", 30.0)),
+        )
+    if backend != "local":
+        logger.warning("realtime_event_bus desconhecido (%s); usando 'local'", backend)
+    return LocalEventBus()
+
+
+event_bus = create_event_bus()
@@ -280,6 +280,15 @@ def run_aux_scripts(mysql_conn):
                 if "Duplicate key" not in str(e) and "already exists" not in str(e):
                     logging.warning(f"Aux Setup Warning: {e}")
 
+    # Índices compostos das consultas quentes (idempotente, ver index_advisor.py)
+    try:
+        from index_advisor import apply_migration
+        with mysql_conn.cursor() as cur:
+            for sql in apply_migration(cur):
+                logging.info(f"Index created: {sql}")
+    except Exception as e:
+        logging.warning(f"Index advisor migration warning: {e}")
+
     # Insert default Permissions
     try:
         levels = [
@@ -0,0 +1,470 @@
+"""
+Consultor de índices das consultas quentes.
+
+Registra as consultas mais executadas pela API e pelos daemons de sincronização (mesmo
+SQL das rotas), roda EXPLAIN contra o schema atual e aponta varreduras completas,
+varreduras de índice inteiro, filesort e tabelas temporárias. Também gera/aplica a
+migração idempotente com os índices compostos recomendados: um índice só é criado se
+nenhum índice existente já começar pelas mesmas colunas.
+
+    python index_advisor.py                 # relatório EXPLAIN + índices faltantes
+    python index_advisor.py --json          # mesmo relatório em JSON
+    python index_advisor.py --sql > m.sql   # migração idempotente (mysql < m.sql)
+    python index_advisor.py --aplicar       # cria os índices faltantes
+    python index_advisor.py --verificar     # regressão: código 1 se houver achado novo
+
+No `--verificar`, cada consulta declara os achados aceitos (ex.: filesort de uma fila
+que ordena por expressão); qualquer outro achado, ou índice recomendado ausente, falha.
+"""
+import argparse
+import json
+import logging
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from os_status_service import TABLE_NAME as OS_STATUS_TABLE, _SELECT_SQL as OS_STATUS_SELECT_SQL
+
+logger = logging.getLogger(__name__)
+
+# Tabelas com menos linhas estimadas que isso não geram achado de varredura
+MIN_ROWS = 1000
+# Prefixo usado quando a coluna recomendada é TEXT/BLOB (schema gerado pelo full_import)
+TEXT_PREFIX = 50
+
+FULL_SCAN = "full_scan"
+INDEX_SCAN = "full_index_scan"
+FILESORT = "filesort"
+TEMPORARY = "temporary"
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    name: str
+    origem: str
+    sql: str
+    # Nomes dos parâmetros de amostra usados (ver `sample_params`)
+    params: Tuple[str, ...] = ()
+    aceitos: FrozenSet[str] = frozenset()
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+    motivo: str
+
+
+@dataclass
+class Finding:
+    query: str
+    kind: str
+    table: str
+    rows: int
+    detail: str
+    aceito: bool = False
+
+    def as_dict(self):
+        return {
+            "consulta": self.query, "tipo": self.kind, "tabela": self.table,
+            "linhas_estimadas": self.rows, "detalhe": self.detail, "aceito": self.aceito,
+        }
+
+
+@dataclass
+class Report:
+    findings: List[Finding] = field(default_factory=list)
+    missing: List[IndexSpec] = field(default_factory=list)
+    skipped: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def regressions(self) -> List[Finding]:
+        return [f for f in self.findings if not f.aceito]
+
+    def ok(self) -> bool:
+        return not self.regressions and not self.missing
+
+    def as_dict(self):
+        return {
+            "ok": self.ok(),
+            "achados": [f.as_dict() for f in self.findings],
+            "indices_faltantes": [
+                {"tabela": i.table, "indice": i.name, "colunas": list(i.columns), "motivo": i.motivo}
+                for i in self.missing
+            ],
+            "consultas_ignoradas": self.skipped,
+        }
+
+
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery(
+        "os_search", "GET /api/os/search",
+        f"""
+        SELECT st.nro_os, st.ano, st.titulo, st.solicitante, st.situacao, st.prioridade, st.produto,
+               st.setor, st.data_entrega, st.data_andamento
+        FROM {OS_STATUS_TABLE} AS st
+        WHERE st.situacao NOT IN ('Entregue', 'Cancelada', 'Cancelado')
+        ORDER BY st.prioridade_rank ASC, st.data_entrega ASC, st.ano DESC, st.nro_os DESC
+        LIMIT 16 OFFSET 0
+        """,
+    ),
+    HotQuery(
+        "os_search_setor", "GET /api/os/search?setor=",
+        f"""
+        SELECT st.nro_os, st.ano, st.titulo, st.situacao, st.setor, st.data_entrega
+        FROM {OS_STATUS_TABLE} AS st
+        WHERE st.situacao NOT IN ('Entregue', 'Cancelada', 'Cancelado') AND st.setor IN (%(setor)s)
+        ORDER BY st.prioridade_rank ASC, st.data_entrega ASC, st.ano DESC, st.nro_os DESC
+        LIMIT 16 OFFSET 0
+        """,
+        ("setor",),
+    ),
+    HotQuery(
+        "os_search_count", "GET /api/os/search (total)",
+        f"""
+        SELECT COUNT(*) AS total FROM {OS_STATUS_TABLE} AS st
+        WHERE st.situacao NOT IN ('Entregue', 'Cancelada', 'Cancelado')
+        """,
+        # Contagem exata percorre o índice de situação por definição
+        aceitos=frozenset({INDEX_SCAN}),
+    ),
+    HotQuery(
+        "os_panel", "GET /api/os/panel",
+        f"""
+        SELECT st.nro_os, st.ano, st.titulo, st.situacao, st.setor, st.data_entrega
+        FROM {OS_STATUS_TABLE} AS st
+        WHERE (st.situacao LIKE 'Saída p/%%' OR st.situacao = 'Em Execução' OR st.situacao = 'Recebido'
+               OR st.situacao LIKE 'Tramit. de Prova p/%%')
+          AND st.setor = %(setor)s
+        ORDER BY st.data_entrega ASC
+        """,
+        ("setor",),
+        # Poucas linhas por setor; a ordenação por data_entrega é feita em memória
+        aceitos=frozenset({FILESORT}),
+    ),
+    HotQuery(
+        "pcp_queue", "GET /api/pcp/queue",
+        f"""
+        SELECT st.nro_os, st.ano, st.titulo, st.situacao, pcp.ordem
+        FROM {OS_STATUS_TABLE} AS st
+        LEFT JOIN tab_pcp_fila AS pcp ON (pcp.setor = %(setor)s AND pcp.nro_os = st.nro_os AND pcp.ano = st.ano)
+        WHERE st.setor = %(setor)s AND st.situacao NOT IN ('Entregue', 'Cancelada', 'Cancelado')
+        ORDER BY CASE WHEN pcp.ordem IS NULL THEN 1 ELSE 0 END, pcp.ordem ASC,
+                 st.prioridade_rank ASC, st.data_entrega ASC, st.ano DESC, st.nro_os DESC
+        """,
+        ("setor",),
+        # Ordena por coluna da fila PCP (LEFT JOIN): sempre filesort, sobre as OSs de um setor
+        aceitos=frozenset({FILESORT}),
+    ),
+    HotQuery(
+        "os_details", "GET /api/os/{ano}/{id}/details",
+        """
+        SELECT p.NroProtocolo, p.AnoProtocolo, d.Titulo, md.MidiaDigitalLink
+        FROM tabProtocolos AS p
+        LEFT JOIN tabDetalhesServico AS d ON (p.NroProtocolo = d.NroProtocoloLinkDet) AND (p.AnoProtocolo = d.AnoProtocoloLinkDet)
+        LEFT JOIN tabMidiaDigital AS md ON (p.NroProtocolo = md.NroProtocoloLinkMidia) AND (p.AnoProtocolo = md.AnoProtocoloLinkMidia)
+        WHERE p.NroProtocolo = %(nro)s AND p.AnoProtocolo = %(ano)s
+        """,
+        ("nro", "ano"),
+    ),
+    HotQuery(
+        "os_history", "GET /api/os/{ano}/{id}/history",
+        """
+        SELECT CodStatus, SituacaoLink, SetorLink, Data, Ponto, `Observaçao` FROM tabAndamento
+        WHERE NroProtocoloLink = %(nro)s AND AnoProtocoloLink = %(ano)s ORDER BY CodStatus
+        """,
+        ("nro", "ano"),
+    ),
+    HotQuery(
+        "andamento_reset_ultimo", "POST /api/os/{ano}/{id}/history, sync_andamentos_v2",
+        """
+        UPDATE tabAndamento SET UltimoStatus = 0
+        WHERE NroProtocoloLink = %(nro)s AND AnoProtocoloLink = %(ano)s
+        """,
+        ("nro", "ano"),
+    ),
+    HotQuery(
+        "andamento_max_codstatus", "sync_andamentos_v2.update_ultimo_status",
+        """
+        SELECT MAX(CodStatus) FROM tabAndamento
+        WHERE NroProtocoloLink = %(nro)s AND AnoProtocoloLink = %(ano)s
+        """,
+        ("nro", "ano"),
+    ),
+    HotQuery(
+        "andamento_codstatus", "sync_andamentos_v2 (existência/remoção por CodStatus)",
+        "SELECT * FROM tabAndamento WHERE CodStatus = %(cod)s",
+        ("cod",),
+    ),
+    HotQuery(
+        "andamento_janela_sync", "sync_andamentos_v2 (andamentos recentes)",
+        """
+        SELECT CodStatus, NroProtocoloLink, AnoProtocoloLink, SituacaoLink, SetorLink, Data, UltimoStatus
+        FROM tabAndamento WHERE Data >= %(data)s AND CodStatus IS NOT NULL ORDER BY CodStatus
+        """,
+        ("data",),
+        # Janela curta; a ordenação é sobre as linhas do período
+        aceitos=frozenset({FILESORT}),
+    ),
+    HotQuery(
+        "os_status_refresh", "os_status_service.refresh_os_status",
+        f"{OS_STATUS_SELECT_SQL} AND (p.NroProtocolo, p.AnoProtocolo) IN ((%(nro)s, %(ano)s))",
+        ("nro", "ano"),
+    ),
+    HotQuery(
+        "change_feed", "change_feed_service (polling da projeção)",
+        f"""
+        SELECT nro_os, ano, situacao, setor, prioridade, data_entrega, data_andamento, atualizado_em
+        FROM {OS_STATUS_TABLE} WHERE atualizado_em >= DATE_SUB(%(data)s, INTERVAL 5 SECOND)
+        """,
+        ("data",),
+    ),
+]
+
+RECOMMENDED_INDEXES: List[IndexSpec] = [
+    IndexSpec("tabProtocolos", "idx_proto_os", ("NroProtocolo", "AnoProtocolo"),
+              "detalhes da OS e JOIN da projeção"),
+    IndexSpec("tabDetalhesServico", "idx_detalhes_os", ("NroProtocoloLinkDet", "AnoProtocoloLinkDet"),
+              "LEFT JOIN dos detalhes por OS"),
+    IndexSpec("tabMidiaDigital", "idx_midia_os", ("NroProtocoloLinkMidia", "AnoProtocoloLinkMidia"),
+              "LEFT JOIN das mídias por OS"),
+    IndexSpec("tabAndamento", "idx_andamento_os_cod", ("NroProtocoloLink", "AnoProtocoloLink", "CodStatus"),
+              "histórico ordenado, reset de UltimoStatus e MAX(CodStatus) por OS"),
+    IndexSpec("tabAndamento", "idx_andamento_ultimo_os", ("UltimoStatus", "NroProtocoloLink", "AnoProtocoloLink"),
+              "carga/refresh da projeção (UltimoStatus = 1 + JOIN por OS)"),
+    IndexSpec("tabAndamento", "idx_andamento_codstatus", ("CodStatus",),
+              "busca/remoção por CodStatus e geração do próximo CodStatus"),
+    IndexSpec("tabAndamento", "idx_andamento_data", ("Data",),
+              "janela de andamentos recentes da sincronização"),
+    IndexSpec("tab_pcp_fila", "idx_pcp_setor_os", ("setor", "nro_os", "ano"),
+              "LEFT JOIN da fila PCP por setor/OS"),
+]
+
+
+def _rows(cursor) -> List[dict]:
+    rows = cursor.fetchall()
+    if rows and not isinstance(rows[0], dict):
+        names = [d[0] for d in cursor.description]
+        rows = [dict(zip(names, r)) for r in rows]
+    return list(rows)
+
+
+def sample_params(cursor) -> Dict[str, object]:
+    """Valores reais da base para os parâmetros (o plano depende da seletividade)."""
+    params: Dict[str, object] = {"nro": 1, "ano": 2025, "cod": "000012025-01", "setor": "SEFOC", "data": "2025-01-01"}
+    cursor.execute(
+        "SELECT CodStatus, NroProtocoloLink, AnoProtocoloLink, SetorLink, Data FROM tabAndamento "
+        "WHERE UltimoStatus = 1 ORDER BY AnoProtocoloLink DESC LIMIT 1"
+    )
+    rows = _rows(cursor)
+    if rows:
+        row = rows[0]
+        params.update(nro=row["NroProtocoloLink"], ano=row["AnoProtocoloLink"], cod=row["CodStatus"],
+                      setor=row["SetorLink"] or params["setor"])
+        if row.get("Data"):
+            params["data"] = row["Data"]
+    return params
+
+
+def existing_indexes(cursor) -> Dict[str, List[Tuple[str, Tuple[str, ...]]]]:
+    """{tabela_minúscula: [(nome_índice, colunas_minúsculas), ...]} do schema atual."""
+    cursor.execute(
+        "SELECT TABLE_NAME AS tabela, INDEX_NAME AS indice, COLUMN_NAME AS coluna FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX"
+    )
+    grouped: Dict[Tuple[str, str], List[str]] = {}
+    for row in _rows(cursor):
+        grouped.setdefault((row["tabela"].lower(), row["indice"]), []).append(row["coluna"].lower())
+    result: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = {}
+    for (table, index), columns in grouped.items():
+        result.setdefault(table, []).append((index, tuple(columns)))
+    return result
+
+
+def _table_columns(cursor) -> Dict[str, Tuple[str, Dict[str, str]]]:
+    """{tabela_minúscula: (nome_real, {coluna_minúscula: tipo})}."""
+    cursor.execute(
+        "SELECT TABLE_NAME AS tabela, COLUMN_NAME AS coluna, DATA_TYPE AS tipo FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE()"
+    )
+    result: Dict[str, Tuple[str, Dict[str, str]]] = {}
+    for row in _rows(cursor):
+        _, columns = result.setdefault(row["tabela"].lower(), (row["tabela"], {}))
+        columns[row["coluna"].lower()] = row["tipo"].lower()
+    return result
+
+
+def _covered(spec: IndexSpec, indexes: Sequence[Tuple[str, Tuple[str, ...]]]) -> bool:
+    wanted = tuple(c.lower() for c in spec.columns)
+    return any(index == spec.name or columns[:len(wanted)] == wanted for index, columns in indexes)
+
+
+def missing_indexes(cursor) -> Tuple[List[IndexSpec], Dict[str, Tuple[str, Dict[str, str]]]]:
+    indexes = existing_indexes(cursor)
+    tables = _table_columns(cursor)
+    missing = []
+    for spec in RECOMMENDED_INDEXES:
+        table = tables.get(spec.table.lower())
+        if table is None:
+            logger.info("Tabela %s não existe; índice %s ignorado", spec.table, spec.name)
+            continue
+        if not all(c.lower() in table[1] for c in spec.columns):
+            logger.warning("Colunas de %s ausentes em %s; índice ignorado", spec.name, spec.table)
+            continue
+        if not _covered(spec, indexes.get(spec.table.lower(), [])):
+            missing.append(spec)
+    return missing, tables
+
+
+def _column_sql(column: str, tipo: str) -> str:
+    if "text" in tipo or "blob" in tipo:
+        return f"`{column}`({TEXT_PREFIX})"
+    return f"`{column}`"
+
+
+def create_index_sql(spec: IndexSpec, tables) -> str:
+    real_name, columns = tables[spec.table.lower()]
+    cols = ", ".join(_column_sql(c, columns[c.lower()]) for c in spec.columns)
+    return f"CREATE INDEX `{spec.name}` ON `{real_name}` ({cols})"
+
+
+def migration_sql(specs: Sequence[IndexSpec], tables) -> str:
+    """
+    Script SQL idempotente: cada CREATE INDEX só roda se o índice ainda não existir
+    (MySQL não tem CREATE INDEX IF NOT EXISTS; usa PREPARE sobre information_schema).
+    """
+    lines = ["-- Índices recomendados por index_advisor.py (idempotente)"]
+    for spec in specs:
+        real_name = tables[spec.table.lower()][0]
+        create = create_index_sql(spec, tables).replace("'", "''")
+        lines += [
+            f"-- {spec.motivo}",
+            "SET @sql := (SELECT IF(COUNT(*) = 0, '" + create + "', 'DO 0') FROM information_schema.STATISTICS "
+            f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{real_name}' AND INDEX_NAME = '{spec.name}');",
+            "PREPARE stmt FROM @sql;",
+            "EXECUTE stmt;",
+            "DEALLOCATE PREPARE stmt;",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def apply_migration(cursor, dry_run: bool = False) -> List[str]:
+    """Cria os índices recomendados que faltam; retorna os comandos executados."""
+    missing, tables = missing_indexes(cursor)
+    executed = []
+    for spec in missing:
+        sql = create_index_sql(spec, tables)
+        if not dry_run:
+            logger.info("Criando %s em %s", spec.name, spec.table)
+            cursor.execute(sql)
+        executed.append(sql)
+    return executed
+
+
+def analyze_plan(query: HotQuery, plan: List[dict], min_rows: int = MIN_ROWS) -> List[Finding]:
+    findings = []
+    for row in plan:
+        table = row.get("table") or ""
+        if table.startswith("<"):
+            # <derivedN>/<subqueryN>/<unionN>: o custo aparece nas linhas de origem
+            continue
+        access = (row.get("type") or "").upper()
+        extra = row.get("Extra") or ""
+        rows = int(row.get("rows") or 0)
+
+        if access == "ALL" and rows >= min_rows:
+            findings.append(Finding(query.name, FULL_SCAN, table, rows, f"possible_keys={row.get('possible_keys')}"))
+        elif access == "INDEX" and rows >= min_rows:
+            findings.append(Finding(query.name, INDEX_SCAN, table, rows, f"key={row.get('key')}"))
+        if "Using filesort" in extra:
+            findings.append(Finding(query.name, FILESORT, table, rows, extra))
+        if "Using temporary" in extra:
+            findings.append(Finding(query.name, TEMPORARY, table, rows, extra))
+    for finding in findings:
+        finding.aceito = finding.kind in query.aceitos
+    return findings
+
+
+def explain(cursor, query: HotQuery, params: Dict[str, object]) -> List[dict]:
+    cursor.execute("EXPLAIN " + query.sql, {name: params[name] for name in query.params})
+    return _rows(cursor)
+
+
+def run(cursor, queries: Sequence[HotQuery] = HOT_QUERIES, min_rows: int = MIN_ROWS) -> Report:
+    report = Report()
+    params = sample_params(cursor)
+    for query in queries:
+        try:
+            plan = explain(cursor, query, params)
+        except Exception as exc:
+            # Tabela ausente neste ambiente (ex.: fila PCP ainda não criada)
+            report.skipped[query.name] = str(exc)
+            continue
+        report.findings.extend(analyze_plan(query, plan, min_rows))
+    report.missing, _ = missing_indexes(cursor)
+    return report
+
+
+def print_report(report: Report):
+    print("Consultas quentes:")
+    by_query: Dict[str, List[Finding]] = {}
+    for finding in report.findings:
+        by_query.setdefault(finding.query, []).append(finding)
+    for query in HOT_QUERIES:
+        if query.name in report.skipped:
+            print(f"  [--]   {query.name:<26} ignorada: {report.skipped[query.name]}")
+            continue
+        findings = by_query.get(query.name, [])
+        status = "OK" if all(f.aceito for f in findings) else "ALERTA"
+        print(f"  [{status}] {query.name:<26} {query.origem}")
+        for f in findings:
+            marca = "aceito" if f.aceito else "novo"
+            print(f"           - {f.kind} em {f.table} (~{f.rows} linhas, {marca}) {f.detail}")
+
+    print("\nÍndices recomendados faltantes:")
+    if not report.missing:
+        print("  nenhum")
+    for spec in report.missing:
+        print(f"  {spec.table}.{spec.name} ({', '.join(spec.columns)}) - {spec.motivo}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="EXPLAIN das consultas quentes e migração de índices")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--json", action="store_true", help="Relatório em JSON")
+    grupo.add_argument("--sql", action="store_true", help="Imprime a migração idempotente dos índices faltantes")
+    grupo.add_argument("--aplicar", action="store_true", help="Cria os índices faltantes")
+    grupo.add_argument("--verificar", action="store_true", help="Sai com código 1 se houver achado não aceito")
+    parser.add_argument("--min-linhas", type=int, default=MIN_ROWS,
+                        help=f"Linhas estimadas mínimas para apontar varredura (padrão {MIN_ROWS})")
+    args = parser.parse_args()
+
+    from database import db
+
+    with db.cursor() as cursor:
+        if args.sql:
+            missing, tables = missing_indexes(cursor)
+            sys.stdout.write(migration_sql(missing, tables))
+            return 0
+        if args.aplicar:
+            executed = apply_migration(cursor)
+            print(f"{len(executed)} índice(s) criado(s)")
+            for sql in executed:
+                print(f"  {sql}")
+            return 0
+
+        report = run(cursor, min_rows=args.min_linhas)
+
+    if args.json:
+        print(json.dumps(report.as_dict(), ensure_ascii=False, indent=2, default=str))
+    else:
+        print_report(report)
+    if args.verificar:
+        return 0 if report.ok() else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
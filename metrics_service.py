@@ -0,0 +1,303 @@
+"""
+Métricas no formato texto do Prometheus (exposition format 0.0.4), sem dependências.
+
+- API: `registry` (contadores/histogramas por rota, alimentados pelo middleware de
+  routers/api.py) + coletores registrados com `registry.add_collector(fn)`, que leem os
+  stats já existentes (pool, WebSocket, cache, admissão) na hora do scrape.
+- Daemons de sincronização: `SyncMetrics("nome")` mede cada ciclo e grava
+  `<metricas_dir>/<nome>.prom` (escrita atômica). O GET /metrics da API junta esses
+  arquivos, no mesmo esquema do "textfile collector" do node_exporter.
+"""
+import bisect
+import glob
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Segundos; cobre de consultas rápidas a relatórios PDF
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SYNC_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def sample(name: str, value, labels: Optional[Dict[str, object]] = None) -> str:
+    return f"{name}{format_labels(labels or {})} {format_value(value)}"
+
+
+def header(name: str, kind: str, help_text: str) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> List[str]:
+        lines = header(self.name, self.kind, self.help)
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value) -> List[str]:
+        return [sample(self.name, value, self._labels(key))]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # contagens por faixa (não cumulativas), soma, total
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_value(self, key, value) -> List[str]:
+        counts, total, count = value[0], value[1], value[2]
+        labels = self._labels(key)
+        lines = []
+        acumulado = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            acumulado += n
+            lines.append(sample(f"{self.name}_bucket", acumulado, dict(labels, le=format_value(float(bound)))))
+        lines.append(sample(f"{self.name}_sum", total, labels))
+        lines.append(sample(f"{self.name}_count", count, labels))
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]):
+        """`collector()` devolve linhas já formatadas (use `header`/`sample`)."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as exc:
+                logger.error("Erro no coletor de métricas %s: %s", getattr(collector, "__name__", collector), exc)
+        return "\n".join(lines) + "\n"
+
+
+def metrics_dir() -> str:
+    from config_manager import config_manager
+    return config_manager.get("metricas_dir", "metrics")
+
+
+def read_textfiles(directory: Optional[str] = None) -> List[str]:
+    """
+    Linhas dos arquivos .prom gravados pelos daemons, agrupadas por família: cada daemon
+    repete HELP/TYPE das mesmas métricas, e o formato só aceita uma vez por família.
+    """
+    directory = directory or metrics_dir()
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.prom"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read().splitlines()
+        except OSError as exc:
+            logger.warning("Não foi possível ler %s: %s", path, exc)
+            continue
+        family = None
+        for line in content:
+            if not line.strip():
+                continue
+            if line.startswith("# "):
+                parts = line.split(" ", 3)
+                if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+                    family = parts[2]
+                    known = headers.setdefault(family, [])
+                    samples.setdefault(family, [])
+                    if not any(h.startswith(f"# {parts[1]} ") for h in known):
+                        known.append(line)
+                continue
+            samples.setdefault(family or "", []).append(line)
+    lines: List[str] = []
+    for family, family_samples in samples.items():
+        lines.extend(headers.get(family, []))
+        lines.extend(family_samples)
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# Daemons de sincronização
+# ---------------------------------------------------------------------------
+class SyncMetrics:
+    """
+    Métricas de um daemon de sincronização, regravadas em arquivo a cada ciclo:
+
+        metrics = SyncMetrics("sync_ctp_gravacao")
+        with metrics.cycle():
+            ...
+            metrics.rows_read(len(jobs), fonte="xml")
+            metrics.rows_written(inseridos, destino="mysql")
+
+    Daemons que tratam os próprios erros dentro do ciclo chamam `metrics.cycle_failed()`
+    para que o ciclo conte em sagra_sync_cycle_errors_total mesmo sem exceção.
+    """
+
+    def __init__(self, daemon: str, directory: Optional[str] = None):
+        self.daemon = daemon
+        self.directory = directory
+        self.registry = MetricsRegistry()
+        labels = ("daemon",)
+        self._duration = self.registry.histogram(
+            "sagra_sync_cycle_duration_seconds", "Duração dos ciclos de sincronização", labels, SYNC_BUCKETS)
+        self._last_duration = self.registry.gauge(
+            "sagra_sync_last_cycle_duration_seconds", "Duração do último ciclo", labels)
+        self._last_end = self.registry.gauge(
+            "sagra_sync_last_cycle_timestamp_seconds", "Fim do último ciclo (epoch)", labels)
+        self._cycles = self.registry.counter(
+            "sagra_sync_cycles_total", "Ciclos de sincronização executados", labels)
+        self._errors = self.registry.counter(
+            "sagra_sync_cycle_errors_total", "Ciclos encerrados com erro", labels)
+        self._read = self.registry.counter(
+            "sagra_sync_rows_read_total", "Linhas lidas das fontes", ("daemon", "fonte"))
+        self._written = self.registry.counter(
+            "sagra_sync_rows_written_total", "Linhas gravadas nos destinos", ("daemon", "destino"))
+        # Erro já contado no ciclo atual (cycle_failed seguido de exceção conta uma vez)
+        self._cycle_failed = False
+
+    def rows_read(self, count: int, fonte: str = ""):
+        if count:
+            self._read.inc(count, daemon=self.daemon, fonte=fonte)
+
+    def rows_written(self, count: int, destino: str = ""):
+        if count:
+            self._written.inc(count, daemon=self.daemon, destino=destino)
+
+    def cycle_failed(self):
+        """Marca o ciclo atual como falho (erro tratado pelo próprio daemon)."""
+        if not self._cycle_failed:
+            self._cycle_failed = True
+            self._errors.inc(daemon=self.daemon)
+
+    @contextmanager
+    def cycle(self):
+        start = time.perf_counter()
+        self._cycle_failed = False
+        try:
+            yield self
+        except BaseException:
+            self.cycle_failed()
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self._duration.observe(elapsed, daemon=self.daemon)
+            self._last_duration.set(elapsed, daemon=self.daemon)
+            self._last_end.set(time.time(), daemon=self.daemon)
+            self._cycles.inc(daemon=self.daemon)
+            self.flush()
+
+    def flush(self):
+        """Grava o arquivo .prom (tmp + os.replace, para o scrape nunca ler pela metade)."""
+        try:
+            directory = self.directory or metrics_dir()
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{self.daemon}.prom")
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.registry.render())
+            os.replace(tmp, path)
+        except Exception as exc:
+            logger.warning("Não foi possível gravar métricas de %s: %s", self.daemon, exc)
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "sagra_http_requests_total", "Requisições HTTP atendidas", ("method", "route", "status"))
+http_latency = registry.histogram(
+    "sagra_http_request_duration_seconds", "Latência das requisições HTTP", ("method", "route"))
+http_in_progress = registry.gauge(
+    "sagra_http_requests_in_progress", "Requisições HTTP em andamento")
@@ -12,6 +12,7 @@ import mysql.connector
 import re
 from datetime import datetime
 import sys
+from metrics_service import SyncMetrics
 
 # Configuração do Banco de Dados
 DB_HOST = 'localhost'
@@ -23,6 +24,8 @@ class SimpleFileMonitor:
     def __init__(self, file_paths, interval=2):
         self.file_paths = file_paths
         self.interval = interval
+        # Métricas por ciclo (metrics/monitorxml.prom -> GET /metrics da API)
+        self.metrics = SyncMetrics("monitorxml")
         
         print(f"[{datetime.now()}] Iniciando monitoramento OTIMIZADO (SYNC FORÇADO) a cada {interval} segundos...")
         print(f"Arquivos monitorados: {file_paths}")
@@ -236,6 +239,7 @@ class SimpleFileMonitor:
             conn.commit()
             cursor.close()
             conn.close()
+            self.metrics.rows_written(len(processed_keys), destino="xpose_tickets")
             
         except mysql.connector.Error as err:
             self.log(f"Erro MySQL: {err}")
@@ -294,19 +298,21 @@ class SimpleFileMonitor:
         
         try:
             while True:
-                for file_path in self.file_paths:
-                    content = self.get_file_content(file_path)
-                    
-                    if content:
-                        tickets = self.parse_xml_content(content)
-                        self.sync_to_db(tickets, file_path)
-                        # self.log(f"Sync forçado OK para {os.path.basename(file_path)}")
-                    else:
-                        # Se arquivo não existe ou erro, sync vazio p/ limpar? 
-                        # Melhor evitar limpar agressivamente se for erro de leitura intermitente.
-                        # Só limpa se arquivo REALMENTE não existir.
-                        if not os.path.exists(file_path):
-                             self.sync_to_db([], file_path)
+                with self.metrics.cycle():
+                    for file_path in self.file_paths:
+                        content = self.get_file_content(file_path)
+
+                        if content:
+                            tickets = self.parse_xml_content(content)
+                            self.metrics.rows_read(len(tickets), fonte="xml")
+                            self.sync_to_db(tickets, file_path)
+                            # self.log(f"Sync forçado OK para {os.path.basename(file_path)}")
+                        else:
+                            # Se arquivo não existe ou erro, sync vazio p/ limpar?
+                            # Melhor evitar limpar agressivamente se for erro de leitura intermitente.
+                            # Só limpa se arquivo REALMENTE não existir.
+                            if not os.path.exists(file_path):
+                                 self.sync_to_db([], file_path)
 
                 time.sleep(self.interval)
                 
@@ -0,0 +1,256 @@
+"""
+Índice invertido em memória para a busca textual de OS (título, solicitante, órgão, produto).
+
+Os textos vêm de tab_os_status_atual e são normalizados com `remover_acentos` + maiúsculas,
+a mesma regra usada em auxiliar_routes, então "acao" encontra "Ação". Cada termo da busca
+casa por prefixo de palavra (bisect na lista ordenada de tokens), e todos os termos precisam
+casar (AND).
+
+Atualização:
+- incremental a cada `busca_indice_intervalo_segundos`, pelas linhas com atualizado_em
+  maior ou igual à última marca lida;
+- recarga completa a cada `busca_indice_recarga_segundos` (remove OSs que saíram da projeção).
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from config_manager import config_manager
+from database import db
+from os_status_service import TABLE_NAME, ensure_os_status_table
+from routers.auxiliar_routes import remover_acentos
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ("titulo", "solicitante", "orgao", "produto")
+
+# Peso de cada campo no modo por relevância
+FIELD_WEIGHTS = {"titulo": 3.0, "solicitante": 2.0, "orgao": 2.0, "produto": 1.0}
+
+_TOKEN_RE = re.compile(r"[A-Z0-9]+")
+
+OsKey = Tuple[int, int]
+
+
+def normalizar_texto(texto: Optional[str]) -> str:
+    if not texto:
+        return ""
+    return remover_acentos(str(texto)).upper().strip()
+
+
+def tokenizar(texto: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(normalizar_texto(texto))
+
+
+class OsSearchIndex:
+    def __init__(self, intervalo: float = 5.0, recarga: float = 3600.0):
+        self.intervalo = intervalo
+        self.recarga = recarga
+        self._lock = threading.Lock()
+        # (nro, ano) -> {campo: valor original}
+        self._docs: Dict[OsKey, Dict[str, str]] = {}
+        # campo -> token -> chaves
+        self._postings: Dict[str, Dict[str, Set[OsKey]]] = {campo: {} for campo in SEARCH_FIELDS}
+        # campo -> tokens ordenados (recalculado sob demanda)
+        self._sorted_tokens: Dict[str, Optional[List[str]]] = {campo: None for campo in SEARCH_FIELDS}
+        self._high_water = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+
+    # ------------------------------------------------------------------
+    # Manutenção
+    # ------------------------------------------------------------------
+    def _add_doc(self, key: OsKey, valores: Dict[str, str]):
+        self._docs[key] = valores
+        for campo in SEARCH_FIELDS:
+            postings = self._postings[campo]
+            for token in set(tokenizar(valores.get(campo))):
+                bucket = postings.get(token)
+                if bucket is None:
+                    postings[token] = {key}
+                    self._sorted_tokens[campo] = None
+                else:
+                    bucket.add(key)
+
+    def _remove_doc(self, key: OsKey):
+        antigos = self._docs.pop(key, None)
+        if not antigos:
+            return
+        for campo in SEARCH_FIELDS:
+            postings = self._postings[campo]
+            for token in set(tokenizar(antigos.get(campo))):
+                bucket = postings.get(token)
+                if bucket is None:
+                    continue
+                bucket.discard(key)
+                if not bucket:
+                    del postings[token]
+                    self._sorted_tokens[campo] = None
+
+    @staticmethod
+    def _row_values(row) -> Dict[str, str]:
+        return {campo: row.get(campo) or "" for campo in SEARCH_FIELDS}
+
+    def _fetch(self, desde=None):
+        query = f"SELECT nro_os, ano, titulo, solicitante, orgao, produto, atualizado_em FROM {TABLE_NAME}"
+        params = None
+        if desde is not None:
+            query += " WHERE atualizado_em >= %s"
+            params = (desde,)
+        return db.execute_query(query, params)
+
+    def reload(self):
+        ensure_os_status_table()
+        rows = self._fetch()
+        novo = OsSearchIndex(self.intervalo, self.recarga)
+        high_water = None
+        for row in rows:
+            novo._add_doc((int(row['nro_os']), int(row['ano'])), self._row_values(row))
+            if row.get('atualizado_em') and (high_water is None or row['atualizado_em'] > high_water):
+                high_water = row['atualizado_em']
+
+        with self._lock:
+            self._docs = novo._docs
+            self._postings = novo._postings
+            self._sorted_tokens = novo._sorted_tokens
+            self._high_water = high_water
+            self._loaded_at = self._checked_at = time.time()
+        logger.info("Índice de busca de OS carregado: %d OSs", len(rows))
+
+    def _refresh_incremental(self):
+        rows = self._fetch(self._high_water)
+        with self._lock:
+            for row in rows:
+                key = (int(row['nro_os']), int(row['ano']))
+                self._remove_doc(key)
+                self._add_doc(key, self._row_values(row))
+                if row.get('atualizado_em') and (self._high_water is None or row['atualizado_em'] > self._high_water):
+                    self._high_water = row['atualizado_em']
+            self._checked_at = time.time()
+
+    def _ensure_fresh(self):
+        agora = time.time()
+        if not self._loaded_at or agora - self._loaded_at > self.recarga:
+            try:
+                self.reload()
+            except Exception as e:
+                # Mantém o índice anterior (se houver) e tenta de novo no próximo intervalo
+                logger.error(f"Erro ao carregar índice de busca de OS: {e}")
+                if not self._loaded_at:
+                    raise
+                self._loaded_at = agora - self.recarga + self.intervalo
+            return
+
+        if agora - self._checked_at > self.intervalo:
+            try:
+                self._refresh_incremental()
+            except Exception as e:
+                logger.error(f"Erro ao atualizar índice de busca de OS: {e}")
+                self._checked_at = agora
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def _tokens_for(self, campo: str) -> List[str]:
+        tokens = self._sorted_tokens[campo]
+        if tokens is None:
+            tokens = sorted(self._postings[campo])
+            self._sorted_tokens[campo] = tokens
+        return tokens
+
+    def _match_term(self, campo: str, termo: str) -> Dict[OsKey, bool]:
+        """OSs cujo campo tem palavra começando com `termo` -> True se alguma palavra é exatamente o termo."""
+        tokens = self._tokens_for(campo)
+        postings = self._postings[campo]
+        resultado: Dict[OsKey, bool] = {}
+        i = bisect.bisect_left(tokens, termo)
+        while i < len(tokens) and tokens[i].startswith(termo):
+            exato = tokens[i] == termo
+            for key in postings[tokens[i]]:
+                if exato or key not in resultado:
+                    resultado[key] = exato
+            i += 1
+        return resultado
+
+    def search(self, campos: Dict[str, str], texto_livre: Optional[str] = None) -> Optional[Dict[OsKey, float]]:
+        """
+        Retorna {(nro, ano): relevância} para as OSs que casam com todos os filtros, ou None
+        se nenhum filtro textual tiver termos válidos.
+
+        `campos`: filtros por campo (ex.: {"titulo": "ação"}); `texto_livre`: busca em todos os campos.
+        """
+        consultas = [(campo, tokenizar(valor)) for campo, valor in campos.items() if valor]
+        termos_livres = tokenizar(texto_livre)
+        if not any(termos for _, termos in consultas) and not termos_livres:
+            return None
+
+        self._ensure_fresh()
+        with self._lock:
+            scores: Optional[Dict[OsKey, float]] = None
+
+            def intersect(parcial: Dict[OsKey, float]):
+                nonlocal scores
+                if scores is None:
+                    scores = parcial
+                else:
+                    scores = {key: scores[key] + valor for key, valor in parcial.items() if key in scores}
+
+            for campo, termos in consultas:
+                for termo in termos:
+                    peso = FIELD_WEIGHTS[campo]
+                    matches = self._match_term(campo, termo)
+                    intersect({key: peso * (1.0 if exato else 0.5) for key, exato in matches.items()})
+                    if not scores:
+                        return {}
+
+            for termo in termos_livres:
+                parcial: Dict[OsKey, float] = {}
+                for campo in SEARCH_FIELDS:
+                    peso = FIELD_WEIGHTS[campo]
+                    for key, exato in self._match_term(campo, termo).items():
+                        parcial[key] = parcial.get(key, 0.0) + peso * (1.0 if exato else 0.5)
+                intersect(parcial)
+                if not scores:
+                    return {}
+
+            return scores or {}
+
+    def autocomplete(self, prefixo: str, campo: Optional[str] = None, limit: int = 10) -> List[dict]:
+        """
+        Sugestões para a caixa de busca: valores distintos do(s) campo(s) cujas palavras começam
+        com os termos digitados (o último termo pode estar incompleto), mais frequentes primeiro.
+        """
+        termos = tokenizar(prefixo)
+        if not termos:
+            return []
+        campos = [campo] if campo else list(SEARCH_FIELDS)
+
+        self._ensure_fresh()
+        with self._lock:
+            contagem: Dict[Tuple[str, str], int] = {}
+            for nome in campos:
+                chaves: Optional[Set[OsKey]] = None
+                for termo in termos:
+                    encontrados = set(self._match_term(nome, termo))
+                    chaves = encontrados if chaves is None else chaves & encontrados
+                    if not chaves:
+                        break
+                for key in chaves or ():
+                    valor = self._docs[key].get(nome)
+                    if valor:
+                        contagem[(nome, valor)] = contagem.get((nome, valor), 0) + 1
+
+        ordenado = sorted(contagem.items(), key=lambda item: (-item[1], item[0][1]))
+        return [
+            {"campo": nome, "valor": valor, "ocorrencias": total}
+            for (nome, valor), total in ordenado[:limit]
+        ]
+
+
+os_search_index = OsSearchIndex(
+    intervalo=float(config_manager.get("busca_indice_intervalo_segundos", 5)),
+    recarga=float(config_manager.get("busca_indice_recarga_segundos", 3600)),
+)
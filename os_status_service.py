@@ -0,0 +1,201 @@
+"""
+Projeção materializada do andamento atual de cada OS (tab_os_status_atual).
+
+Uma linha por OS com a situação/setor do andamento com UltimoStatus = 1 e os
+campos de tabProtocolos/tabDetalhesServico usados pelos painéis. As rotas de
+leitura (busca, painel, fila PCP, pendências) consultam esta tabela em vez do
+JOIN tabProtocolos × tabDetalhesServico × tabAndamento.
+
+Os caminhos de escrita chamam `refresh_os_status(cursor, pares)` dentro da
+própria transação. As funções recebem um cursor (PyMySQL ou mysql.connector)
+para que os scripts de sincronização possam usá-las sem importar `database`.
+"""
+import logging
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "tab_os_status_atual"
+
+_table_ready = False
+
+# Bucket de prioridade (Prometido p/ = 0, Solicitado p/ = 1, demais = 2), gravado em
+# prioridade_rank para que a ordenação das filas venha direto do índice.
+PRIORITY_RANK_SQL = """
+        CASE
+            WHEN p.EntregPrazoLink LIKE '%%Prometido p/%%' THEN 0
+            WHEN p.EntregPrazoLink LIKE '%%Solicitado p/%%' THEN 1
+            ELSE 2
+        END"""
+
+_CREATE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+    nro_os INT NOT NULL,
+    ano INT NOT NULL,
+    cod_status VARCHAR(50),
+    situacao VARCHAR(120),
+    setor VARCHAR(120),
+    data_andamento DATETIME NULL,
+    observacao TEXT,
+    prioridade VARCHAR(255),
+    prioridade_rank TINYINT NOT NULL DEFAULT 2,
+    data_entrega DATETIME NULL,
+    titulo TEXT,
+    produto VARCHAR(255),
+    solicitante VARCHAR(255),
+    orgao VARCHAR(100),
+    tiragem VARCHAR(100),
+    atualizado_em DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (nro_os, ano),
+    INDEX idx_setor_situacao (setor, situacao),
+    INDEX idx_situacao (situacao),
+    INDEX idx_data_entrega (data_entrega),
+    INDEX idx_prioridade_ordem (prioridade_rank, data_entrega, ano DESC, nro_os DESC),
+    INDEX idx_setor_prioridade_ordem (setor, prioridade_rank, data_entrega, ano DESC, nro_os DESC),
+    INDEX idx_atualizado_em (atualizado_em)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+"""
+
+_COLUMNS = (
+    "nro_os, ano, cod_status, situacao, setor, data_andamento, observacao, "
+    "prioridade, prioridade_rank, data_entrega, titulo, produto, solicitante, orgao, tiragem"
+)
+
+_SELECT_SQL = f"""
+    SELECT
+        p.NroProtocolo, p.AnoProtocolo, a.CodStatus, a.SituacaoLink, a.SetorLink, a.Data, a.`Observaçao`,
+        p.EntregPrazoLink, {PRIORITY_RANK_SQL}, p.EntregData, d.Titulo, d.TipoPublicacaoLink, p.NomeUsuario, p.SiglaOrgao,
+        d.Tiragem
+    FROM tabProtocolos AS p
+    JOIN tabAndamento AS a
+        ON (p.NroProtocolo = a.NroProtocoloLink AND p.AnoProtocolo = a.AnoProtocoloLink)
+    LEFT JOIN tabDetalhesServico AS d
+        ON (p.NroProtocolo = d.NroProtocoloLinkDet AND p.AnoProtocolo = d.AnoProtocoloLinkDet)
+    WHERE a.UltimoStatus = 1
+"""
+
+_UPSERT_SUFFIX = """
+    ON DUPLICATE KEY UPDATE
+        cod_status = VALUES(cod_status), situacao = VALUES(situacao), setor = VALUES(setor),
+        data_andamento = VALUES(data_andamento), observacao = VALUES(observacao),
+        prioridade = VALUES(prioridade), prioridade_rank = VALUES(prioridade_rank), data_entrega = VALUES(data_entrega), titulo = VALUES(titulo),
+        produto = VALUES(produto), solicitante = VALUES(solicitante), orgao = VALUES(orgao), tiragem = VALUES(tiragem)
+"""
+
+
+def _is_empty(cursor) -> bool:
+    cursor.execute(f"SELECT 1 FROM {TABLE_NAME} LIMIT 1")
+    return cursor.fetchone() is None
+
+
+# Colunas adicionadas depois da primeira versão da tabela: (coluna, cláusulas do ALTER TABLE)
+_MIGRATIONS = [
+    ("prioridade_rank", """
+            ADD COLUMN prioridade_rank TINYINT NOT NULL DEFAULT 2 AFTER prioridade,
+            ADD INDEX idx_prioridade_ordem (prioridade_rank, data_entrega, ano DESC, nro_os DESC),
+            ADD INDEX idx_setor_prioridade_ordem (setor, prioridade_rank, data_entrega, ano DESC, nro_os DESC)"""),
+    ("orgao", """
+            ADD COLUMN orgao VARCHAR(100) AFTER solicitante,
+            ADD INDEX idx_atualizado_em (atualizado_em)"""),
+]
+
+
+def _migrate_columns(cursor) -> bool:
+    """Aplica as migrações pendentes; retorna True se alguma coluna foi criada (exige recarga)."""
+    cursor.execute(
+        "SELECT COLUMN_NAME AS coluna FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (TABLE_NAME,),
+    )
+    existentes = {(row['coluna'] if isinstance(row, dict) else row[0]).lower() for row in cursor.fetchall()}
+
+    migrou = False
+    for coluna, clausulas in _MIGRATIONS:
+        if coluna in existentes:
+            continue
+        cursor.execute(f"ALTER TABLE {TABLE_NAME} {clausulas}")
+        logger.info("Coluna %s adicionada em %s", coluna, TABLE_NAME)
+        migrou = True
+    return migrou
+
+
+def ensure_os_status_table(cursor=None):
+    """Garante que a projeção existe; na primeira criação (tabela vazia) faz a carga completa."""
+    global _table_ready
+    if _table_ready:
+        return
+
+    if cursor is None:
+        from database import db
+        with db.cursor() as db_cursor:
+            ensure_os_status_table(db_cursor)
+        return
+
+    cursor.execute(_CREATE_SQL)
+    if _migrate_columns(cursor) or _is_empty(cursor):
+        rebuild_os_status(cursor)
+        logger.info("Projeção %s carregada", TABLE_NAME)
+    _table_ready = True
+
+
+def _delete_stale(cursor, filtro: str = "", params=None):
+    """Remove da projeção as OSs sem andamento atual (ou sem protocolo), opcionalmente filtradas."""
+    cursor.execute(
+        f"""
+        DELETE st FROM {TABLE_NAME} AS st
+        LEFT JOIN tabProtocolos AS p
+            ON (p.NroProtocolo = st.nro_os AND p.AnoProtocolo = st.ano)
+        LEFT JOIN tabAndamento AS a
+            ON (a.NroProtocoloLink = st.nro_os AND a.AnoProtocoloLink = st.ano AND a.UltimoStatus = 1)
+        WHERE (p.NroProtocolo IS NULL OR a.CodStatus IS NULL){filtro}
+        """,
+        params,
+    )
+
+
+def refresh_os_status(cursor, pairs: Iterable[Tuple[int, int]]):
+    """
+    Recalcula a projeção para as OSs (nro, ano) informadas.
+
+    Deve ser chamada depois das escritas em tabAndamento/tabProtocolos/tabDetalhesServico,
+    preferencialmente no mesmo cursor/transação. Primeiro grava (upsert) as OSs com
+    andamento atual e só depois remove as que ficaram sem: se um comando falhar, a linha
+    antiga permanece (nunca some da projeção).
+    """
+    pairs = list({(int(nro), int(ano)) for nro, ano in pairs})
+    if not pairs:
+        return
+
+    placeholders = ", ".join(["(%s, %s)"] * len(pairs))
+    flat = [v for pair in pairs for v in pair]
+
+    cursor.execute(
+        f"INSERT INTO {TABLE_NAME} ({_COLUMNS}) {_SELECT_SQL}"
+        f" AND (p.NroProtocolo, p.AnoProtocolo) IN ({placeholders}) {_UPSERT_SUFFIX}",
+        flat,
+    )
+    _delete_stale(cursor, f" AND (st.nro_os, st.ano) IN ({placeholders})", flat)
+
+
+def safe_refresh_os_status(cursor, pairs: Iterable[Tuple[int, int]]):
+    """
+    Versão tolerante a falhas para os caminhos de escrita da API: um erro na projeção
+    não deve desfazer o andamento do usuário. O MySQL reverte só o comando que falhou e,
+    pela ordem de refresh_os_status, a OS fica no máximo com a linha anterior (desatualizada
+    até a próxima escrita ou recarga), nunca fora da projeção.
+    """
+    try:
+        refresh_os_status(cursor, pairs)
+    except Exception as exc:
+        logger.error("Erro atualizando %s para %s: %s", TABLE_NAME, list(pairs), exc)
+
+
+def rebuild_os_status(cursor):
+    """
+    Recalcula toda a projeção a partir das tabelas de origem (uso em importações/sincronizações
+    em massa). Upsert de todas as OSs seguido da remoção das que ficaram sem andamento atual:
+    a tabela nunca fica vazia para os painéis durante a recarga, mesmo em autocommit, e uma
+    falha deixa o conteúdo anterior.
+    """
+    cursor.execute(f"INSERT INTO {TABLE_NAME} ({_COLUMNS}) {_SELECT_SQL} {_UPSERT_SUFFIX}")
+    _delete_stale(cursor)
@@ -5,6 +5,9 @@ const API_BASE_URL = `http://${hostname}:8001/api`;
 
 let currentSector = localStorage.getItem('sagra_panel_sector');
 let refreshInterval = null;
+let panelSocket = null;
+let deltaReloadTimer = null;
+let panelTopics = [];
 
 document.addEventListener('DOMContentLoaded', () => {
     initPanel();
@@ -30,7 +33,64 @@ function initPanel() {
 
 function startAutoRefresh() {
     if (refreshInterval) clearInterval(refreshInterval);
-    refreshInterval = setInterval(loadPanelData, 10000);
+    // Com o feed de mudanças (WebSocket) o polling vira apenas garantia; sem ele, 10s
+    const connected = panelSocket && panelSocket.readyState === WebSocket.OPEN;
+    refreshInterval = setInterval(loadPanelData, connected ? 60000 : 10000);
+    if (!panelSocket) startPanelWebSocket();
+}
+
+// Assina apenas os deltas do setor exibido (tópico "setor:<SETOR>")
+function subscribePanelTopics() {
+    if (!panelSocket || panelSocket.readyState !== WebSocket.OPEN || !currentSector) return;
+    const topics = [`setor:${currentSector}`];
+    if (panelTopics.length) {
+        panelSocket.send(JSON.stringify({ type: 'unsubscribe', topics: panelTopics }));
+    }
+    panelSocket.send(JSON.stringify({ type: 'subscribe', topics }));
+    panelTopics = topics;
+}
+
+function startPanelWebSocket() {
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const wsUrl = `${protocol}//${hostname}:8001/ws`;
+
+    try {
+        panelSocket = new WebSocket(wsUrl);
+    } catch (e) {
+        console.error("WS Painel:", e);
+        panelSocket = null;
+        return;
+    }
+
+    panelSocket.onopen = () => {
+        panelTopics = [];
+        subscribePanelTopics();
+        startAutoRefresh();
+    };
+
+    panelSocket.onmessage = (event) => {
+        try {
+            const data = JSON.parse(event.data);
+            let afeta = false;
+            if (data.type === 'os_delta') {
+                afeta = (data.changes || []).some(c => c.setor === currentSector || c.setor_anterior === currentSector);
+            } else if (data.type === 'system_update') {
+                afeta = !data.setores || data.setores.includes(currentSector);
+            }
+            if (afeta) {
+                // Agrupa rajadas de deltas em uma única recarga
+                clearTimeout(deltaReloadTimer);
+                deltaReloadTimer = setTimeout(loadPanelData, 300);
+            }
+        } catch (e) { console.error("WS Painel:", e); }
+    };
+
+    panelSocket.onclose = () => {
+        panelSocket = null;
+        if (refreshInterval) clearInterval(refreshInterval);
+        refreshInterval = setInterval(loadPanelData, 10000);
+        setTimeout(startPanelWebSocket, 5000);
+    };
 }
 
 function updateTitle(sector) {
@@ -193,6 +253,7 @@ function saveConfig() {
         localStorage.setItem('sagra_panel_sector', val);
         updateTitle(val);
         loadPanelData();
+        subscribePanelTopics();
         startAutoRefresh();
         closeConfigModal();
     } else {
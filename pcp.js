@@ -248,6 +248,8 @@ createApp({
 
                     wsInstance.onopen = () => {
                         wsStatus.value = 'connected';
+                        // Filas PCP + deltas de OS (filtrados aqui pelos setores selecionados)
+                        wsInstance.send(JSON.stringify({ type: 'subscribe', topics: ['pcp', 'os'] }));
                         if (reconnectTimer) {
                             clearTimeout(reconnectTimer);
                             reconnectTimer = null;
@@ -264,7 +266,21 @@ createApp({
                     wsInstance.onmessage = (event) => {
                         try {
                             const data = JSON.parse(event.data);
-                            if (data.type === 'pcp_queue_update' || data.type === 'system_update') {
+                            if (data.type === 'os_delta') {
+                                // Deltas do feed de mudanças: recarrega apenas as filas afetadas
+                                const afetados = new Set();
+                                (data.changes || []).forEach((c) => {
+                                    if (c.setor) afetados.add(c.setor);
+                                    if (c.setor_anterior) afetados.add(c.setor_anterior);
+                                });
+                                selectedSetores.value
+                                    .filter((s) => afetados.has(s))
+                                    .forEach((s) => refreshQueue(s));
+                            } else if (data.type === 'pcp_delta') {
+                                if (data.setor && selectedSetores.value.includes(data.setor)) {
+                                    refreshQueue(data.setor);
+                                }
+                            } else if (data.type === 'pcp_queue_update' || data.type === 'system_update') {
                                 if (data.setor && selectedSetores.value.includes(data.setor)) {
                                     refreshQueue(data.setor);
                                 } else {
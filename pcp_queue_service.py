@@ -1,6 +1,7 @@
 import logging
 from typing import List, Tuple
 from database import db
+from os_status_service import ensure_os_status_table
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +39,7 @@ def validate_os_in_setor(setor: str, pairs: List[Tuple[int, int]], allowed_situa
         return set()
 
     ensure_pcp_table()
+    ensure_os_status_table()
     target_setor = base_setor or setor
     placeholders = ", ".join(["(%s, %s)"] * len(pairs))
     flat_values: List[int] = []
@@ -48,19 +50,16 @@ def validate_os_in_setor(setor: str, pairs: List[Tuple[int, int]], allowed_situa
     situacao_params: List[str] = []
     if allowed_situacoes:
         situacao_placeholders = ", ".join(["%s"] * len(allowed_situacoes))
-        situacao_filter = f" AND a.SituacaoLink IN ({situacao_placeholders})"
+        situacao_filter = f" AND st.situacao IN ({situacao_placeholders})"
         situacao_params = list(allowed_situacoes)
 
     query = f"""
-    SELECT p.NroProtocolo AS nr_os, p.AnoProtocolo AS ano
-    FROM tabProtocolos AS p
-    JOIN tabAndamento AS a
-        ON (p.NroProtocolo = a.NroProtocoloLink AND p.AnoProtocolo = a.AnoProtocoloLink)
-    WHERE a.UltimoStatus = 1
-      AND a.SetorLink = %s
-      AND a.SituacaoLink NOT IN ('Entregue', 'Cancelada', 'Cancelado')
+    SELECT st.nro_os AS nr_os, st.ano AS ano
+    FROM tab_os_status_atual AS st
+    WHERE st.setor = %s
+      AND st.situacao NOT IN ('Entregue', 'Cancelada', 'Cancelado')
       {situacao_filter}
-      AND (p.NroProtocolo, p.AnoProtocolo) IN ({placeholders})
+      AND (st.nro_os, st.ano) IN ({placeholders})
     """
     params = [target_setor] + situacao_params + flat_values
     rows = db.execute_query(query, params)
@@ -0,0 +1,132 @@
+"""
+Rotas de diagnóstico do servidor (pool de conexões, cache de consultas e afins)
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from database import WAIT_BUCKETS_MS, db
+from admission_service import admission_controller
+from metrics_service import header, read_textfiles, registry, sample
+from routers.realtime import manager
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# --- Coletores do /metrics (leem os stats existentes na hora do scrape) ---
+def _pool_metrics():
+    stats = db.pool.stats()
+    lines = []
+    for name, key, help_text in (
+        ("sagra_db_pool_in_use", "in_use", "Conexões emprestadas"),
+        ("sagra_db_pool_idle", "idle", "Conexões ociosas no pool"),
+        ("sagra_db_pool_waiting", "waiting", "Threads aguardando conexão"),
+        ("sagra_db_pool_max", "max_connections", "Limite de conexões do pool"),
+    ):
+        lines += header(name, "gauge", help_text) + [sample(name, stats[key])]
+    for name, key, help_text in (
+        ("sagra_db_pool_connections_created_total", "created", "Conexões abertas"),
+        ("sagra_db_pool_timeouts_total", "timeouts", "Esperas que estouraram o timeout"),
+        ("sagra_db_pool_reconnects_total", "reconnects", "Conexões mortas substituídas"),
+    ):
+        lines += header(name, "counter", help_text) + [sample(name, stats[key])]
+
+    name = "sagra_db_pool_wait_seconds"
+    lines += header(name, "histogram", "Espera por uma conexão do pool")
+    acumulado = 0
+    bounds = [ms / 1000.0 for ms in WAIT_BUCKETS_MS] + [float("inf")]
+    for bound, count in zip(bounds, stats["wait_ms"]["histogram"].values()):
+        acumulado += count
+        lines.append(sample(f"{name}_bucket", acumulado, {"le": "+Inf" if bound == float("inf") else repr(bound)}))
+    lines.append(sample(f"{name}_sum", stats["wait_ms"]["avg"] * stats["borrows"] / 1000.0))
+    lines.append(sample(f"{name}_count", stats["borrows"]))
+    return lines
+
+
+def _websocket_metrics():
+    stats = manager.stats()
+    lines = []
+    for name, key, help_text in (
+        ("sagra_ws_connections", "connections", "Conexões WebSocket abertas"),
+        ("sagra_ws_queue_depth", "queue_depth_total", "Mensagens aguardando envio (todas as conexões)"),
+        ("sagra_ws_queue_depth_max", "queue_depth_max", "Maior fila de envio entre as conexões"),
+    ):
+        lines += header(name, "gauge", help_text) + [sample(name, stats[key])]
+    for name, key, help_text in (
+        ("sagra_ws_broadcasts_total", "messages_broadcast", "Mensagens publicadas"),
+        ("sagra_ws_messages_sent_total", "sent", "Mensagens entregues"),
+        ("sagra_ws_messages_dropped_total", "dropped", "Mensagens descartadas por estouro de fila"),
+        ("sagra_ws_messages_coalesced_total", "coalesced", "Mensagens substituídas por outra mais recente"),
+        ("sagra_ws_overflows_total", "overflows", "Estouros de fila (cliente recebe system_update)"),
+    ):
+        lines += header(name, "counter", help_text) + [sample(name, stats[key])]
+    return lines
+
+
+def _cache_metrics():
+    stats = db.query_cache.stats()
+    lines = header("sagra_db_cache_entries", "gauge", "Entradas no cache de consultas")
+    lines.append(sample("sagra_db_cache_entries", stats["entries"]))
+    for name, key, help_text in (
+        ("sagra_db_cache_invalidations_total", "invalidations", "Invalidações por escrita"),
+        ("sagra_db_cache_evictions_total", "evictions", "Entradas removidas pelo limite do LRU"),
+    ):
+        lines += header(name, "counter", help_text) + [sample(name, stats[key])]
+    for field, help_text in (("hits", "Leituras atendidas pelo cache"), ("misses", "Leituras que foram ao banco")):
+        name = f"sagra_db_cache_{field}_total"
+        lines += header(name, "counter", help_text)
+        lines += [sample(name, counters[field], {"query": query}) for query, counters in sorted(stats["queries"].items())]
+    return lines
+
+
+def _admission_metrics():
+    stats = admission_controller.stats()
+    lines = []
+    for name, key, kind, help_text in (
+        ("sagra_admission_active", "ativas", "gauge", "Requisições em execução por classe"),
+        ("sagra_admission_waiting", "aguardando", "gauge", "Requisições na fila por classe"),
+        ("sagra_admission_admitted_total", "admitidas", "counter", "Requisições admitidas"),
+        ("sagra_admission_rejected_queue_full_total", "rejeitadas_fila_cheia", "counter", "Recusas por fila cheia"),
+        ("sagra_admission_rejected_timeout_total", "rejeitadas_prazo", "counter", "Recusas por prazo na fila"),
+    ):
+        lines += header(name, kind, help_text)
+        lines += [sample(name, gate[key], {"classe": classe}) for classe, gate in stats.items()]
+    return lines
+
+
+for _collector in (_pool_metrics, _websocket_metrics, _cache_metrics, _admission_metrics):
+    registry.add_collector(_collector)
+registry.add_collector(read_textfiles)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Métricas da API e dos daemons de sincronização no formato texto do Prometheus"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/api/admin/db/pool")
+def get_pool_stats():
+    """Estado do pool MySQL: em uso, ociosas, espera (histograma), timeouts e reconexões"""
+    return db.pool.stats()
+
+
+@router.get("/api/admin/db/cache")
+def get_query_cache_stats():
+    """Cache de consultas: entradas, hits/misses por consulta e versões das tabelas"""
+    return db.query_cache.stats()
+
+
+@router.post("/api/admin/db/cache/clear")
+def clear_query_cache():
+    """Descarta todas as entradas do cache de consultas (ex.: após carga manual no banco)"""
+    db.query_cache.clear()
+    return {"status": "ok"}
+
+
+@router.get("/api/admin/admission")
+def get_admission_stats():
+    """Controle de admissão por classe de rota: ativas, aguardando e recusas"""
+    return admission_controller.stats()
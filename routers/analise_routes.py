@@ -14,6 +14,7 @@ import shutil
 import json
 import glob
 from .andamento_helpers import format_andamento_obs, format_ponto
+from os_status_service import safe_refresh_os_status
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import StreamingResponse
 from fpdf import FPDF
@@ -66,7 +67,12 @@ class ToggleResolucaoObrigatoriaRequest(BaseModel):
 
 @router.get("/analise/problemas-padrao")
 def get_problemas_padrao():
-    return db.execute_query("SELECT ID, TituloPT, ProbTecHTML, Categoria FROM tabProblemasPadrao ORDER BY Categoria, TituloPT")
+    return db.cached_query(
+        "problemas_padrao",
+        "SELECT ID, TituloPT, ProbTecHTML, Categoria FROM tabProblemasPadrao ORDER BY Categoria, TituloPT",
+        tables=("tabProblemasPadrao",),
+        ttl=300,
+    )
 
 @router.get("/files/list")
 def list_files(path: str = Query(..., description="Caminho absoluto da pasta")):
@@ -370,6 +376,7 @@ def add_movement_internal(cursor, os_id, ano, situacao, setor, ponto, obs):
         INSERT INTO tabAndamento (CodStatus, NroProtocoloLink, AnoProtocoloLink, SituacaoLink, SetorLink, Data, UltimoStatus, Observaçao, Ponto) 
         VALUES (%s, %s, %s, %s, %s, NOW(), 1, %s, %s)
     """, (new_cod, os_id, ano, situacao, setor, obs_formatada, ponto_formatado))
+    safe_refresh_os_status(cursor, [(os_id, ano)])
 
 # --- CLIENT PORTAL ENDPOINTS ---
 
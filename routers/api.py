@@ -10,7 +10,7 @@ import os
 from datetime import datetime
 
 # Import dos Routers (Módulos)
-from routers import os_routes, analise_routes, email_routes, auxiliar_routes, papelaria_routes, settings_routes, ip_admin_routes, realtime, pcp_routes, gravacao_routes, requisicao_routes
+from routers import os_routes, analise_routes, email_routes, auxiliar_routes, papelaria_routes, settings_routes, ip_admin_routes, realtime, pcp_routes, gravacao_routes, requisicao_routes, admin_routes
 
 # Configurar logger
 logging.basicConfig(level=logging.INFO)
@@ -83,8 +83,86 @@ class CloudflareTunnelSecurityMiddleware(BaseHTTPMiddleware):
             }
         )
 
+# --- CONTABILIDADE DE CONSULTAS POR REQUISIÇÃO (Server-Timing + log) ---
+from database import begin_query_stats, end_query_stats
+from config_manager import config_manager
+import json
+
+LOG_DB_POR_REQUISICAO = bool(config_manager.get("db_log_por_requisicao", True))
+
+class QueryTimingMiddleware(BaseHTTPMiddleware):
+    """
+    Conta as consultas feitas durante a requisição (database.record_query via contextvar) e
+    devolve no header Server-Timing (visível na aba Network do navegador):
+      Server-Timing: db;dur=12.3;desc="5 consultas", app;dur=40.1
+    Também registra uma linha JSON por requisição /api que tocou o banco.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        if not request.url.path.startswith("/api/"):
+            return await call_next(request)
+
+        stats, token = begin_query_stats()
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            end_query_stats(token)
+        total_ms = (time.perf_counter() - start) * 1000.0
+
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.total_ms:.1f};desc="{stats.count} consultas", app;dur={total_ms:.1f}'
+        )
+        if LOG_DB_POR_REQUISICAO and stats.count:
+            logger.info("db_requisicao %s", json.dumps({
+                "method": request.method,
+                "path": request.url.path,
+                "status": response.status_code,
+                "total_ms": round(total_ms, 1),
+                **stats.as_dict(),
+            }, ensure_ascii=False))
+        return response
+
+# --- MÉTRICAS (Prometheus, GET /metrics) ---
+from metrics_service import http_in_progress, http_latency, http_requests
+
+def _route_label(request: Request) -> str:
+    # Modelo da rota (/api/os/{ano}/{id}/details), não o caminho: evita uma série por OS
+    route = request.scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    endpoint = request.scope.get("endpoint")
+    if endpoint is not None:
+        return getattr(endpoint, "__name__", "nao_mapeada")
+    # Arquivos do mount "/" (StaticFiles) e 404
+    return "nao_mapeada" if request.url.path.startswith("/api/") else "estatico"
+
+class RequestMetricsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path == "/metrics":
+            return await call_next(request)
+        http_in_progress.inc()
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            http_in_progress.dec()
+            route = _route_label(request)
+            http_latency.observe(time.perf_counter() - start, method=request.method, route=route)
+            http_requests.inc(method=request.method, route=route, status=status)
+
 app.add_middleware(CloudflareTunnelSecurityMiddleware)
 app.add_middleware(ConnectedIPMiddleware)
+app.add_middleware(QueryTimingMiddleware)
+
+# --- CONTROLE DE ADMISSÃO (limites por classe de rota, 503 + Retry-After) ---
+from admission_service import AdmissionControlMiddleware
+app.add_middleware(AdmissionControlMiddleware)
+# Por fora da admissão: latência medida inclui a espera na fila e as recusas (503)
+app.add_middleware(RequestMetricsMiddleware)
 
 # CORS
 app.add_middleware(
@@ -157,6 +235,30 @@ async def download_folder_opener():
         from fastapi import HTTPException
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- FEED DE MUDANÇAS (push de deltas via WebSocket) ---
+from change_feed_service import change_feed
+from event_bus_service import event_bus
+from async_database import adb
+from sequence_service import sequences
+from starlette.concurrency import run_in_threadpool
+
+@app.on_event("startup")
+async def start_change_feed():
+    change_feed.start()
+    # tab_sequencias criada antes das requisições (DDL fora das transações de escrita)
+    try:
+        await run_in_threadpool(sequences.ensure_table)
+    except Exception as e:
+        logger.warning(f"Não foi possível criar tab_sequencias na subida: {e}")
+    # Barramento entre workers (config "realtime_event_bus": "local" | "mysql")
+    event_bus.start()
+
+@app.on_event("shutdown")
+async def stop_change_feed():
+    await change_feed.stop()
+    await event_bus.stop()
+    await adb.close()
+
 # Incluir as Rotas (Modularização)
 app.include_router(os_routes.router, prefix="/api")
 app.include_router(analise_routes.router, prefix="/api")
@@ -165,6 +267,7 @@ app.include_router(auxiliar_routes.router, prefix="/api")
 app.include_router(papelaria_routes.router, prefix="/api")
 app.include_router(settings_routes.router, prefix="/api")
 app.include_router(ip_admin_routes.router)  # Já tem /api no próprio router
+app.include_router(admin_routes.router)  # Já tem /api no próprio router
 app.include_router(pcp_routes.router, prefix="/api")
 app.include_router(gravacao_routes.router, prefix="/api")
 app.include_router(realtime.router)
@@ -1,39 +1,43 @@
 from fastapi import APIRouter
 from database import db
+from config_manager import config_manager
 
 router = APIRouter(prefix="/aux")
 
+# Listas auxiliares mudam pouco; escritas dos scripts de sync só expiram pelo TTL
+AUX_CACHE_TTL = float(config_manager.get("db_cache_ttl_auxiliares_segundos", 300))
+
 @router.get("/categorias")
 def get_categorias():
-    return db.execute_query("SELECT DISTINCT Categoria FROM tabcategorias ORDER BY Categoria")
+    return db.cached_query("aux_categorias", "SELECT DISTINCT Categoria FROM tabcategorias ORDER BY Categoria",
+                           tables=("tabcategorias",), ttl=AUX_CACHE_TTL)
 
 @router.get("/situacoes")
 def get_situacoes():
-    return db.execute_query("SELECT DISTINCT SituacaoLink as Situacao FROM tabAndamento WHERE SituacaoLink IS NOT NULL ORDER BY SituacaoLink")
+    return db.cached_query("aux_situacoes", "SELECT DISTINCT SituacaoLink as Situacao FROM tabAndamento WHERE SituacaoLink IS NOT NULL ORDER BY SituacaoLink",
+                           tables=("tabAndamento",), ttl=AUX_CACHE_TTL)
 
-@router.get("/setores")
-def get_setores():
-    result = db.execute_query("SELECT DISTINCT SetorLink as Setor FROM tabAndamento WHERE SetorLink IS NOT NULL ORDER BY SetorLink")
-    setores = list(result)
-    if not any(row.get("Setor") == "Gravação" for row in setores):
-        setores.append({"Setor": "Gravação"})
-    return setores
+# /aux/setores é servido por os_routes (tabSetor), registrado antes deste router
 
 @router.get("/maquinas")
 def get_maquinas():
-    return db.execute_query("SELECT DISTINCT MaquinaLink FROM tabDetalhesServico ORDER BY MaquinaLink")
+    return db.cached_query("aux_maquinas", "SELECT DISTINCT MaquinaLink FROM tabDetalhesServico ORDER BY MaquinaLink",
+                           tables=("tabDetalhesServico",), ttl=AUX_CACHE_TTL)
 
 @router.get("/produtos")
 def get_produtos():
-    return db.execute_query("SELECT DISTINCT TipoPublicacaoLink as Produto FROM tabDetalhesServico ORDER BY TipoPublicacaoLink")
+    return db.cached_query("aux_produtos", "SELECT DISTINCT TipoPublicacaoLink as Produto FROM tabDetalhesServico ORDER BY TipoPublicacaoLink",
+                           tables=("tabDetalhesServico",), ttl=AUX_CACHE_TTL)
 
 @router.get("/papeis")
 def get_papeis():
-    return db.execute_query("SELECT DISTINCT Papel FROM tabPapel ORDER BY Papel")
+    return db.cached_query("aux_papeis", "SELECT DISTINCT Papel FROM tabPapel ORDER BY Papel",
+                           tables=("tabPapel",), ttl=AUX_CACHE_TTL)
 
 @router.get("/cores")
 def get_cores():
-    return db.execute_query("SELECT DISTINCT Cor FROM tabCores ORDER BY Cor")
+    return db.cached_query("aux_cores", "SELECT DISTINCT Cor FROM tabCores ORDER BY Cor",
+                           tables=("tabCores",), ttl=AUX_CACHE_TTL)
 
 # --- INTEGRAÇÃO DEPUTADOS ---
 import requests
@@ -9,6 +9,8 @@ import os
 import tempfile
 from database import db
 from .andamento_helpers import format_andamento_obs, format_ponto
+from os_status_service import ensure_os_status_table, safe_refresh_os_status
+from sequence_service import sequences
 
 router = APIRouter(prefix="/email")
 router = APIRouter(prefix="/email")
@@ -247,21 +249,18 @@ def get_pendencias_os(setor: str = "SEFOC"):
     Retorna lista de OSs cujo andamento atual (UltimoStatus=1) seja 'Encam. de Docum.'
     """
     try:
+        ensure_os_status_table()
         query = """
             SELECT 
-                p.NroProtocolo as os,
-                p.AnoProtocolo as ano,
-                a.SituacaoLink as situacao,
-                a.SetorLink as setor,
-                a.Data as data
-            FROM tabProtocolos p
-            INNER JOIN tabAndamento a ON 
-                p.NroProtocolo = a.NroProtocoloLink 
-                AND p.AnoProtocolo = a.AnoProtocoloLink
-            WHERE a.UltimoStatus = 1
-                AND a.SituacaoLink = 'Encam. de Docum.'
-                AND a.SetorLink = %(setor)s
-            ORDER BY a.Data DESC
+                st.nro_os as os,
+                st.ano as ano,
+                st.situacao as situacao,
+                st.setor as setor,
+                st.data_andamento as data
+            FROM tab_os_status_atual st
+            WHERE st.situacao = 'Encam. de Docum.'
+                AND st.setor = %(setor)s
+            ORDER BY st.data_andamento DESC
         """
         result = db.execute_query(query, {'setor': setor})
         return result
@@ -286,15 +285,12 @@ def get_notification_status(setor: str = "SEFOC"):
             inbox_count = 0
         
         # Count de pendências
+        ensure_os_status_table()
         query = """
             SELECT COUNT(*) as total
-            FROM tabProtocolos p
-            INNER JOIN tabAndamento a ON 
-                p.NroProtocolo = a.NroProtocoloLink 
-                AND p.AnoProtocolo = a.AnoProtocoloLink
-            WHERE a.UltimoStatus = 1
-                AND a.SituacaoLink = 'Encam. de Docum.'
-                AND a.SetorLink = %(setor)s
+            FROM tab_os_status_atual st
+            WHERE st.situacao = 'Encam. de Docum.'
+                AND st.setor = %(setor)s
         """
         result = db.execute_query(query, {'setor': setor})
         pendencias_count = result[0]['total'] if result else 0
@@ -330,22 +326,8 @@ def create_andamento(request: AndamentoRequest):
             {'os': request.os, 'ano': request.ano}
         )
         
-        # 2. Calcular próximo CodStatus
-        base_prefix = f"{request.os:05d}{request.ano}-"
-        cursor.execute(
-            f"SELECT MAX(CodStatus) as max_cod FROM tabAndamento WHERE CodStatus LIKE '{base_prefix}%'"
-        )
-        res = cursor.fetchone()
-        
-        next_seq = 1
-        if res and res['max_cod']:
-            try:
-                existing_suffix = res['max_cod'].split('-')[-1]
-                next_seq = int(existing_suffix) + 1
-            except ValueError:
-                next_seq = 1
-                
-        new_cod = f"{base_prefix}{next_seq:02d}"
+        # 2. Próximo CodStatus (sequência atômica por OS)
+        new_cod = sequences.next_cod_status(cursor, request.os, request.ano)
         
         # Formatar observação com hora e preservar quebras de linha
         obs_formatada = format_andamento_obs(request.observacao or "")
@@ -367,6 +349,7 @@ def create_andamento(request: AndamentoRequest):
                 'ponto': ponto_formatado
             }
         )
+        safe_refresh_os_status(cursor, [(request.os, request.ano)])
         return {"success": True, "cod_status": new_cod}
     
     try:
@@ -609,22 +592,8 @@ def send_pt_email(request: EmailPTRequest):
                 {'os': request.os, 'ano': request.ano}
             )
             
-            # Calcular próximo CodStatus
-            base_prefix = f"{request.os:05d}{request.ano}-"
-            cursor.execute(
-                f"SELECT MAX(CodStatus) as max_cod FROM tabAndamento WHERE CodStatus LIKE '{base_prefix}%'"
-            )
-            res = cursor.fetchone()
-            
-            next_seq = 1
-            if res and res['max_cod']:
-                try:
-                    existing_suffix = res['max_cod'].split('-')[-1]
-                    next_seq = int(existing_suffix) + 1
-                except ValueError:
-                    next_seq = 1
-                    
-            new_cod = f"{base_prefix}{next_seq:02d}"
+            # Próximo CodStatus (sequência atômica por OS)
+            new_cod = sequences.next_cod_status(cursor, request.os, request.ano)
             
             # Inserir novo andamento com hora formatada
             if request.type == 'proof':
@@ -649,6 +618,7 @@ def send_pt_email(request: EmailPTRequest):
                     'ponto': ponto_formatado
                 }
             )
+            safe_refresh_os_status(cursor, [(request.os, request.ano)])
             return {"success": True, "cod_status": new_cod}
         
         try:
@@ -6,7 +6,9 @@ from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from database import db
+from async_database import adb
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -470,11 +472,11 @@ def gravacao_xpose_status():
 
 
 @router.get("/gravacao/status")
-def gravacao_status(limit_printed: int = Query(120, ge=1, le=500)):
+async def gravacao_status(limit_printed: int = Query(120, ge=1, le=500)):
     """Retorna dados a partir do banco (ct_gravacao_*)."""
-    _ensure_tables()
+    await run_in_threadpool(_ensure_tables)
     try:
-        jobs_rows = db.execute_query("SELECT * FROM ct_gravacao_jobs")
+        jobs_rows = await adb.execute_query("SELECT * FROM ct_gravacao_jobs")
     except Exception as exc:
         logger.error("Erro lendo ct_gravacao_jobs: %s", exc)
         raise HTTPException(status_code=500, detail=f"Erro lendo dados de gravacao: {exc}")
@@ -490,7 +492,7 @@ def gravacao_status(limit_printed: int = Query(120, ge=1, le=500)):
     chapas_map: Dict[int, List[Dict[str, Any]]] = {}
     if job_ids:
         try:
-            chapas_rows = db.execute_query("SELECT * FROM ct_gravacao_chapas")
+            chapas_rows = await adb.execute_query("SELECT * FROM ct_gravacao_chapas")
             allowed = set(job_ids)
             for c in chapas_rows:
                 jid = c.get("job_id") or c.get("id_job")
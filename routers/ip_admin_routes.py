@@ -5,8 +5,12 @@ Rotas para administração de permissões por IP
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional
-from database import Database
+from database import db
+from config_manager import config_manager
 import logging
+import re
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -65,6 +69,23 @@ class IPDelete(BaseModel):
     id: int
 
 
+PERMISSION_FLAGS = [
+    'ctx_nova_os', 'ctx_duplicar_os', 'ctx_editar_os', 'ctx_vincular_os',
+    'ctx_abrir_pasta', 'ctx_imprimir_ficha', 'ctx_detalhes_os', 'sb_inicio', 'sb_gerencia',
+    'sb_email', 'sb_analise', 'sb_papelaria', 'sb_usuario', 'sb_configuracoes'
+]
+
+
+def _all_permissions() -> dict:
+    return {k: True for k in PERMISSION_FLAGS}
+
+
+def _compile_ip_pattern(ip_pattern: str):
+    """Converte pattern SQL (%) para regex pré-compilada"""
+    pattern = re.escape(ip_pattern).replace('%', '.*')
+    return re.compile(f"^{pattern}$")
+
+
 def check_ip_permission(client_ip: str, ip_pattern: str) -> bool:
     """
     Verifica se o IP do cliente corresponde ao padrão
@@ -72,106 +93,125 @@ def check_ip_permission(client_ip: str, ip_pattern: str) -> bool:
     """
     if '%' not in ip_pattern:
         return client_ip == ip_pattern
-    
-    # Converte pattern SQL para regex
-    import re
-    pattern = ip_pattern.replace('.', r'\.').replace('%', r'.*')
-    return bool(re.match(f"^{pattern}$", client_ip))
+    return bool(_compile_ip_pattern(ip_pattern).match(client_ip))
+
+
+class PermissionResolver:
+    """
+    Resolve as permissões de um IP a partir de um snapshot em memória de ip_permissions.
+
+    - IPs exatos: dict ip -> flags
+    - Wildcards terminados em % (ex.: 10.120.1.%): longest-prefix-match por dict de prefixos
+    - Demais wildcards (ex.: 10.%.1.5): regex pré-compiladas, na ordem LENGTH(ip) DESC, ip DESC
+
+    O snapshot é recarregado após `ttl` segundos ou quando as rotas de admin
+    chamam `invalidate()`.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._exact = {}
+        self._prefixes = {}
+        self._patterns = []
+        self._loaded_at = 0.0
+        self._ready = False
+
+    def reload(self):
+        rows = db.execute_query("SELECT * FROM ip_permissions WHERE ativo = TRUE")
+        exact = {}
+        prefixes = {}
+        patterns = []
+        for row in rows:
+            ip = (row.get('ip') or '').strip()
+            if not ip:
+                continue
+            flags = {k: bool(row.get(k, True)) for k in PERMISSION_FLAGS}
+            if '%' not in ip:
+                exact.setdefault(ip, flags)
+            elif ip.count('%') == 1 and ip.endswith('%'):
+                prefixes.setdefault(ip[:-1], (ip, flags))
+            else:
+                patterns.append((ip, _compile_ip_pattern(ip), flags))
+        patterns.sort(key=lambda p: (len(p[0]), p[0]), reverse=True)
+
+        with self._lock:
+            self._exact = exact
+            self._prefixes = prefixes
+            self._patterns = patterns
+            self._loaded_at = time.monotonic()
+            self._ready = True
+        logger.info(
+            f"Permissões por IP carregadas: {len(exact)} exatos, "
+            f"{len(prefixes)} prefixos, {len(patterns)} padrões"
+        )
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def _ensure_fresh(self):
+        if time.monotonic() - self._loaded_at < self.ttl:
+            return
+        try:
+            self.reload()
+        except Exception:
+            if not self._ready:
+                raise
+            # Mantém o snapshot anterior e só tenta de novo após outro TTL
+            self._loaded_at = time.monotonic()
+            logger.exception("Erro recarregando ip_permissions (usando snapshot anterior)")
+
+    def _match_wildcard(self, client_ip: str):
+        best = None  # (pattern, flags)
+        prefixes = self._prefixes
+        for i in range(len(client_ip), -1, -1):
+            hit = prefixes.get(client_ip[:i])
+            if hit:
+                best = hit
+                break
+
+        for ip_pattern, regex, flags in self._patterns:
+            if best and (len(ip_pattern), ip_pattern) < (len(best[0]), best[0]):
+                break
+            if regex.match(client_ip):
+                return ip_pattern, flags
+        return best
+
+    def resolve(self, client_ip: str) -> dict:
+        """
+        PRIORIDADE: IP específico > IP wildcard > Backward compatibility (tudo TRUE)
+        """
+        self._ensure_fresh()
+
+        flags = self._exact.get(client_ip)
+        if flags is not None:
+            logger.debug(f"✓ Permissões encontradas para IP EXATO: {client_ip}")
+            return dict(flags)
+
+        match = self._match_wildcard(client_ip)
+        if match:
+            logger.debug(f"✓ Permissões encontradas para IP WILDCARD: {client_ip} (padrão: {match[0]})")
+            return dict(match[1])
+
+        logger.warning(f"⚠ IP {client_ip} não encontrado. Permitindo tudo (modo compatibilidade).")
+        return _all_permissions()
+
+
+permission_resolver = PermissionResolver(ttl=float(config_manager.get("ip_permissions_ttl_segundos", 300)))
 
 
 def get_client_permissions(client_ip: str) -> dict:
     """
-    Busca as permissões do IP do cliente no banco
+    Busca as permissões do IP do cliente (snapshot em memória de ip_permissions)
     PRIORIDADE: IP específico > IP wildcard > Backward compatibility (tudo TRUE)
     """
-    db = Database()
-    
     try:
-        with db.cursor() as cursor:
-            # 1. PRIMEIRA TENTATIVA: Buscar match EXATO (prioridade máxima)
-            cursor.execute("""
-                SELECT * FROM ip_permissions 
-                WHERE ativo = TRUE AND ip = %s
-                LIMIT 1
-            """, (client_ip,))
-            
-            exact_match = cursor.fetchone()
-            if exact_match:
-                logger.info(f"✓ Permissões encontradas para IP EXATO: {client_ip}")
-                return {
-                    'ctx_nova_os': bool(exact_match.get('ctx_nova_os', True)),
-                    'ctx_duplicar_os': bool(exact_match.get('ctx_duplicar_os', True)),
-                    'ctx_editar_os': bool(exact_match.get('ctx_editar_os', True)),
-                    'ctx_vincular_os': bool(exact_match.get('ctx_vincular_os', True)),
-                    'ctx_abrir_pasta': bool(exact_match.get('ctx_abrir_pasta', True)),
-                    'ctx_imprimir_ficha': bool(exact_match.get('ctx_imprimir_ficha', True)),
-                    'ctx_detalhes_os': bool(exact_match.get('ctx_detalhes_os', True)),
-                    'sb_inicio': bool(exact_match.get('sb_inicio', True)),
-                    'sb_gerencia': bool(exact_match.get('sb_gerencia', True)),
-                    'sb_email': bool(exact_match.get('sb_email', True)),
-                    'sb_analise': bool(exact_match.get('sb_analise', True)),
-                    'sb_papelaria': bool(exact_match.get('sb_papelaria', True)),
-                    'sb_usuario': bool(exact_match.get('sb_usuario', True)),
-                    'sb_configuracoes': bool(exact_match.get('sb_configuracoes', True)),
-                }
-            
-            # 2. SEGUNDA TENTATIVA: Buscar wildcards (apenas se não encontrou exato)
-            cursor.execute("""
-                SELECT * FROM ip_permissions 
-                WHERE ativo = TRUE AND ip LIKE '%\%%' 
-                ORDER BY LENGTH(ip) DESC, ip DESC
-            """)
-            
-            wildcard_ips = cursor.fetchall()
-            
-            # Verificar wildcards do mais específico para o menos específico
-            for ip_data in wildcard_ips:
-                if check_ip_permission(client_ip, ip_data['ip']):
-                    logger.info(f"✓ Permissões encontradas para IP WILDCARD: {client_ip} (padrão: {ip_data['ip']})")
-                    return {
-                        'ctx_nova_os': bool(ip_data.get('ctx_nova_os', True)),
-                        'ctx_duplicar_os': bool(ip_data.get('ctx_duplicar_os', True)),
-                        'ctx_editar_os': bool(ip_data.get('ctx_editar_os', True)),
-                        'ctx_vincular_os': bool(ip_data.get('ctx_vincular_os', True)),
-                        'ctx_abrir_pasta': bool(ip_data.get('ctx_abrir_pasta', True)),
-                        'ctx_imprimir_ficha': bool(ip_data.get('ctx_imprimir_ficha', True)),
-                        'ctx_detalhes_os': bool(ip_data.get('ctx_detalhes_os', True)),
-                        'sb_inicio': bool(ip_data.get('sb_inicio', True)),
-                        'sb_gerencia': bool(ip_data.get('sb_gerencia', True)),
-                        'sb_email': bool(ip_data.get('sb_email', True)),
-                        'sb_analise': bool(ip_data.get('sb_analise', True)),
-                        'sb_papelaria': bool(ip_data.get('sb_papelaria', True)),
-                        'sb_usuario': bool(ip_data.get('sb_usuario', True)),
-                        'sb_configuracoes': bool(ip_data.get('sb_configuracoes', True)),
-                    }
-            
-            # 3. NÃO ENCONTROU: Retorna todas permissões TRUE (backward compatibility)
-            logger.warning(f"⚠ IP {client_ip} não encontrado. Permitindo tudo (modo compatibilidade).")
-            return {
-                'ctx_nova_os': True,
-                'ctx_duplicar_os': True,
-                'ctx_editar_os': True,
-                'ctx_vincular_os': True,
-                'ctx_abrir_pasta': True,
-                'ctx_imprimir_ficha': True,
-                'ctx_detalhes_os': True,
-                'sb_inicio': True,
-                'sb_gerencia': True,
-                'sb_email': True,
-                'sb_analise': True,
-                'sb_papelaria': True,
-                'sb_usuario': True,
-                'sb_configuracoes': True,
-            }
-            
+        return permission_resolver.resolve(client_ip)
     except Exception as e:
         logger.error(f"Erro ao buscar permissões para IP {client_ip}: {e}")
         # Em caso de erro, retorna tudo TRUE para não quebrar o sistema
-        return {k: True for k in [
-            'ctx_nova_os', 'ctx_duplicar_os', 'ctx_editar_os', 'ctx_vincular_os',
-            'ctx_abrir_pasta', 'ctx_imprimir_ficha', 'ctx_detalhes_os', 'sb_inicio', 'sb_gerencia',
-            'sb_email', 'sb_analise', 'sb_papelaria', 'sb_usuario', 'sb_configuracoes'
-        ]}
+        return _all_permissions()
 
 
 @router.get("/api/permissions")
@@ -188,8 +228,6 @@ async def get_permissions(request: Request):
 @router.get("/api/admin/ip/list")
 async def list_ips():
     """Lista todos os IPs cadastrados"""
-    db = Database()
-    
     with db.cursor() as cursor:
         cursor.execute("""
             SELECT * FROM ip_permissions
@@ -203,8 +241,6 @@ async def list_ips():
 @router.get("/api/admin/ip/groups")
 async def list_groups():
     """Lista todos os grupos distintos"""
-    db = Database()
-    
     with db.cursor() as cursor:
         cursor.execute("""
             SELECT DISTINCT grupo 
@@ -220,8 +256,6 @@ async def list_groups():
 @router.post("/api/admin/ip/add")
 async def add_ip(data: IPPermission):
     """Adiciona novo IP com permissões"""
-    db = Database()
-    
     with db.cursor() as cursor:
         try:
             cursor.execute("""
@@ -243,6 +277,7 @@ async def add_ip(data: IPPermission):
                 data.sb_inicio, data.sb_gerencia, data.sb_email, data.sb_analise,
                 data.sb_papelaria, data.sb_usuario, data.sb_configuracoes
             ))
+            permission_resolver.invalidate()
             
             return {"success": True, "message": "IP adicionado com sucesso"}
             
@@ -254,8 +289,6 @@ async def add_ip(data: IPPermission):
 @router.post("/api/admin/ip/update")
 async def update_ip(data: IPPermissionUpdate):
     """Atualiza um IP existente"""
-    db = Database()
-    
     # Construir SQL dinâmico baseado nos campos fornecidos
     updates = []
     values = []
@@ -273,6 +306,7 @@ async def update_ip(data: IPPermissionUpdate):
         try:
             sql = f"UPDATE ip_permissions SET {', '.join(updates)} WHERE id = %s"
             cursor.execute(sql, values)
+            permission_resolver.invalidate()
             
             return {"success": True, "message": "IP atualizado com sucesso"}
             
@@ -284,11 +318,10 @@ async def update_ip(data: IPPermissionUpdate):
 @router.post("/api/admin/ip/delete")
 async def delete_ip(data: IPDelete):
     """Remove um IP"""
-    db = Database()
-    
     with db.cursor() as cursor:
         try:
             cursor.execute("DELETE FROM ip_permissions WHERE id = %s", (data.id,))
+            permission_resolver.invalidate()
             return {"success": True, "message": "IP removido com sucesso"}
             
         except Exception as e:
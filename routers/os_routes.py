@@ -1,14 +1,25 @@
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from pydantic import BaseModel
 from database import db
+from async_database import adb
 import logging
 import os
 import glob
+import csv
+import io
 from datetime import datetime
 from .andamento_helpers import format_andamento_obs, format_ponto
 import hashlib
+import base64
+import json
 from pcp_queue_service import ensure_pcp_table
+from os_status_service import TABLE_NAME, ensure_os_status_table, safe_refresh_os_status
+from os_search_index import SEARCH_FIELDS, os_search_index
+from sequence_service import sequences
+from config_manager import config_manager
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -146,11 +157,8 @@ def save_os(data: SaveOSRequest):
         # --- Lógica de ID para INSERT ---
         new_id = data.NroProtocolo
         if not is_update:
-            # Determina se é Papelaria (> 5000) ou Normal (< 5000)
-            cursor.execute("SELECT MAX(NroProtocolo) as max_id FROM tabProtocolos WHERE AnoProtocolo = %s AND NroProtocolo < 5000", (current_year,))
-            res = cursor.fetchone()
-            max_id = res['max_id'] if res and res['max_id'] else 0
-            new_id = max_id + 1
+            # Numeração normal (< 5000); sequência atômica por ano
+            new_id = sequences.next_nro_protocolo(cursor, current_year)
         
         # --- CAMPOS TAB PROTOCOLOS ---
         # Mapeamento Campo Pydantic -> Coluna DB
@@ -252,6 +260,8 @@ def save_os(data: SaveOSRequest):
                 VALUES (%s, %s, %s, 'Entrada Inicial', 'SEFOC', NOW(), 1, %s, %s)
             """
             cursor.execute(query_hist, (new_cod_status, new_id, current_year, obs_criacao, ponto_formatado))
+
+        safe_refresh_os_status(cursor, [(new_id, current_year)])
             
         return {"status": "ok", "id": new_id, "ano": current_year, "message": "OS salva com sucesso"}
 
@@ -276,27 +286,8 @@ def duplicate_os(ano: int, id: int, req: DuplicateRequest):
         is_papelaria = id >= 5000
         current_year = datetime.now().year
         
-        # 2. Encontrar o próximo ID disponível no ano CORRENTE
-        if is_papelaria:
-            cursor.execute("""
-                SELECT MAX(NroProtocolo) as max_id 
-                FROM tabProtocolos 
-                WHERE AnoProtocolo = %s AND NroProtocolo >= 5000
-            """, (current_year,))
-        else:
-            cursor.execute("""
-                SELECT MAX(NroProtocolo) as max_id 
-                FROM tabProtocolos 
-                WHERE AnoProtocolo = %s AND NroProtocolo < 5000
-            """, (current_year,))
-            
-        result = cursor.fetchone()
-        max_id = result['max_id'] if result and result.get('max_id') else None
-
-        if max_id:
-            new_id = max_id + 1
-        else:
-            new_id = 5000 if is_papelaria else 1
+        # 2. Próximo ID disponível no ano CORRENTE (sequência atômica por ano/faixa)
+        new_id = sequences.next_nro_protocolo(cursor, current_year, papelaria=is_papelaria)
 
         # 3. Copiar tabProtocolos
         # Selecionamos as colunas explicitamente para evitar erros de estrutura, 
@@ -346,6 +337,7 @@ def duplicate_os(ano: int, id: int, req: DuplicateRequest):
             VALUES (%s, %s, %s, 'Entrada Inicial', 'SEFOC', NOW(), 1, %s, %s)
         """
         cursor.execute(query_hist, (new_cod_status, new_id, current_year, obs_duplicacao, ponto_formatado))
+        safe_refresh_os_status(cursor, [(new_id, current_year)])
 
         return {"new_id": new_id, "new_year": current_year}
 
@@ -357,47 +349,217 @@ def duplicate_os(ano: int, id: int, req: DuplicateRequest):
         logger.error(f"Duplicate error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
         
+# Bucket de prioridade usado na ordenação (Prometido > Solicitado > demais),
+# pré-calculado na projeção e coberto por idx_prioridade_ordem
+PRIORITY_BUCKET_SQL = "st.prioridade_rank"
+
+SEARCH_COUNT_MODES = ("exact", "capped", "none")
+
+
+def _encode_search_cursor(row: dict) -> str:
+    """Cursor opaco com a chave de ordenação (bucket, EntregData, Ano, Nro) da última linha."""
+    data_entrega = row.get('data_entrega')
+    if hasattr(data_entrega, 'isoformat'):
+        data_entrega = data_entrega.isoformat(sep=' ') if isinstance(data_entrega, datetime) else data_entrega.isoformat()
+    key = [row.get('_bucket'), data_entrega, row.get('ano'), row.get('nr_os')]
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_search_cursor(cursor: str):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        bucket, data_entrega, ano, nr_os = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return int(bucket), data_entrega, int(ano), int(nr_os)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _keyset_filter(cursor: str, params: dict) -> str:
+    """
+    Predicado "depois do cursor" para ORDER BY bucket ASC, EntregData ASC, Ano DESC, Nro DESC.
+    No MySQL, NULL vem antes em ASC: se o cursor tem EntregData NULL, todas as datas
+    preenchidas do mesmo bucket ainda estão por vir.
+    """
+    bucket, data_entrega, ano, nr_os = _decode_search_cursor(cursor)
+    params.update({'cur_bucket': bucket, 'cur_data': data_entrega, 'cur_ano': ano, 'cur_nr': nr_os})
+
+    tie = "(st.ano < %(cur_ano)s OR (st.ano = %(cur_ano)s AND st.nro_os < %(cur_nr)s))"
+    if data_entrega is None:
+        same_bucket = f"(st.data_entrega IS NOT NULL OR {tie})"
+    else:
+        same_bucket = f"(st.data_entrega > %(cur_data)s OR (st.data_entrega = %(cur_data)s AND {tie}))"
+    return f"""
+        AND ({PRIORITY_BUCKET_SQL} > %(cur_bucket)s
+             OR ({PRIORITY_BUCKET_SQL} = %(cur_bucket)s AND {same_bucket}))"""
+
+
+# Candidatos do índice acima de busca_indice_max_candidatos (termo pouco seletivo) entram
+# por JOIN com esta tabela temporária, carregada na mesma conexão das consultas
+_SEARCH_TMP_TABLE = "tmp_busca_os"
+_SEARCH_TMP_JOIN = f"JOIN {_SEARCH_TMP_TABLE} AS ix ON (ix.nro_os = st.nro_os AND ix.ano = st.ano)"
+
+
+def _text_search_filter(campos: dict, q: Optional[str], relevancia: bool, params: dict):
+    """
+    Resolve os filtros textuais pelo índice em memória (sem acento/maiúsculas).
+
+    Retorna (filtro_sql, scores, candidatos). scores é None quando o índice não pôde ser
+    usado; nesse caso o filtro cai para LIKE nas colunas da projeção. Com muitos candidatos
+    (termo pouco seletivo) o modo por relevância fica com os melhores e os demais devolvem
+    `candidatos` para o JOIN com a tabela temporária (ver _run_search_queries).
+    """
+    try:
+        scores = os_search_index.search(campos, q)
+    except Exception as e:
+        logger.error(f"Índice de busca indisponível, usando LIKE: {e}")
+        scores = None
+
+    max_candidatos = int(config_manager.get("busca_indice_max_candidatos", 5000))
+    if scores is not None:
+        if not scores:
+            return " AND 1 = 0", scores, None
+        if len(scores) > max_candidatos:
+            if not relevancia:
+                return "", scores, list(scores)
+            melhores = sorted(scores.items(), key=lambda item: -item[1])[:max_candidatos]
+            scores = dict(melhores)
+        placeholders = []
+        for i, (nro, ano_os) in enumerate(scores):
+            placeholders.append(f"(%(ix_nro_{i})s, %(ix_ano_{i})s)")
+            params[f'ix_nro_{i}'] = nro
+            params[f'ix_ano_{i}'] = ano_os
+        return f" AND (st.nro_os, st.ano) IN ({', '.join(placeholders)})", scores, None
+
+    filtro = ""
+    for campo, valor in campos.items():
+        filtro += f" AND st.{campo} LIKE %({campo})s"
+        params[campo] = f"%{valor}%"
+    if q:
+        filtro += " AND (" + " OR ".join(f"st.{campo} LIKE %(q)s" for campo in SEARCH_FIELDS) + ")"
+        params['q'] = f"%{q}%"
+    return filtro, None, None
+
+
+async def _run_search_queries(queries: List[str], params: dict, candidatos: Optional[list]) -> List[list]:
+    """
+    Executa as consultas da busca. Com `candidatos`, carrega (nro, ano) na tabela temporária
+    e roda tudo na mesma conexão/transação (tabelas temporárias são por conexão).
+    """
+    if candidatos is None:
+        return [list(await adb.execute_query(query, params)) for query in queries]
+
+    async def carregar(cursor):
+        await cursor.executemany(
+            f"INSERT INTO {_SEARCH_TMP_TABLE} (nro_os, ano) VALUES (%s, %s)", candidatos
+        )
+
+    operacoes = [
+        (f"DROP TEMPORARY TABLE IF EXISTS {_SEARCH_TMP_TABLE}", None),
+        (f"CREATE TEMPORARY TABLE {_SEARCH_TMP_TABLE} "
+         "(nro_os INT NOT NULL, ano INT NOT NULL, PRIMARY KEY (ano, nro_os)) ENGINE=MEMORY", None),
+        carregar,
+        *[(query, params) for query in queries],
+        (f"DROP TEMPORARY TABLE IF EXISTS {_SEARCH_TMP_TABLE}", None),
+    ]
+    resultados = await adb.execute_transaction(operacoes)
+    return [list(rows) for rows in resultados[3:3 + len(queries)]]
+
+
+@router.get("/os/search/autocomplete")
+def autocomplete_os(
+    prefixo: str = Query(..., min_length=1),
+    campo: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Sugestões de título/solicitante/órgão/produto para a caixa de busca (sem acento/maiúsculas)."""
+    if campo is not None and campo not in SEARCH_FIELDS:
+        raise HTTPException(status_code=400, detail=f"campo deve ser um de: {', '.join(SEARCH_FIELDS)}")
+    try:
+        return os_search_index.autocomplete(prefixo, campo, limit)
+    except Exception as e:
+        logger.error(f"Error in autocomplete_os: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/os/search")
-def search_os(
+async def search_os(
     nr_os: Optional[int] = None,
     ano: Optional[int] = None,
     produto: Optional[str] = None,
     titulo: Optional[str] = None,
     solicitante: Optional[str] = None,
+    q: Optional[str] = None,
+    relevancia: bool = False,
     situacao: Optional[List[str]] = Query(None),
     setor: Optional[List[str]] = Query(None),
     include_finished: bool = False,
-    page: int = 1,
-    limit: int = 16,
-    pcp_order: bool = False
+    page: int = Query(1, ge=1),
+    limit: int = Query(16, ge=1, le=1000),
+    pcp_order: bool = False,
+    keyset: bool = False,
+    cursor: Optional[str] = None,
+    count: str = "exact",
+    count_cap: int = Query(1000, ge=1)
 ):
-    filters = " WHERE a.UltimoStatus = 1"
+    """
+    Busca paginada de OS.
+
+    Paginação:
+    - padrão: `page`/`limit` com OFFSET.
+    - keyset: `keyset=true` (primeira página) ou `cursor=<next_cursor>` (seguintes).
+      Retorna `meta.next_cursor`; não suportado junto com `pcp_order`.
+
+    Contagem (`count`):
+    - `exact`: COUNT(*) completo (padrão).
+    - `capped`: conta até `count_cap`; acima disso `meta.total_more_than = true`.
+    - `none`: não conta (útil para scroll infinito).
+
+    Texto (`titulo`, `solicitante`, `produto`, `q` em todos os campos + órgão): ignora acentos e
+    maiúsculas e casa por início de palavra. `relevancia=true` ordena pela relevância. Se o
+    índice estiver indisponível, cai para LIKE e sinaliza `meta.indice_indisponivel`.
+    """
+    if count not in SEARCH_COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"count deve ser um de: {', '.join(SEARCH_COUNT_MODES)}")
+    use_keyset = keyset or cursor is not None
+    if use_keyset and pcp_order:
+        raise HTTPException(status_code=400, detail="Paginação por cursor não suportada com pcp_order")
+    text_fields = {
+        campo: valor for campo, valor in (("titulo", titulo), ("solicitante", solicitante), ("produto", produto))
+        if valor
+    }
+    if relevancia and not (text_fields or q):
+        raise HTTPException(status_code=400, detail="relevancia requer q, titulo, solicitante ou produto")
+    if relevancia and (use_keyset or pcp_order):
+        raise HTTPException(status_code=400, detail="relevancia não suportada com cursor ou pcp_order")
+
+    await run_in_threadpool(ensure_os_status_table)
+
+    # Projeção tab_os_status_atual já contém apenas o andamento atual (UltimoStatus = 1)
+    filters = " WHERE 1 = 1"
     params = {}
     
     if not include_finished:
-        filters += " AND a.SituacaoLink NOT IN ('Entregue', 'Cancelada', 'Cancelado')"
+        filters += " AND st.situacao NOT IN ('Entregue', 'Cancelada', 'Cancelado')"
     
     if nr_os:
-        filters += " AND p.NroProtocolo = %(nr_os)s"
+        filters += " AND st.nro_os = %(nr_os)s"
         params['nr_os'] = nr_os
     if ano:
-        filters += " AND p.AnoProtocolo = %(ano)s"
+        filters += " AND st.ano = %(ano)s"
         params['ano'] = ano
-    if produto:
-        filters += " AND d.TipoPublicacaoLink LIKE %(produto)s"
-        params['produto'] = f"%{produto}%"
-    if titulo:
-        filters += " AND d.Titulo LIKE %(titulo)s"
-        params['titulo'] = f"%{titulo}%"
-    if solicitante:
-        filters += " AND p.NomeUsuario LIKE %(solicitante)s"
-        params['solicitante'] = f"%{solicitante}%"
+    scores = None
+    candidatos = None
+    if text_fields or q:
+        text_filter, scores, candidatos = await run_in_threadpool(
+            _text_search_filter, text_fields, q, relevancia, params
+        )
+        filters += text_filter
     
     if situacao:
         clean_situacao = [s.strip() for s in situacao if s and s.strip()]
         if clean_situacao:
             placeholders = ', '.join([f'%(situacao_{i})s' for i in range(len(clean_situacao))])
-            filters += f" AND a.SituacaoLink IN ({placeholders})"
+            filters += f" AND st.situacao IN ({placeholders})"
             for i, s in enumerate(clean_situacao):
                 params[f'situacao_{i}'] = s
 
@@ -405,7 +567,7 @@ def search_os(
         clean_setor = [s.strip() for s in setor if s and s.strip()]
         if clean_setor:
             placeholders = ', '.join([f'%(setor_{i})s' for i in range(len(clean_setor))])
-            filters += f" AND a.SetorLink IN ({placeholders})"
+            filters += f" AND st.setor IN ({placeholders})"
             for i, s in enumerate(clean_setor):
                 params[f'setor_{i}'] = s
 
@@ -414,69 +576,113 @@ def search_os(
     order_prefix = ""
 
     if pcp_order:
-        ensure_pcp_table()
+        await run_in_threadpool(ensure_pcp_table)
         pcp_select = ", pcp.ordem AS pcp_ordem, pcp.ultima_atualizacao AS pcp_ultima_atualizacao"
         pcp_join = """
         LEFT JOIN tab_pcp_fila AS pcp
-            ON (pcp.setor = a.SetorLink AND pcp.nro_os = p.NroProtocolo AND pcp.ano = p.AnoProtocolo)
+            ON (pcp.setor = st.setor AND pcp.nro_os = st.nro_os AND pcp.ano = st.ano)
         """
         order_prefix = """
         CASE WHEN pcp.ordem IS NULL THEN 1 ELSE 0 END,
         pcp.ordem ASC,
         """
 
-    count_query = f"""
-    SELECT COUNT(*) as total
-    FROM tabProtocolos AS p
-    LEFT JOIN tabDetalhesServico AS d ON (p.NroProtocolo = d.NroProtocoloLinkDet) AND (p.AnoProtocolo = d.AnoProtocoloLinkDet)
-    LEFT JOIN tabAndamento AS a ON (p.NroProtocolo = a.NroProtocoloLink) AND (p.AnoProtocolo = a.AnoProtocoloLink)
-    {filters}
-    """
+    from_clause = "FROM tab_os_status_atual AS st"
+    if candidatos is not None:
+        from_clause += f" {_SEARCH_TMP_JOIN}"
+
+    if count == "capped":
+        count_query = f"""
+        SELECT COUNT(*) as total FROM (
+            SELECT 1 {from_clause} {filters} LIMIT %(count_cap_plus_one)s
+        ) AS capped
+        """
+        params['count_cap_plus_one'] = count_cap + 1
+    else:
+        count_query = f"""
+        SELECT COUNT(*) as total
+        {from_clause}
+        {filters}
+        """
+
+    data_filters = filters
+    if use_keyset:
+        if cursor:
+            data_filters += _keyset_filter(cursor, params)
+        pagination = "LIMIT %(limit_plus_one)s"
+        params['limit_plus_one'] = limit + 1
+    elif relevancia and scores is not None:
+        # Candidatos já limitados pelo índice; a ordenação por relevância e a página são feitas aqui
+        pagination = ""
+    else:
+        pagination = "LIMIT %(limit)s OFFSET %(offset)s"
     
     offset = (page - 1) * limit
     data_query = f"""
     SELECT 
-        p.NroProtocolo AS nr_os, 
-        p.AnoProtocolo AS ano, 
-        d.Titulo AS titulo, 
-        p.NomeUsuario AS solicitante,
-        a.SituacaoLink AS situacao, 
-        p.EntregPrazoLink AS prioridade,
-        d.TipoPublicacaoLink AS produto,
-        a.SetorLink AS setor,
-        p.EntregData AS data_entrega,
-        a.Data AS last_update
+        st.nro_os AS nr_os, 
+        st.ano AS ano, 
+        st.titulo AS titulo, 
+        st.solicitante AS solicitante,
+        st.situacao AS situacao, 
+        st.prioridade AS prioridade,
+        st.produto AS produto,
+        st.setor AS setor,
+        st.data_entrega AS data_entrega,
+        st.data_andamento AS last_update,
+        {PRIORITY_BUCKET_SQL} AS _bucket
         {pcp_select}
-    FROM tabProtocolos AS p
-    LEFT JOIN tabDetalhesServico AS d ON (p.NroProtocolo = d.NroProtocoloLinkDet) AND (p.AnoProtocolo = d.AnoProtocoloLinkDet)
-    LEFT JOIN tabAndamento AS a ON (p.NroProtocolo = a.NroProtocoloLink) AND (p.AnoProtocolo = a.AnoProtocoloLink)
+    {from_clause}
     {pcp_join}
-    {filters}
+    {data_filters}
     ORDER BY 
         {order_prefix}
-        CASE 
-            WHEN p.EntregPrazoLink LIKE '%%Prometido p/%%' THEN 0 
-            WHEN p.EntregPrazoLink LIKE '%%Solicitado p/%%' THEN 1 
-            ELSE 2 
-        END ASC,
-        p.EntregData ASC,
-        p.AnoProtocolo DESC, 
-        p.NroProtocolo DESC
-    LIMIT %(limit)s OFFSET %(offset)s
+        {PRIORITY_BUCKET_SQL} ASC,
+        st.data_entrega ASC,
+        st.ano DESC, 
+        st.nro_os DESC
+    {pagination}
     """
     
     params['limit'] = limit
     params['offset'] = offset
 
     try:
-        count_result = db.execute_query(count_query, params)
-        total_records = count_result[0]['total'] if count_result else 0
-        total_pages = (total_records + limit - 1) // limit
-        data_results = db.execute_query(data_query, params)
+        meta = {"page": page, "limit": limit}
+        queries = [data_query] if count == "none" else [count_query, data_query]
+        *count_results, data_results = await _run_search_queries(queries, params, candidatos)
+        if count != "none":
+            count_result = count_results[0]
+            total_records = count_result[0]['total'] if count_result else 0
+            if count == "capped" and total_records > count_cap:
+                total_records = count_cap
+                meta["total_more_than"] = True
+            meta["total_records"] = total_records
+            meta["total_pages"] = (total_records + limit - 1) // limit
+
+        if relevancia and scores is not None:
+            # sort estável: empates mantêm a ordem de prioridade do SQL
+            data_results.sort(key=lambda row: -scores.get((int(row['nr_os']), int(row['ano'])), 0.0))
+            data_results = data_results[offset:offset + limit]
+        elif relevancia:
+            # Índice indisponível: filtro LIKE paginado no SQL, na ordem de prioridade
+            meta["relevancia_indisponivel"] = True
+        if (text_fields or q) and scores is None:
+            # LIKE por substring, sensível a acento: resultado pode diferir da busca pelo índice
+            meta["indice_indisponivel"] = True
+
+        if use_keyset:
+            has_more = len(data_results) > limit
+            data_results = data_results[:limit]
+            meta["has_more"] = has_more
+            meta["next_cursor"] = _encode_search_cursor(data_results[-1]) if has_more and data_results else None
+
+        for row in data_results:
+            row.pop('_bucket', None)
         
         return {
             "data": data_results,
-            "meta": {"page": page, "limit": limit, "total_records": total_records, "total_pages": total_pages}
+            "meta": meta
         }
     except Exception as e:
         logger.error(f"Error in search_os: {e}")
@@ -502,7 +708,10 @@ def get_os_details(ano: int, id: int):
     WHERE p.NroProtocolo = %(id)s AND p.AnoProtocolo = %(ano)s
     """
     try:
-        results = db.execute_query(query, {'id': id, 'ano': ano})
+        results = db.cached_query(
+            "os_details", query, {'id': id, 'ano': ano},
+            tables=("tabProtocolos", "tabDetalhesServico", "tabMidiaDigital"), ttl=30,
+        )
         if not results: raise HTTPException(status_code=404, detail="OS not found")
         return results[0]
     except Exception as e:
@@ -528,20 +737,8 @@ def add_os_history(ano: int, id: int, item: HistoryItem):
         # 1. Reset UltimoStatus
         cursor.execute("UPDATE tabAndamento SET UltimoStatus = 0 WHERE NroProtocoloLink = %(id)s AND AnoProtocoloLink = %(ano)s", {'id': id, 'ano': ano})
         
-        # 2. Generate Safest New ID (Max + 1)
-        base_prefix = f"{id:05d}{ano}-"
-        cursor.execute(f"SELECT MAX(CodStatus) as max_cod FROM tabAndamento WHERE CodStatus LIKE '{base_prefix}%'")
-        res = cursor.fetchone()
-        
-        next_seq = 1
-        if res and res['max_cod']:
-            try:
-                existing_suffix = res['max_cod'].split('-')[-1]
-                next_seq = int(existing_suffix) + 1
-            except ValueError:
-                next_seq = 1
-                
-        new_cod = f"{base_prefix}{next_seq:02d}"
+        # 2. Next CodStatus from the per-OS sequence (atomic)
+        new_cod = sequences.next_cod_status(cursor, id, ano)
         
         # Formatar observação com hora e preservar quebras de linha
         obs_formatada = format_andamento_obs(item.obs)
@@ -553,6 +750,7 @@ def add_os_history(ano: int, id: int, item: HistoryItem):
             "INSERT INTO tabAndamento (CodStatus, NroProtocoloLink, AnoProtocoloLink, SituacaoLink, SetorLink, `Data`, UltimoStatus, `Observaçao`, Ponto) VALUES (%(cod)s, %(id)s, %(ano)s, %(situacao)s, %(setor)s, NOW(), 1, %(obs)s, %(usuario)s)",
             {'cod': new_cod, 'id': id, 'ano': ano, 'situacao': item.situacao, 'setor': item.setor, 'obs': obs_formatada, 'usuario': ponto_formatado}
         )
+        safe_refresh_os_status(cursor, [(id, ano)])
         return {"new_id": new_cod}
 
     try:
@@ -656,22 +854,12 @@ def replicate_history(ano: int, id: int, item: HistoryItem):
                 targets.add((r['principal_num'], r['principal_ano']))
 
         # For each target, insert history similar to add_os_history
-        for (t_num, t_ano) in targets:
+        # Ordem fixa: as travas das sequências/andamentos são tomadas sempre na mesma ordem
+        for (t_num, t_ano) in sorted(targets):
             # Reset UltimoStatus
             cursor.execute("UPDATE tabAndamento SET UltimoStatus = 0 WHERE NroProtocoloLink = %s AND AnoProtocoloLink = %s", (t_num, t_ano))
 
-            base_prefix = f"{t_num:05d}{t_ano}-"
-            cursor.execute(f"SELECT MAX(CodStatus) as max_cod FROM tabAndamento WHERE CodStatus LIKE '{base_prefix}%'")
-            res = cursor.fetchone()
-            next_seq = 1
-            if res and res.get('max_cod'):
-                try:
-                    existing_suffix = res['max_cod'].split('-')[-1]
-                    next_seq = int(existing_suffix) + 1
-                except Exception:
-                    next_seq = 1
-
-            new_cod = f"{base_prefix}{next_seq:02d}"
+            new_cod = sequences.next_cod_status(cursor, t_num, t_ano)
             clean_user = ''.join(filter(str.isdigit, item.usuario)) if item.usuario else ''
             
             # Formatar observação com hora e preservar quebras de linha
@@ -684,6 +872,7 @@ def replicate_history(ano: int, id: int, item: HistoryItem):
                 (new_cod, t_num, t_ano, item.situacao, item.setor, obs_formatada, ponto_formatado)
             )
 
+        safe_refresh_os_status(cursor, targets)
         return {"status": "ok", "replicated_to": len(targets)}
 
     try:
@@ -722,6 +911,7 @@ def update_os_history(ano: int, id: int, item: HistoryUpdateItem):
             """,
             {'situacao': item.situacao, 'setor': item.setor, 'obs': item.obs, 'usuario': clean_user, 'cod': item.cod_status, 'id': id, 'ano': ano}
         )
+        safe_refresh_os_status(cursor, [(id, ano)])
         return {"status": "updated"}
 
     try:
@@ -783,6 +973,7 @@ def delete_os_history(ano: int, id: int, cod_status: str):
                 ) as sub
             )
         """, (id, ano))
+        safe_refresh_os_status(cursor, [(id, ano)])
         
         return {"status": "deleted"}
 
@@ -815,34 +1006,83 @@ def get_os_versions(ano: int, id: int):
         return {"versions": []}
 
 @router.get("/os/panel")
-def get_panel_data(setor: Optional[str] = Query(None)):
+async def get_panel_data(setor: Optional[str] = Query(None)):
     query = """
-    SELECT p.NroProtocolo AS nr_os, p.AnoProtocolo AS ano, d.Titulo AS titulo, p.NomeUsuario AS solicitante,
-    a.SituacaoLink AS situacao, p.EntregPrazoLink AS prioridade, d.TipoPublicacaoLink AS produto,
-    a.SetorLink AS setor, p.EntregData AS data_entrega, d.Tiragem
-    FROM tabProtocolos AS p
-    LEFT JOIN tabDetalhesServico AS d ON (p.NroProtocolo = d.NroProtocoloLinkDet) AND (p.AnoProtocolo = d.AnoProtocoloLinkDet)
-    LEFT JOIN tabAndamento AS a ON (p.NroProtocolo = a.NroProtocoloLink) AND (p.AnoProtocolo = a.AnoProtocoloLink)
-    WHERE a.UltimoStatus = 1 AND (a.SituacaoLink LIKE 'Saída p/%%' OR a.SituacaoLink = 'Em Execução' OR a.SituacaoLink = 'Recebido' OR a.SituacaoLink LIKE 'Tramit. de Prova p/%%')
+    SELECT st.nro_os AS nr_os, st.ano AS ano, st.titulo AS titulo, st.solicitante AS solicitante,
+    st.situacao AS situacao, st.prioridade AS prioridade, st.produto AS produto,
+    st.setor AS setor, st.data_entrega AS data_entrega, st.tiragem AS Tiragem
+    FROM tab_os_status_atual AS st
+    WHERE (st.situacao LIKE 'Saída p/%%' OR st.situacao = 'Em Execução' OR st.situacao = 'Recebido' OR st.situacao LIKE 'Tramit. de Prova p/%%')
     """
     params = {}
     if setor:
-        query += " AND a.SetorLink = %(setor)s"
+        query += " AND st.setor = %(setor)s"
         params['setor'] = setor
-    query += " ORDER BY p.EntregData ASC"
+    query += " ORDER BY st.data_entrega ASC"
     try:
-        return db.execute_query(query, params)
+        await run_in_threadpool(ensure_os_status_table)
+        return await adb.execute_query(query, params)
     except Exception as e:
         logger.error(f"Error fetching panel data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+EXPORT_COLUMNS = (
+    ("nro_os", "OS"), ("ano", "Ano"), ("situacao", "Situação"), ("setor", "Setor"),
+    ("data_andamento", "Último andamento"), ("prioridade", "Prioridade"), ("data_entrega", "Entrega"),
+    ("titulo", "Título"), ("produto", "Produto"), ("solicitante", "Solicitante"), ("orgao", "Órgão"),
+    ("tiragem", "Tiragem"),
+)
+
+
+def _csv_chunks(rows, header, linhas_por_bloco=500):
+    """Converte as linhas (tuplas) em blocos de CSV ';' com BOM, para o Excel abrir com acentos."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', lineterminator='\r\n')
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % linhas_por_bloco == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@router.get("/os/export")
+def export_os(setor: Optional[str] = Query(None), situacao: Optional[str] = Query(None),
+              ano: Optional[int] = Query(None)):
+    """Exporta a situação atual das OSs em CSV, em streaming (memória constante)."""
+    ensure_os_status_table()
+    query = f"SELECT {', '.join(col for col, _ in EXPORT_COLUMNS)} FROM {TABLE_NAME} WHERE 1=1"
+    params = {}
+    if setor:
+        query += " AND setor = %(setor)s"
+        params['setor'] = setor
+    if situacao:
+        query += " AND situacao = %(situacao)s"
+        params['situacao'] = situacao
+    if ano:
+        query += " AND ano = %(ano)s"
+        params['ano'] = ano
+    query += " ORDER BY ano DESC, nro_os DESC"
+
+    rows = db.iter_query(query, params, as_dict=False)
+    filename = f"os_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+    return StreamingResponse(
+        _csv_chunks(rows, [label for _, label in EXPORT_COLUMNS]),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/aux/setores")
 def get_setores():
     """Retorna lista de setores disponíveis do banco de dados"""
     try:
         query = "SELECT DISTINCT Setor FROM tabSetor ORDER BY Setor ASC"
-        result = db.execute_query(query)
+        result = db.cached_query("aux_setores_cadastro", query, tables=("tabSetor",), ttl=300)
         setores = [{"Setor": row.get("Setor")} for row in result if row.get("Setor")]
         if not any(s.get("Setor") == "Gravação" for s in setores):
             setores.append({"Setor": "Gravação"})
@@ -862,7 +1102,7 @@ def get_andamentos():
         WHERE SituacaoLink IS NOT NULL AND SituacaoLink != ''
         ORDER BY SituacaoLink ASC
         """
-        result = db.execute_query(query)
+        result = db.cached_query("aux_andamentos", query, tables=("tabAndamento",), ttl=300)
         andamentos = [{"Situacao": row.get("SituacaoLink")} for row in result if row.get("SituacaoLink")]
         return andamentos
     except Exception as e:
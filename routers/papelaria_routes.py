@@ -43,7 +43,7 @@ def cleanup_file(path: str):
 def get_modelos():
     try:
         query = "SELECT NomeProduto FROM tabPapelariaModelos WHERE Ativo = 1 ORDER BY NomeProduto"
-        results = db.execute_query(query)
+        results = db.cached_query("papelaria_modelos", query, tables=("tabPapelariaModelos",), ttl=300)
         return [{"id": r['NomeProduto'], "nome": r['NomeProduto']} for r in results]
     except Exception as e:
         logger.error(f"Erro BD: {e}")
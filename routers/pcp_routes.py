@@ -1,11 +1,15 @@
 import logging
 from typing import List, Tuple
 from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, validator
 
 from database import db
+from async_database import adb
 from pcp_queue_service import ensure_pcp_table, persist_order, validate_os_in_setor
-from routers.realtime import manager
+from os_status_service import TABLE_NAME, ensure_os_status_table
+from routers.realtime import setor_topics
+from event_bus_service import event_bus
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -40,66 +44,60 @@ class ReorderRequest(BaseModel):
 def _broadcast_updates(setor: str):
     """Fire-and-forget broadcast for dashboards/PCP listeners."""
     try:
-        # Notify PCP-aware screens
+        # Notify PCP-aware screens (tópicos "pcp" e do setor)
         import asyncio
-        asyncio.create_task(manager.broadcast({"type": "pcp_queue_update", "setor": setor}))
-        # Keep legacy dashboards in sync
-        asyncio.create_task(manager.broadcast({"type": "system_update", "setor": setor}))
+        asyncio.create_task(event_bus.publish({"type": "pcp_queue_update", "setor": setor},
+                                              topics=["pcp"] + setor_topics(setor)))
+        # Keep legacy dashboards (sem assinatura) in sync
+        asyncio.create_task(event_bus.publish({"type": "system_update", "setor": setor}, topics=[]))
     except Exception as exc:
         logger.error("Erro ao agendar broadcast PCP: %s", exc)
 
 @router.get("/pcp/queue")
-def get_pcp_queue(setor: str = Query(..., description="Setor da fila PCP")):
-    ensure_pcp_table()
+async def get_pcp_queue(setor: str = Query(..., description="Setor da fila PCP")):
+    await run_in_threadpool(ensure_pcp_table)
+    await run_in_threadpool(ensure_os_status_table)
     base_setor, situacoes = _resolve_setor(setor)
 
     situacao_filter = ""
     situacao_params = []
     if situacoes:
         placeholders = ", ".join(["%s"] * len(situacoes))
-        situacao_filter = f" AND a.SituacaoLink IN ({placeholders})"
+        situacao_filter = f" AND st.situacao IN ({placeholders})"
         situacao_params = situacoes
 
     query = f"""
     SELECT 
-        p.NroProtocolo AS nr_os,
-        p.AnoProtocolo AS ano,
-        d.Titulo AS titulo,
-        d.TipoPublicacaoLink AS produto,
-        a.SituacaoLink AS situacao,
+        st.nro_os AS nr_os,
+        st.ano AS ano,
+        st.titulo AS titulo,
+        st.produto AS produto,
+        st.situacao AS situacao,
         %s AS setor,
-        p.EntregData AS data_entrega,
-        p.EntregPrazoLink AS prioridade,
-        a.Data AS last_update,
-        a.`Observaçao` AS observacao,
+        st.data_entrega AS data_entrega,
+        st.prioridade AS prioridade,
+        st.data_andamento AS last_update,
+        st.observacao AS observacao,
         pcp.ordem AS pcp_ordem,
         pcp.ultima_atualizacao AS pcp_ultima_atualizacao
-    FROM tabProtocolos AS p
-    LEFT JOIN tabDetalhesServico AS d 
-        ON (p.NroProtocolo = d.NroProtocoloLinkDet AND p.AnoProtocolo = d.AnoProtocoloLinkDet)
-    LEFT JOIN tabAndamento AS a 
-        ON (p.NroProtocolo = a.NroProtocoloLink AND p.AnoProtocolo = a.AnoProtocoloLink)
+    FROM tab_os_status_atual AS st
     LEFT JOIN tab_pcp_fila AS pcp
-                ON (pcp.setor = %s AND pcp.nro_os = p.NroProtocolo AND pcp.ano = p.AnoProtocolo)
-    WHERE a.UltimoStatus = 1
-            AND a.SetorLink = %s
-      AND a.SituacaoLink NOT IN ('Entregue', 'Cancelada', 'Cancelado')
+                ON (pcp.setor = %s AND pcp.nro_os = st.nro_os AND pcp.ano = st.ano)
+    WHERE st.setor = %s
+      AND st.situacao NOT IN ('Entregue', 'Cancelada', 'Cancelado')
       {situacao_filter}
     ORDER BY 
         CASE WHEN pcp.ordem IS NULL THEN 1 ELSE 0 END,
         pcp.ordem ASC,
-        CASE 
-            WHEN p.EntregPrazoLink LIKE '%%Prometido p/%%' THEN 0
-            WHEN p.EntregPrazoLink LIKE '%%Solicitado p/%%' THEN 1
-            ELSE 2
-        END ASC,
-        p.EntregData ASC,
-        p.AnoProtocolo DESC,
-        p.NroProtocolo DESC
+        st.prioridade_rank ASC,
+        st.data_entrega ASC,
+        st.ano DESC,
+        st.nro_os DESC
     """
     try:
         params = [setor, setor, base_setor] + situacao_params
-        rows = db.execute_query(query, params)
+        # Escritas de outros processos chegam pelo feed de mudanças, que invalida estas tabelas
+        rows = await adb.cached_query("pcp_queue", query, params, tables=(TABLE_NAME, "tab_pcp_fila"), ttl=30)
         return {"setor": setor, "items": rows}
     except Exception as exc:
         logger.error("Erro ao buscar fila PCP: %s", exc)
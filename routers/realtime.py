@@ -1,44 +1,280 @@
+import asyncio
+import json
 import logging
-from typing import List, Dict, Any
+from collections import deque
+from typing import Dict, Iterable, List, Any, Optional, Set
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+from config_manager import config_manager
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Tópicos aceitos: "pcp", "gravacao", "os" (todos os deltas de OS),
+# "setor:<SETOR>" e "os:<NRO>/<ANO>"
+TOPIC_PREFIXES = ("setor:", "os:")
+TOPIC_NAMES = ("pcp", "gravacao", "os")
+
+# Mensagens em que só a mais recente importa (por tipo + setor): substituem a pendente na fila
+COALESCE_TYPES = ("pcp_delta", "pcp_queue_update", "system_update")
+
+
+def is_valid_topic(topic: str) -> bool:
+    if topic in TOPIC_NAMES:
+        return True
+    return any(topic.startswith(prefix) and len(topic) > len(prefix) for prefix in TOPIC_PREFIXES)
+
+
+def _coalesce_key(message: Dict[str, Any]) -> Optional[str]:
+    if message.get("type") in COALESCE_TYPES:
+        return f"{message['type']}:{message.get('setor') or ''}"
+    return None
+
+
+def _serialize(message: Dict[str, Any]) -> str:
+    # Mesmo formato do send_json do Starlette
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class ClientChannel:
+    """
+    Fila de envio limitada + tarefa escritora de uma conexão.
+
+    Um cliente lento só atrasa a própria fila. Ao estourar o limite, as mensagens
+    pendentes são descartadas e trocadas por um único "system_update" (o cliente
+    recarrega o estado completo, como já faz hoje).
+    """
+
+    def __init__(self, websocket: WebSocket, on_error, max_queue: int, send_timeout: float):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self._on_error = on_error
+        self._queue: deque = deque()
+        self._wakeup = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.overflows = 0
+        self.task = asyncio.get_running_loop().create_task(self._writer())
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, text: str, key: Optional[str] = None):
+        if key is not None:
+            for i, (_, pending_key) in enumerate(self._queue):
+                if pending_key == key:
+                    self._queue[i] = (text, key)
+                    self.coalesced += 1
+                    return
+
+        if len(self._queue) >= self.max_queue:
+            self.dropped += len(self._queue)
+            self.overflows += 1
+            self._queue.clear()
+            resync = {"type": "system_update", "reason": "overflow"}
+            self._queue.append((_serialize(resync), _coalesce_key(resync)))
+            if key == _coalesce_key(resync):
+                self._wakeup.set()
+                return
+
+        self._queue.append((text, key))
+        self._wakeup.set()
+
+    async def _writer(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._queue:
+                text, _ = self._queue.popleft()
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(text), timeout=self.send_timeout)
+                    self.sent += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:  # Log e remove conexao quebrada/travada
+                    logger.error("Erro ao enviar mensagem WS: %s", exc)
+                    self._on_error(self.websocket)
+                    # Fecha o socket para o cliente reconectar (senão ele segue "conectado" sem receber nada)
+                    try:
+                        await asyncio.wait_for(self.websocket.close(code=1011), timeout=self.send_timeout)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception:
+                        pass
+                    return
+
+    def close(self):
+        if self.task is not asyncio.current_task():
+            self.task.cancel()
+
+
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, max_queue: int = 100, send_timeout: float = 10.0):
         self.active_connections: List[WebSocket] = []
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.channels: Dict[WebSocket, ClientChannel] = {}
+        self.messages_broadcast = 0
+        # Contadores de conexões já encerradas (somados às ativas em stats())
+        self._closed_totals = {"sent": 0, "dropped": 0, "coalesced": 0, "overflows": 0}
+        # Índice de assinaturas: tópico -> sockets e socket -> tópicos. A entrada do socket
+        # fica (mesmo vazia) depois do primeiro subscribe/unsubscribe: só quem nunca usou o
+        # protocolo de tópicos é tratado como cliente antigo e recebe o feed completo
+        self.topic_subscribers: Dict[str, Set[WebSocket]] = {}
+        self.connection_topics: Dict[WebSocket, Set[str]] = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections.append(websocket)
+        self.channels[websocket] = ClientChannel(websocket, self.disconnect, self.max_queue, self.send_timeout)
         logger.info("WebSocket conectado. Total: %s", len(self.active_connections))
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
             logger.info("WebSocket desconectado. Total: %s", len(self.active_connections))
+        channel = self.channels.pop(websocket, None)
+        if channel is not None:
+            for name in self._closed_totals:
+                self._closed_totals[name] += getattr(channel, name)
+            channel.close()
+        for topic in self.connection_topics.pop(websocket, set()):
+            subscribers = self.topic_subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.topic_subscribers[topic]
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        accepted = [t for t in topics if isinstance(t, str) and is_valid_topic(t)]
+        if websocket in self.active_connections:
+            self.connection_topics.setdefault(websocket, set())
+        for topic in accepted:
+            self.topic_subscribers.setdefault(topic, set()).add(websocket)
+            self.connection_topics.setdefault(websocket, set()).add(topic)
+        return accepted
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]):
+        if websocket not in self.active_connections:
+            return
+        current = self.connection_topics.setdefault(websocket, set())
+        for topic in list(topics):
+            current.discard(topic)
+            subscribers = self.topic_subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.topic_subscribers[topic]
+
+    def _recipients(self, topics: Optional[Iterable[str]], include_unsubscribed: bool) -> List[WebSocket]:
+        if topics is None:
+            return list(self.active_connections)
+        recipients: Set[WebSocket] = set()
+        for topic in topics:
+            recipients |= self.topic_subscribers.get(topic, set())
+        if include_unsubscribed:
+            # Clientes antigos que nunca enviaram "subscribe" continuam recebendo tudo
+            recipients |= {ws for ws in self.active_connections if ws not in self.connection_topics}
+        return [ws for ws in self.active_connections if ws in recipients]
+
+    async def broadcast(self, message: Dict[str, Any], topics: Optional[Iterable[str]] = None,
+                        include_unsubscribed: bool = True):
+        """
+        Envia `message` aos assinantes de qualquer um dos `topics` (sem repetição).
+        Sem `topics`, envia a todos. `include_unsubscribed` inclui as conexões sem assinatura.
+
+        Serializa uma vez e apenas enfileira: a entrega é feita pela tarefa de cada conexão.
+        """
+        recipients = self._recipients(topics, include_unsubscribed)
+        if not recipients:
+            return
+        text = _serialize(message)
+        key = _coalesce_key(message)
+        for connection in recipients:
+            channel = self.channels.get(connection)
+            if channel is not None:
+                channel.enqueue(text, key)
+        self.messages_broadcast += 1
+        # Cede a vez às tarefas escritoras: rajadas de broadcasts não enchem a fila de clientes rápidos
+        await asyncio.sleep(0)
+
+    def send_to(self, websocket: WebSocket, message: Dict[str, Any]):
+        channel = self.channels.get(websocket)
+        if channel is not None:
+            channel.enqueue(_serialize(message))
+
+    def stats(self) -> Dict[str, Any]:
+        channels = list(self.channels.values())
+        totals = dict(self._closed_totals)
+        for channel in channels:
+            for name in totals:
+                totals[name] += getattr(channel, name)
+        depths = [channel.depth for channel in channels]
+        return {
+            "connections": len(self.active_connections),
+            "topics": {topic: len(subs) for topic, subs in self.topic_subscribers.items()},
+            "messages_broadcast": self.messages_broadcast,
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "queue_limit": self.max_queue,
+            **totals,
+        }
+
+    async def handle_client_message(self, websocket: WebSocket, raw: str):
+        """Processa {"type": "subscribe"|"unsubscribe", "topics": [...]}; demais mensagens são ignoradas."""
+        try:
+            data = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(data, dict):
+            return
+        topics = data.get("topics") or []
+        if isinstance(topics, str):
+            topics = [topics]
+
+        if data.get("type") == "subscribe":
+            accepted = self.subscribe(websocket, topics)
+            self.send_to(websocket, {"type": "subscribed", "topics": sorted(self.connection_topics.get(websocket, set())),
+                                     "rejected": [t for t in topics if t not in accepted]})
+        elif data.get("type") == "unsubscribe":
+            self.unsubscribe(websocket, topics)
+            self.send_to(websocket, {"type": "subscribed", "topics": sorted(self.connection_topics.get(websocket, set()))})
+
+manager = ConnectionManager(
+    max_queue=int(config_manager.get("ws_fila_max_mensagens", 100)),
+    send_timeout=float(config_manager.get("ws_timeout_envio_segundos", 10)),
+)
+
+
+def setor_topics(setor: Optional[str]) -> List[str]:
+    """Tópicos de um setor (o setor virtual Gravação também publica em "gravacao")."""
+    if not setor:
+        return []
+    topics = [f"setor:{setor}"]
+    if setor == "Gravação":
+        topics.append("gravacao")
+    return topics
+
 
-    async def broadcast(self, message: Dict[str, Any]):
-        to_remove = []
-        for connection in list(self.active_connections):
-            try:
-                await connection.send_json(message)
-            except Exception as exc:  # Log e remove conexao quebrada
-                logger.error("Erro ao enviar mensagem WS: %s", exc)
-                to_remove.append(connection)
-        for conn in to_remove:
-            self.disconnect(conn)
+@router.get("/ws/stats")
+def websocket_stats():
+    """Métricas do fan-out: conexões, profundidade das filas, descartes e coalescências."""
+    return manager.stats()
 
-manager = ConnectionManager()
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, topics: Optional[str] = None):
     await manager.connect(websocket)
+    if topics:
+        # Assinatura inicial opcional: /ws?topics=pcp,setor:SEFOC
+        manager.subscribe(websocket, [t.strip() for t in topics.split(",") if t.strip()])
     try:
         while True:
-            # Mantem a conexao viva; mensagens de clientes podem ser ignoradas
-            await websocket.receive_text()
+            raw = await websocket.receive_text()
+            await manager.handle_client_message(websocket, raw)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as exc:
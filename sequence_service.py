@@ -0,0 +1,202 @@
+"""
+Sequências atômicas para CodStatus (andamentos) e NroProtocolo (novas OSs).
+
+Cada sequência é uma linha de tab_sequencias, chave (tipo, chave), incrementada com
+`UPDATE ... SET valor = LAST_INSERT_ID(valor + n)`: uma única linha travada, sem varrer
+tabAndamento/tabProtocolos a cada escrita, e dois escritores nunca recebem o mesmo valor.
+
+- `next_cod_status(cursor, nro, ano)` -> "NNNNNAAAA-SS" (sequência por OS);
+- `next_nro_protocolo(cursor, ano, papelaria=False)` -> próximo número do ano
+  (normal < 5000, papelaria >= 5000).
+
+A tabela é criada na subida da API (ou na primeira alocação), sempre numa conexão
+separada. Usadas no cursor da própria transação, a trava da linha dura até o commit e um rollback
+devolve o número (sem buracos). A primeira alocação de uma chave semeia a sequência a
+partir do MAX existente. Como a sincronização com o Access e o server.py ainda gravam
+sem passar por aqui, o valor alocado é conferido com uma busca pela chave primária; se
+já existir, a sequência é ressincronizada pelo MAX.
+
+Pré-alocação em bloco (opcional, config "sequencia_bloco_os", padrão 1 = desligada):
+cada processo reserva N números de OS por vez numa conexão própria (autocommit) e os
+entrega da memória. Números reservados e não usados viram buracos ao reiniciar.
+"""
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config_manager import config_manager
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "tab_sequencias"
+
+KIND_ANDAMENTO = "andamento"
+KIND_OS = "os"
+
+PAPELARIA_INICIO = 5000
+
+_CREATE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+    tipo VARCHAR(30) NOT NULL,
+    chave VARCHAR(40) NOT NULL,
+    valor BIGINT NOT NULL,
+    atualizado_em DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (tipo, chave)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+"""
+
+# Tentativas de alocação quando o valor já foi usado por um escritor externo
+_MAX_RESYNC = 3
+
+
+def _value(row, key: str):
+    if row is None:
+        return None
+    return row[key] if isinstance(row, dict) else row[0]
+
+
+class SequenceAllocator:
+    def __init__(self, os_block_size: int = 1):
+        self.os_block_size = max(1, int(os_block_size))
+        self._table_ready = False
+        self._lock = threading.Lock()
+        # (tipo, chave) -> [próximo, último] reservados por este processo
+        self._blocks: Dict[Tuple[str, str], List[int]] = {}
+
+    def ensure_table(self):
+        """
+        Cria tab_sequencias numa conexão própria (autocommit). Nunca no cursor de quem aloca:
+        DDL no MySQL faz commit implícito da transação aberta.
+        """
+        if self._table_ready:
+            return
+        from database import db
+        with db.cursor() as cursor:
+            cursor.execute(_CREATE_SQL)
+        self._table_ready = True
+
+    def allocate(self, cursor, tipo: str, chave: str, seed: Callable[[object], int], count: int = 1) -> int:
+        """
+        Reserva `count` valores consecutivos e retorna o primeiro. `seed(cursor)` devolve o
+        último valor já usado; só é chamada quando a sequência ainda não existe.
+        """
+        self.ensure_table()
+        cursor.execute(
+            f"UPDATE {TABLE_NAME} SET valor = LAST_INSERT_ID(valor + %s) WHERE tipo = %s AND chave = %s",
+            (count, tipo, chave),
+        )
+        if not cursor.rowcount:
+            inicial = int(seed(cursor) or 0)
+            # Outro escritor pode criar a linha entre o UPDATE e aqui: o ON DUPLICATE incrementa a dele
+            cursor.execute(
+                f"INSERT INTO {TABLE_NAME} (tipo, chave, valor) VALUES (%s, %s, LAST_INSERT_ID(%s)) "
+                f"ON DUPLICATE KEY UPDATE valor = LAST_INSERT_ID(valor + %s)",
+                (tipo, chave, inicial + count, count),
+            )
+        cursor.execute("SELECT LAST_INSERT_ID() AS valor")
+        return int(_value(cursor.fetchone(), "valor")) - count + 1
+
+    def resync(self, cursor, tipo: str, chave: str, seed: Callable[[object], int]):
+        """Avança a sequência até o MAX atual (valores gravados por fora do alocador)."""
+        self.ensure_table()
+        atual = int(seed(cursor) or 0)
+        cursor.execute(
+            f"INSERT INTO {TABLE_NAME} (tipo, chave, valor) VALUES (%s, %s, %s) "
+            f"ON DUPLICATE KEY UPDATE valor = GREATEST(valor, VALUES(valor))",
+            (tipo, chave, atual),
+        )
+        logger.warning("Sequência %s/%s ressincronizada em %s", tipo, chave, atual)
+
+    def _allocate_checked(self, cursor, tipo, chave, seed, exists: Callable[[object, int], bool],
+                          take: Optional[Callable[[], int]] = None) -> int:
+        for _ in range(_MAX_RESYNC):
+            valor = take() if take else self.allocate(cursor, tipo, chave, seed)
+            if not exists(cursor, valor):
+                return valor
+            if take:
+                # Mesma conexão própria do bloco: travar a linha na transação de quem pediu
+                # faria a próxima reserva esperar por ela
+                from database import db
+                with db.cursor() as block_cursor:
+                    self.resync(block_cursor, tipo, chave, seed)
+                self.discard_block(tipo, chave)
+            else:
+                self.resync(cursor, tipo, chave, seed)
+        raise RuntimeError(f"Não foi possível alocar {tipo}/{chave}: valores já em uso")
+
+    # ------------------------------------------------------------------
+    # CodStatus
+    # ------------------------------------------------------------------
+    def next_cod_status(self, cursor, nro: int, ano: int) -> str:
+        prefix = f"{int(nro):05d}{int(ano)}-"
+
+        def seed(cur) -> int:
+            # Sufixo numérico (MAX textual erra a partir de -100)
+            cur.execute("SELECT CodStatus FROM tabAndamento WHERE CodStatus LIKE %s", (prefix + "%",))
+            maior = 0
+            for row in cur.fetchall():
+                try:
+                    maior = max(maior, int(str(_value(row, "CodStatus")).rsplit("-", 1)[-1]))
+                except ValueError:
+                    continue
+            return maior
+
+        def exists(cur, seq) -> bool:
+            cur.execute("SELECT 1 FROM tabAndamento WHERE CodStatus = %s", (f"{prefix}{seq:02d}",))
+            return cur.fetchone() is not None
+
+        seq = self._allocate_checked(cursor, KIND_ANDAMENTO, f"{int(nro)}/{int(ano)}", seed, exists)
+        return f"{prefix}{seq:02d}"
+
+    # ------------------------------------------------------------------
+    # NroProtocolo
+    # ------------------------------------------------------------------
+    def next_nro_protocolo(self, cursor, ano: int, papelaria: bool = False) -> int:
+        ano = int(ano)
+        chave = f"{ano}/{'papelaria' if papelaria else 'normal'}"
+
+        def seed(cur) -> int:
+            if papelaria:
+                cur.execute(
+                    "SELECT MAX(NroProtocolo) AS max_id FROM tabProtocolos WHERE AnoProtocolo = %s AND NroProtocolo >= %s",
+                    (ano, PAPELARIA_INICIO),
+                )
+                return _value(cur.fetchone(), "max_id") or PAPELARIA_INICIO - 1
+            cur.execute(
+                "SELECT MAX(NroProtocolo) AS max_id FROM tabProtocolos WHERE AnoProtocolo = %s AND NroProtocolo < %s",
+                (ano, PAPELARIA_INICIO),
+            )
+            return _value(cur.fetchone(), "max_id") or 0
+
+        def exists(cur, nro) -> bool:
+            cur.execute("SELECT 1 FROM tabProtocolos WHERE NroProtocolo = %s AND AnoProtocolo = %s", (nro, ano))
+            return cur.fetchone() is not None
+
+        take = None
+        if self.os_block_size > 1:
+            take = lambda: self._take_from_block(KIND_OS, chave, seed)  # noqa: E731
+        return self._allocate_checked(cursor, KIND_OS, chave, seed, exists, take)
+
+    # ------------------------------------------------------------------
+    # Blocos por processo
+    # ------------------------------------------------------------------
+    def _take_from_block(self, tipo: str, chave: str, seed) -> int:
+        with self._lock:
+            block = self._blocks.get((tipo, chave))
+            if block is None or block[0] > block[1]:
+                # Conexão própria: o bloco não pode voltar com o rollback de quem pediu
+                from database import db
+                with db.cursor() as cursor:
+                    first = self.allocate(cursor, tipo, chave, seed, self.os_block_size)
+                block = self._blocks[(tipo, chave)] = [first, first + self.os_block_size - 1]
+                logger.info("Bloco %s/%s reservado: %s-%s", tipo, chave, block[0], block[1])
+            valor = block[0]
+            block[0] += 1
+            return valor
+
+    def discard_block(self, tipo: str, chave: str):
+        with self._lock:
+            self._blocks.pop((tipo, chave), None)
+
+
+sequences = SequenceAllocator(os_block_size=config_manager.get("sequencia_bloco_os", 1))
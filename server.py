@@ -18,43 +18,27 @@ from fastapi import Request
 from starlette.responses import HTMLResponse
 import socket
 import tempfile
+import threading
+import time
+import re
+import ipaddress
+from config_manager import config_manager
 from routers.andamento_helpers import format_andamento_obs, format_ponto
+from os_status_service import safe_refresh_os_status
 from routers.gravacao_routes import router as gravacao_router
 from routers.requisicao_routes import router as requisicao_router
+from routers.realtime import ConnectionManager
 import glob
 import io
 from fpdf import FPDF
 
 
 # --- WebSocket Manager ---
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"WebSocket Client connected. Total: {len(self.active_connections)}")
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            logger.info(f"WebSocket Client disconnected. Total: {len(self.active_connections)}")
-
-    async def broadcast(self, message: dict):
-        # Filter disconnected clients
-        to_remove = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to client: {e}")
-                to_remove.append(connection)
-        
-        for conn in to_remove:
-            self.disconnect(conn)
-
-manager = ConnectionManager()
+# Mesmo fan-out do app modular: fila limitada + tarefa escritora por conexão
+manager = ConnectionManager(
+    max_queue=int(config_manager.get("ws_fila_max_mensagens", 100)),
+    send_timeout=float(config_manager.get("ws_timeout_envio_segundos", 10)),
+)
 
 
 class ProblemaItem(BaseModel):
@@ -86,17 +70,114 @@ app.add_middleware(
 
 
 # --- IP Authorization Middleware & Startup setup ---
+_host_primary_ip = None
+
+
 def _get_host_primary_ip():
+    """IP principal do host. Resolvido uma única vez (abre um socket UDP)."""
+    global _host_primary_ip
+    if _host_primary_ip:
+        return _host_primary_ip
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.connect(("8.8.8.8", 80))
         ip = s.getsockname()[0]
         s.close()
+        _host_primary_ip = ip
         return ip
     except Exception:
+        # Não cacheia o fallback: tenta resolver de novo na próxima chamada
         return "127.0.0.1"
 
 
+class IpAllowlistCache:
+    """
+    Snapshot em memória de tabIpPermitidos.
+
+    Evita um SELECT por requisição no middleware de autorização. IPs exatos
+    ficam num dict; padrões (wildcard '%'/'*' ou CIDR '10.120.1.0/24') ficam
+    pré-compilados numa lista. O snapshot é recarregado após `ttl` segundos
+    ou imediatamente quando `invalidate()` é chamado pelas rotas de admin.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._exact = {}
+        self._patterns = []
+        self._loaded_at = 0.0
+        self._ready = False
+
+    @staticmethod
+    def _compile_pattern(ip_pattern: str):
+        if "/" in ip_pattern:
+            try:
+                return ipaddress.ip_network(ip_pattern, strict=False)
+            except ValueError:
+                return None
+        if "%" in ip_pattern or "*" in ip_pattern:
+            regex = re.escape(ip_pattern).replace("%", ".*").replace(r"\*", ".*")
+            return re.compile(f"^{regex}$")
+        return None
+
+    def reload(self):
+        rows = db.execute_query("SELECT ip, ativo FROM tabIpPermitidos")
+        exact = {}
+        patterns = []
+        for row in rows:
+            ip = (row.get("ip") or "").strip()
+            if not ip:
+                continue
+            ativo = bool(row.get("ativo"))
+            compiled = self._compile_pattern(ip)
+            if compiled is None:
+                exact[ip] = ativo
+            elif ativo:
+                patterns.append(compiled)
+        with self._lock:
+            self._exact = exact
+            self._patterns = patterns
+            self._loaded_at = time.monotonic()
+            self._ready = True
+        logger.info(f"Allowlist de IPs carregada: {len(exact)} exatos, {len(patterns)} padrões")
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def _ensure_fresh(self):
+        if time.monotonic() - self._loaded_at >= self.ttl:
+            try:
+                self.reload()
+            except Exception as e:
+                # Sem snapshot anterior: propaga (o middleware nega o acesso)
+                if not self._ready:
+                    raise
+                # Mantém o snapshot anterior e só tenta de novo após outro TTL
+                self._loaded_at = time.monotonic()
+                logger.error(f"Erro recarregando allowlist de IPs (usando snapshot anterior): {e}")
+
+    def is_allowed(self, client_ip: str) -> bool:
+        self._ensure_fresh()
+        exact = self._exact
+        if client_ip in exact:
+            return exact[client_ip]
+        try:
+            addr = ipaddress.ip_address(client_ip)
+        except ValueError:
+            addr = None
+        for pattern in self._patterns:
+            if isinstance(pattern, re.Pattern):
+                if pattern.match(client_ip):
+                    return True
+            elif addr is not None and addr.version == pattern.version and addr in pattern:
+                return True
+        return False
+
+
+ip_allowlist = IpAllowlistCache(ttl=float(config_manager.get("ip_allowlist_ttl_segundos", 60)))
+
+
 def _is_client_path(path: str) -> bool:
     p = path.lower()
     
@@ -144,9 +225,7 @@ async def check_ip_authorization(request: Request, call_next):
         xff = request.headers.get("x-forwarded-for", "")
         logger.info(f"IP auth check — client_ip={client_ip}, x-forwarded-for={xff}, path={request.url.path}")
 
-        # Query table for IP
-        rows = db.execute_query("SELECT id, ativo FROM tabIpPermitidos WHERE ip = %s LIMIT 1", (client_ip,))
-        if rows and len(rows) > 0 and rows[0].get("ativo"):
+        if ip_allowlist.is_allowed(client_ip):
             logger.info(f"IP {client_ip} autorizado — acesso liberado para {request.url.path}")
             return await call_next(request)
         else:
@@ -185,6 +264,8 @@ def ensure_ip_table():
                 logger.info(f"Inserted host IP into tabIpPermitidos: {host_ip}")
             except Exception as ie:
                 logger.error(f"Erro inserindo IP inicial: {ie}")
+
+        ip_allowlist.reload()
     except Exception as e:
         logger.error(f"Erro durante criação/verificação de tabela tabIpPermitidos: {e}")
 
@@ -203,9 +284,9 @@ async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         while True:
-            # Keep connection alive and listen for any client messages (ping/pong)
+            # Keep connection alive and listen for client messages (ping/pong, subscribe)
             data = await websocket.receive_text()
-            # Optional: handle client messages if needed
+            await manager.handle_client_message(websocket, data)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
@@ -1358,6 +1439,9 @@ async def save_os(data: SaveOSRequest):
             """
             cursor.execute(query_hist, (new_cod_status, new_id, current_year, obs_criacao, ponto_formatado))
 
+        # Projeção lida pela busca/painel/PCP da API modular (:8001)
+        safe_refresh_os_status(cursor, [(new_id, current_year)])
+
         return {"status": "ok", "id": new_id, "ano": current_year, "message": "OS salva com sucesso", "action": "update" if is_update else "create"}
 
     try:
@@ -1427,6 +1511,7 @@ async def add_os_history(ano: int, id: int, item: HistoryItem):
             "INSERT INTO tabAndamento (CodStatus, NroProtocoloLink, AnoProtocoloLink, SituacaoLink, SetorLink, `Data`, UltimoStatus, `Observaçao`, Ponto) VALUES (%(cod)s, %(id)s, %(ano)s, %(situacao)s, %(setor)s, NOW(), 1, %(obs)s, %(usuario)s)",
             {'cod': new_cod, 'id': id, 'ano': ano, 'situacao': item.situacao, 'setor': item.setor, 'obs': obs_formatada, 'usuario': ponto_formatado}
         )
+        safe_refresh_os_status(cursor, [(id, ano)])
         return {"new_id": new_cod}
     try:
         result = db.execute_transaction([transaction_logic])
@@ -1464,6 +1549,7 @@ async def update_os_history(ano: int, id: int, item: HistoryUpdateItem):
             """,
             {'situacao': item.situacao, 'setor': item.setor, 'obs': item.obs, 'usuario': clean_user, 'cod': item.cod_status, 'id': id, 'ano': ano}
         )
+        safe_refresh_os_status(cursor, [(id, ano)])
         return {"status": "updated"}
 
     try:
@@ -1505,6 +1591,7 @@ async def delete_os_history(ano: int, id: int, cod_status: str):
             )
         """, (id, ano))
 
+        safe_refresh_os_status(cursor, [(id, ano)])
         return {"status": "deleted"}
 
     try:
@@ -1622,6 +1709,7 @@ def replicate_history(ano: int, id: int, item: HistoryItem):
                 "INSERT INTO tabAndamento (CodStatus, NroProtocoloLink, AnoProtocoloLink, SituacaoLink, SetorLink, `Data`, UltimoStatus, `Observaçao`, Ponto) VALUES (%s, %s, %s, %s, %s, NOW(), 1, %s, %s)",
                 (new_cod, t_num, t_ano, item.situacao, item.setor, obs_formatada, ponto_formatado)
             )
+        safe_refresh_os_status(cursor, targets)
         return {"status": "ok", "replicated_to": len(targets)}
     try:
         return db.execute_transaction([transaction_logic])[0]
@@ -1689,6 +1777,7 @@ def admin_add_ip(item: dict):
         raise HTTPException(status_code=400, detail="Campo 'ip' é obrigatório")
     try:
         db.execute_query("INSERT INTO tabIpPermitidos (ip, descricao, ativo) VALUES (%s, %s, %s)", (ip, descricao, ativo))
+        ip_allowlist.invalidate()
         return {"status": "ok"}
     except Exception as e:
         logger.error(f"Erro adicionando IP: {e}")
@@ -1717,6 +1806,7 @@ def admin_update_ip(item: dict):
     try:
         q = f"UPDATE tabIpPermitidos SET {', '.join(fields)} WHERE id = %s"
         db.execute_query(q, tuple(params))
+        ip_allowlist.invalidate()
         return {"status": "ok"}
     except Exception as e:
         logger.error(f"Erro atualizando IP: {e}")
@@ -1730,6 +1820,7 @@ def admin_delete_ip(item: dict):
         raise HTTPException(status_code=400, detail="Campo 'id' é obrigatório")
     try:
         db.execute_query("DELETE FROM tabIpPermitidos WHERE id = %s", (_id,))
+        ip_allowlist.invalidate()
         return {"status": "ok"}
     except Exception as e:
         logger.error(f"Erro deletando IP: {e}")
@@ -25,9 +25,29 @@ import logging
 import time
 import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from dataclasses import dataclass
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from andamento_index import AndamentoIndex, SyncPlan, diff_sources, find_mdb, os_key
+from os_status_service import ensure_os_status_table, refresh_os_status
+from metrics_service import SyncMetrics
+
+_MYSQL_INSERT_SQL = """
+    INSERT INTO tabandamento
+    (CodStatus, NroProtocoloLink, AnoProtocoloLink, SituacaoLink,
+     SetorLink, Data, UltimoStatus, Observaçao, Ponto)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+_MDB_INSERT_SQL = """
+    INSERT INTO tabandamento
+    (CodStatus, NroProtocoloLink, AnoProtocoloLink, SituacaoLink,
+     SetorLink, Data, UltimoStatus, Observaçao, Ponto)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
 #===================================================================== 
 # CONFIGURAÇÃO
@@ -44,6 +64,13 @@ class Config:
     mdb_papelaria_path: str
     dias_monitoramento: int = 30
     intervalo_segundos: float = 2.0
+    # Ciclo incremental por marca d'água; a reconciliação completa roda a cada N segundos
+    modo_incremental: bool = True
+    reconciliacao_segundos: float = 300.0
+    # Linhas por executemany nas gravações em lote (1 = uma instrução por andamento)
+    lote_escrita: int = 500
+    # Leituras e formatação das três fontes em paralelo (uma thread fixa por fonte)
+    leituras_paralelas: bool = True
     
     @classmethod
     def load(cls, filepath='config.json'):
@@ -58,10 +85,32 @@ class Config:
             mdb_os_atual_path=cfg.get('mdb_os_atual_path'),
             mdb_papelaria_path=cfg.get('mdb_papelaria_path'),
             dias_monitoramento=cfg.get('dias_monitoramento', 30),
-            intervalo_segundos=cfg.get('intervalo_verificacao_segundos', 2.0)
+            intervalo_segundos=cfg.get('intervalo_verificacao_segundos', 2.0),
+            modo_incremental=cfg.get('sync_modo_incremental', True),
+            reconciliacao_segundos=cfg.get('sync_reconciliacao_segundos', 300.0),
+            lote_escrita=cfg.get('sync_lote_escrita', 500),
+            leituras_paralelas=cfg.get('sync_leituras_paralelas', True)
         )
 
 
+@dataclass
+class Watermark:
+    """Maior CodStatus e maior Data já lidos de uma fonte."""
+    cod_status: Optional[str] = None
+    data: Optional[datetime] = None
+
+    def advance(self, rows: List[Dict]):
+        for row in rows:
+            cod, data = row.get('CodStatus'), row.get('Data')
+            if cod and (self.cod_status is None or cod > self.cod_status):
+                self.cod_status = cod
+            if data and (self.data is None or data > self.data):
+                self.data = data
+
+    def is_set(self) -> bool:
+        return self.data is not None
+
+
 #=====================================================================
 # GERENCIADOR DE CONEXÕES
 #=====================================================================
@@ -135,6 +184,10 @@ class SyncLogger:
         )
         self.logger = logging.getLogger(__name__)
         
+        # Linhas de log_sync_andamentos acumuladas durante um batch() (None = grava na hora)
+        self._pending: Optional[List[tuple]] = None
+        self._batch_limit = 500
+        
         # Criar tabelas de log
         self._create_log_tables()
     
@@ -217,21 +270,50 @@ class SyncLogger:
         except Exception as e:
             self.logger.error(f"[ERRO] Erro ao criar tabelas de log: {e}")
     
-    def log(self, tipo: str, origem: str, destino: str, codstatus: str,
-            nro: int = None, ano: int = None, detalhes: str = None,
-            sucesso: bool = True, erro: str = None):
+    @contextmanager
+    def batch(self, limite: int = 500):
+        """Acumula as linhas de log do bloco e grava com executemany (a cada `limite` e ao sair)."""
+        self._pending = []
+        self._batch_limit = max(1, limite)
+        try:
+            yield self
+        finally:
+            self.flush()
+            self._pending = None
+
+    def flush(self):
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        self._write(rows)
+
+    def _write(self, rows: List[tuple]):
         try:
             conn = self.conn_mgr.get_mysql()
             cursor = conn.cursor()
             
-            cursor.execute("""
+            cursor.executemany("""
                 INSERT INTO log_sync_andamentos
                 (tipo, origem, destino, codstatus, nro, ano, detalhes, sucesso, erro)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (tipo, origem, destino, codstatus, nro, ano, detalhes, sucesso, erro))
+            """, rows)
             
             conn.commit()
             cursor.close()
+        except Exception as e:
+            self.logger.error(f"[ERRO] Erro ao gravar log ({len(rows)} linhas): {e}")
+    
+    def log(self, tipo: str, origem: str, destino: str, codstatus: str,
+            nro: int = None, ano: int = None, detalhes: str = None,
+            sucesso: bool = True, erro: str = None):
+        try:
+            row = (tipo, origem, destino, codstatus, nro, ano, detalhes, sucesso, erro)
+            if self._pending is not None:
+                self._pending.append(row)
+                if len(self._pending) >= self._batch_limit:
+                    self.flush()
+            else:
+                self._write([row])
             
             # Log no console apenas mudanças
             if tipo in ['INSERT', 'DELETE']:
@@ -253,6 +335,32 @@ class BackupManager:
         self.conn_mgr = conn_mgr
         self.logger = logger
     
+    def backup_many(self, origem: str, registros: List[Dict[str, Any]]):
+        """Backup de vários registros numa única instrução (antes de uma exclusão em lote)."""
+        if not registros:
+            return
+        conn = self.conn_mgr.get_mysql()
+        cursor = conn.cursor()
+        try:
+            cursor.executemany("""
+                INSERT INTO backup_andamentos
+                (origem, codstatus, nro, ano, dados_json)
+                VALUES (%s, %s, %s, %s, %s)
+            """, [
+                (
+                    origem,
+                    registro.get('CodStatus'),
+                    registro.get('NroProtocoloLink'),
+                    registro.get('AnoProtocoloLink'),
+                    json.dumps(registro, ensure_ascii=False, default=str)
+                )
+                for registro in registros
+            ])
+            conn.commit()
+        finally:
+            cursor.close()
+        self.logger.logger.info(f"[BACKUP] {len(registros)} registros de {origem}")
+    
     def backup(self, origem: str, registro: Dict[str, Any]):
         try:
             conn = self.conn_mgr.get_mysql()
@@ -298,6 +406,37 @@ class AndamentosSynchronizer:
         # Cache para throttling de erros de inserção em MDB (ex.: FK faltando em tabProtocolos)
         self._mdb_insert_error_cache = {}  # {codstatus: (ultimo_timestamp, ultima_msg)}
         self._mdb_insert_error_interval = 300  # 5 minutos entre avisos iguais do mesmo CodStatus
+
+        # Duração do ciclo e linhas lidas/gravadas (metrics/sync_andamentos_v2.prom -> GET /metrics)
+        self.metrics = SyncMetrics("sync_andamentos_v2")
+
+        # Um executor de thread única por fonte (MySQL, OS_Atual, Papelaria): as tarefas de uma
+        # fonte rodam sempre na mesma thread e só usam a conexão dessa fonte, então duas threads
+        # nunca usam a mesma conexão ao mesmo tempo. As conexões são compartilhadas com a
+        # thread principal (gravações, cache, log), mas em sequência: ela só as usa depois que
+        # _per_source aguardou todas as tarefas, e nenhuma tarefa é enviada enquanto ela grava.
+        self._pool: Optional[Dict[str, ThreadPoolExecutor]] = (
+            {
+                fonte: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sync-{fonte}")
+                for fonte in ('mysql', 'mdb_os', 'mdb_pap')
+            }
+            if config.leituras_paralelas else None
+        )
+
+        # Modo incremental: estado conhecido de cada fonte (índice por CodStatus) e marcas
+        # d'água. Recarregados a cada reconciliação completa.
+        self._state: Dict[str, AndamentoIndex] = {
+            'mysql': AndamentoIndex('MySQL'),
+            'mdb_os': AndamentoIndex('OS_Atual'),
+            'mdb_pap': AndamentoIndex('Papelaria'),
+        }
+        self._watermarks: Dict[str, Watermark] = {}
+        self._tombstone_watermark: Optional[datetime] = None
+        # deleted_andamentos em memória (codstatus -> content_hash): recarregado a cada
+        # reconciliação, acrescido pelas marcas novas nos ciclos incrementais e mantido pelas
+        # próprias escritas. None = não carregado (consulta direta na tabela).
+        self._deleted: Optional[Dict[str, Optional[str]]] = None
+        self._last_full_sync: Optional[float] = None
     
     # ===================================================================
     # CONTROLE DE EXCLUSÕES DEFINITIVAS
@@ -321,8 +460,29 @@ class AndamentosSynchronizer:
         content_str = '|'.join(content_fields)
         return hashlib.sha256(content_str.encode('utf-8')).hexdigest()
     
+    def load_deleted(self):
+        """Carrega deleted_andamentos inteiro numa única consulta e posiciona a marca d'água."""
+        try:
+            conn = self.conn_mgr.get_mysql()
+            cursor = conn.cursor()
+            cursor.execute("SELECT codstatus, content_hash, deleted_at FROM deleted_andamentos")
+            rows = cursor.fetchall()
+            cursor.close()
+            conn.commit()  # encerra o snapshot REPEATABLE READ da leitura
+            self._deleted = {codstatus: content_hash for codstatus, content_hash, _ in rows}
+            self._tombstone_watermark = max((d for _, _, d in rows if d), default=None)
+        except Exception as e:
+            self.logger.logger.error(f"[ERRO] Erro ao carregar deleted_andamentos: {e}")
+            self._deleted = None
+
+    def _forget_deleted(self, codstatus: str):
+        if self._deleted is not None:
+            self._deleted.pop(codstatus, None)
+
     def is_deleted(self, codstatus: str) -> bool:
         """Verifica se um CodStatus está na lista de exclusões definitivas"""
+        if self._deleted is not None:
+            return codstatus in self._deleted
         try:
             conn = self.conn_mgr.get_mysql()
             cursor = conn.cursor()
@@ -349,20 +509,25 @@ class AndamentosSynchronizer:
         - False: É novo registro ou não está excluído (PERMITIR)
         """
         try:
-            conn = self.conn_mgr.get_mysql()
-            cursor = conn.cursor(dictionary=True)
-            
-            cursor.execute("""
-                SELECT content_hash FROM deleted_andamentos WHERE codstatus = %s
-            """, (codstatus,))
-            
-            result = cursor.fetchone()
-            cursor.close()
-            
-            if not result:
-                return False  # Não está excluído, permitir
-            
-            stored_hash = result['content_hash']
+            if self._deleted is not None:
+                if codstatus not in self._deleted:
+                    return False  # Não está excluído, permitir
+                stored_hash = self._deleted[codstatus]
+            else:
+                conn = self.conn_mgr.get_mysql()
+                cursor = conn.cursor(dictionary=True)
+                
+                cursor.execute("""
+                    SELECT content_hash FROM deleted_andamentos WHERE codstatus = %s
+                """, (codstatus,))
+                
+                result = cursor.fetchone()
+                cursor.close()
+                
+                if not result:
+                    return False  # Não está excluído, permitir
+                
+                stored_hash = result['content_hash']
             current_hash = self._calculate_content_hash(andamento)
             
             # Se hash é diferente, é um NOVO registro legítimo
@@ -391,6 +556,7 @@ class AndamentosSynchronizer:
             cursor.execute("DELETE FROM deleted_andamentos WHERE codstatus = %s", (codstatus,))
             conn.commit()
             cursor.close()
+            self._forget_deleted(codstatus)
             
             self.logger.logger.info(f"[LIMPEZA] {codstatus} removido de deleted_andamentos (novo registro detectado)")
         except Exception as e:
@@ -435,6 +601,9 @@ class AndamentosSynchronizer:
             
             conn.commit()
             cursor.close()
+            if self._deleted is not None:
+                if content_hash or codstatus not in self._deleted:
+                    self._deleted[codstatus] = content_hash
             
             self.logger.logger.info(f"[EXCLUSÃO DEFINITIVA] {codstatus} marcado como excluído")
         except Exception as e:
@@ -450,6 +619,7 @@ class AndamentosSynchronizer:
 
             conn.commit()
             cursor.close()
+            self._forget_deleted(codstatus)
 
             self.logger.logger.info(
                 f"[LIMPEZA] {codstatus} removido de deleted_andamentos após sincronizar exclusão"
@@ -459,6 +629,55 @@ class AndamentosSynchronizer:
                 f"[ERRO] Erro ao remover {codstatus} de deleted_andamentos após exclusão: {e}"
             )
     
+    def mark_as_deleted_many(self, andamentos: List[Dict], origem: str, motivo: str):
+        """mark_as_deleted para vários andamentos (com hash do conteúdo) numa única instrução."""
+        if not andamentos:
+            return
+        rows = [
+            (a['CodStatus'], a.get('NroProtocoloLink'), a.get('AnoProtocoloLink'), origem,
+             self._calculate_content_hash(a), motivo)
+            for a in andamentos
+        ]
+        conn = self.conn_mgr.get_mysql()
+        cursor = conn.cursor()
+        try:
+            cursor.executemany("""
+                INSERT INTO deleted_andamentos 
+                (codstatus, nro, ano, origem, content_hash, motivo)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    deleted_at = CURRENT_TIMESTAMP,
+                    content_hash = VALUES(content_hash),
+                    motivo = VALUES(motivo)
+            """, rows)
+            conn.commit()
+        finally:
+            cursor.close()
+        if self._deleted is not None:
+            self._deleted.update((row[0], row[4]) for row in rows)
+        self.logger.logger.info(f"[EXCLUSÃO DEFINITIVA] {len(rows)} andamentos marcados como excluídos")
+
+    def remove_from_deleted_many(self, codes: List[str]):
+        """remove_from_deleted para vários CodStatus numa única instrução."""
+        if not codes:
+            return
+        try:
+            conn = self.conn_mgr.get_mysql()
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM deleted_andamentos WHERE codstatus IN (%s)" % ", ".join(["%s"] * len(codes)),
+                tuple(codes),
+            )
+            conn.commit()
+            cursor.close()
+            for code in codes:
+                self._forget_deleted(code)
+            self.logger.logger.info(
+                f"[LIMPEZA] {len(codes)} CodStatus removidos de deleted_andamentos após sincronizar exclusão"
+            )
+        except Exception as e:
+            self.logger.logger.error(f"[ERRO] Erro ao remover {len(codes)} CodStatus de deleted_andamentos: {e}")
+
     def detect_and_register_deletions(self, mysql_codes: set, mdb_all_codes: set):
         """
         Detecta exclusões comparando:
@@ -585,20 +804,31 @@ class AndamentosSynchronizer:
         
         return ponto_str
     
+    def _per_source(self, tarefas: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """
+        Executa uma tarefa por fonte, em paralelo quando `leituras_paralelas` está ligado, cada
+        uma no executor da própria fonte. Cada tarefa deve abrir/usar apenas a conexão da sua
+        fonte. Só retorna depois que todas terminaram (mesmo se alguma falhar), para a thread
+        principal voltar a usar as conexões sem concorrência. Retorna {fonte: resultado}.
+        """
+        if self._pool is None:
+            return {fonte: tarefa() for fonte, tarefa in tarefas.items()}
+        futuros = {fonte: self._pool[fonte].submit(tarefa) for fonte, tarefa in tarefas.items()}
+        wait(futuros.values())
+        return {fonte: futuro.result() for fonte, futuro in futuros.items()}
+
     def apply_formatting_to_recent_records(self):
         """Aplica formatacao aos registros do mes atual em todos os bancos"""
         try:
             # Data limite: mes anterior (30 dias atras)
             data_limite = datetime.now() - timedelta(days=30)
             
-            # Formatar MySQL
-            self._format_mysql_records(data_limite)
-            
-            # Formatar MDB OS Atual
-            self._format_mdb_records(self.conn_mgr.get_mdb_os(), data_limite, "OS_Atual")
-            
-            # Formatar MDB Papelaria
-            self._format_mdb_records(self.conn_mgr.get_mdb_pap(), data_limite, "Papelaria")
+            # MySQL, MDB OS Atual e MDB Papelaria (cada um na sua conexão)
+            self._per_source({
+                'mysql': lambda: self._format_mysql_records(data_limite),
+                'mdb_os': lambda: self._format_mdb_records(self.conn_mgr.get_mdb_os(), data_limite, "OS_Atual"),
+                'mdb_pap': lambda: self._format_mdb_records(self.conn_mgr.get_mdb_pap(), data_limite, "Papelaria"),
+            })
             
         except Exception as e:
             self.logger.logger.error(f"[ERRO] Erro ao formatar registros recentes: {e}")
@@ -675,45 +905,61 @@ class AndamentosSynchronizer:
         except Exception as e:
             self.logger.logger.error(f"[ERRO] Erro ao formatar {nome_banco}: {e}")
     
-    def read_mysql(self) -> List[Dict]:
+    def read_mysql(self, watermark: Optional[Watermark] = None) -> List[Dict]:
+        """Andamentos da janela monitorada; com `watermark`, apenas os novos desde a última leitura."""
         try:
             conn = self.conn_mgr.get_mysql()
             cursor = conn.cursor(dictionary=True)
             
             data_limite = self.get_data_limite()
-            
-            cursor.execute("""
+            params = [data_limite]
+            filtro_incremental = ""
+            if watermark is not None and watermark.is_set():
+                # Data >= (inclusiva: vários andamentos no mesmo segundo) ou CodStatus acima do maior visto
+                filtro_incremental = " AND (Data >= %s OR CodStatus > %s)"
+                params += [watermark.data, watermark.cod_status or '']
+            
+            cursor.execute(f"""
                 SELECT 
                     CodStatus, NroProtocoloLink, AnoProtocoloLink,
                     SituacaoLink, SetorLink, Data, UltimoStatus,
                     Observaçao, Ponto
                 FROM tabandamento
-                WHERE Data >= %s AND CodStatus IS NOT NULL
+                WHERE Data >= %s AND CodStatus IS NOT NULL{filtro_incremental}
                 ORDER BY CodStatus
-            """, (data_limite,))
+            """, tuple(params))
             
             result = cursor.fetchall()
             cursor.close()
+            # Encerra o snapshot REPEATABLE READ: sem isso, leituras seguintes sem escrita
+            # no meio continuariam vendo o mesmo estado
+            conn.commit()
             return result
         except Exception as e:
             self.logger.logger.error(f"[ERRO] Erro ao ler MySQL: {e}")
             return []
     
-    def read_mdb(self, conn: pyodbc.Connection) -> List[Dict]:
+    def read_mdb(self, conn: pyodbc.Connection, watermark: Optional[Watermark] = None) -> List[Dict]:
+        """Andamentos da janela monitorada; com `watermark`, apenas os novos desde a última leitura."""
         try:
             cursor = conn.cursor()
             
             data_limite = self.get_data_limite()
+            params = [data_limite]
+            filtro_incremental = ""
+            if watermark is not None and watermark.is_set():
+                filtro_incremental = " AND (Data >= ? OR CodStatus > ?)"
+                params += [watermark.data, watermark.cod_status or '']
             
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT 
                     CodStatus, NroProtocoloLink, AnoProtocoloLink,
                     SituacaoLink, SetorLink, Data, UltimoStatus,
                     Observaçao, Ponto
                 FROM tabandamento
-                WHERE Data >= ?
+                WHERE Data >= ?{filtro_incremental}
                 ORDER BY CodStatus
-            """, (data_limite,))
+            """, tuple(params))
             
             columns = [col[0] for col in cursor.description]
             result = []
@@ -749,6 +995,53 @@ class AndamentosSynchronizer:
             cursor.close()
         except Exception as e:
             self.logger.logger.error(f"[ERRO] Erro ao atualizar cache: {e}")
+
+    def add_to_cache(self, andamentos: List[Dict], origem: str):
+        """
+        Acrescenta ao cache os andamentos novos vistos no ciclo incremental, para que uma
+        exclusão no MDB antes da próxima reconciliação seja detectada (e não reinserida).
+        """
+        if not andamentos:
+            return
+        try:
+            conn = self.conn_mgr.get_mysql()
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT IGNORE INTO cache_andamentos_mdb (codstatus, nro, ano, origem)
+                VALUES (%s, %s, %s, %s)
+            """, [(a['CodStatus'], a['NroProtocoloLink'], a['AnoProtocoloLink'], origem) for a in andamentos])
+            conn.commit()
+            cursor.close()
+        except Exception as e:
+            self.logger.logger.error(f"[ERRO] Erro ao acrescentar ao cache: {e}")
+
+    def read_new_tombstones(self) -> List[str]:
+        """
+        CodStatus marcados em deleted_andamentos desde a última leitura (marca d'água em
+        deleted_at); também os acrescenta ao conjunto em memória.
+        """
+        try:
+            conn = self.conn_mgr.get_mysql()
+            cursor = conn.cursor()
+            if self._tombstone_watermark is None:
+                cursor.execute("SELECT codstatus, content_hash, deleted_at FROM deleted_andamentos")
+            else:
+                cursor.execute(
+                    "SELECT codstatus, content_hash, deleted_at FROM deleted_andamentos WHERE deleted_at >= %s",
+                    (self._tombstone_watermark,),
+                )
+            rows = cursor.fetchall()
+            cursor.close()
+            conn.commit()  # encerra o snapshot REPEATABLE READ da leitura
+            for codstatus, content_hash, deleted_at in rows:
+                if self._deleted is not None:
+                    self._deleted[codstatus] = content_hash
+                if deleted_at and (self._tombstone_watermark is None or deleted_at > self._tombstone_watermark):
+                    self._tombstone_watermark = deleted_at
+            return [codstatus for codstatus, _, _ in rows]
+        except Exception as e:
+            self.logger.logger.error(f"[ERRO] Erro ao ler deleted_andamentos: {e}")
+            return []
     
     # ===================================================================
     # SINCRONIZAÇÃO DE TABELAS RELACIONADAS (tabProtocolos e tabDetalhesServico)
@@ -931,6 +1224,60 @@ class AndamentosSynchronizer:
                 f"[ERRO] Erro ao replicar UltimoStatus do MDB para MySQL em {nro}/{ano}: {e}"
             )
     
+    def _block_resurrection(self, andamento: Dict, origem: str, destino: str) -> bool:
+        """
+        VERIFICAÇÃO CRÍTICA: bloqueia RESSURREIÇÃO de registros excluídos, mas permite
+        NOVOS registros legítimos (mesmo CodStatus, conteúdo diferente).
+        """
+        codstatus = andamento['CodStatus']
+        if not self.is_resurrection(codstatus, andamento):
+            return False
+
+        # Throttle de avisos: só logar a cada 5 minutos para o mesmo CodStatus
+        current_time = time.time()
+        last_warning = self._blocked_warnings_cache.get(codstatus, 0)
+
+        if current_time - last_warning >= self._blocked_warning_interval:
+            self.logger.logger.warning(
+                f"[BLOQUEADO] CodStatus {codstatus} é RESSURREIÇÃO de registro excluído. "
+                f"Inserções bloqueadas continuamente (aviso a cada 5min)."
+            )
+            self._blocked_warnings_cache[codstatus] = current_time
+
+        # Log detalhado sempre (para estatísticas)
+        self.logger.log(
+            'INSERT_BLOCKED', origem, destino, codstatus,
+            andamento.get('NroProtocoloLink'), andamento.get('AnoProtocoloLink'),
+            'Bloqueado: ressurreição de registro excluído'
+        )
+        return True
+
+    @staticmethod
+    def _mysql_row(andamento: Dict) -> tuple:
+        return (
+            andamento['CodStatus'], andamento['NroProtocoloLink'], andamento['AnoProtocoloLink'],
+            andamento['SituacaoLink'], andamento['SetorLink'], andamento['Data'],
+            andamento['UltimoStatus'], andamento['Observaçao'],
+            andamento['Ponto']
+        )
+
+    @staticmethod
+    def _mdb_row(andamento: Dict) -> tuple:
+        # Preservar quebras de linha
+        obs = andamento.get('Observaçao', '')
+        if obs:
+            obs = obs.replace('\n', '\r\n')
+        return (
+            andamento['CodStatus'], andamento['NroProtocoloLink'],
+            andamento['AnoProtocoloLink'], andamento['SituacaoLink'],
+            andamento['SetorLink'], andamento['Data'],
+            andamento['UltimoStatus'], obs, andamento['Ponto']
+        )
+
+    def _chunks(self, itens: List) -> List[List]:
+        tamanho = max(1, int(self.config.lote_escrita or 1))
+        return [itens[i:i + tamanho] for i in range(0, len(itens), tamanho)]
+
     def insert_mysql(self, andamento: Dict, origem: str):
         """
         Insere registro no MySQL, mas apenas se NÃO estiver na lista de exclusões.
@@ -941,7 +1288,6 @@ class AndamentosSynchronizer:
         tabDetalhesServico já estejam atualizadas.
         """
         try:
-            codstatus = andamento['CodStatus']
             nro = andamento['NroProtocoloLink']
             ano = andamento['AnoProtocoloLink']
 
@@ -949,24 +1295,7 @@ class AndamentosSynchronizer:
             # VERIFICAÇÃO CRÍTICA: Bloquear RESSURREIÇÃO de registros excluídos
             # MAS permitir NOVOS registros legítimos (mesmo CodStatus, conteúdo diferente)
             # ===================================================================
-            if self.is_resurrection(codstatus, andamento):
-                # Throttle de avisos: só logar a cada 5 minutos para o mesmo CodStatus
-                current_time = time.time()
-                last_warning = self._blocked_warnings_cache.get(codstatus, 0)
-
-                if current_time - last_warning >= self._blocked_warning_interval:
-                    self.logger.logger.warning(
-                        f"[BLOQUEADO] CodStatus {codstatus} é RESSURREIÇÃO de registro excluído. "
-                        f"Inserções bloqueadas continuamente (aviso a cada 5min)."
-                    )
-                    self._blocked_warnings_cache[codstatus] = current_time
-
-                # Log detalhado sempre (para estatísticas)
-                self.logger.log(
-                    'INSERT_BLOCKED', origem, 'MySQL', codstatus,
-                    nro, ano,
-                    'Bloqueado: ressurreição de registro excluído'
-                )
+            if self._block_resurrection(andamento, origem, 'MySQL'):
                 return  # NÃO INSERIR
 
             # ===================================================================
@@ -975,17 +1304,7 @@ class AndamentosSynchronizer:
             conn = self.conn_mgr.get_mysql()
             cursor = conn.cursor()
             
-            cursor.execute("""
-                INSERT INTO tabandamento
-                (CodStatus, NroProtocoloLink, AnoProtocoloLink, SituacaoLink,
-                 SetorLink, Data, UltimoStatus, Observaçao, Ponto)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                andamento['CodStatus'], nro, ano,
-                andamento['SituacaoLink'], andamento['SetorLink'], andamento['Data'],
-                andamento['UltimoStatus'], andamento['Observaçao'],
-                andamento['Ponto']
-            ))
+            cursor.execute(_MYSQL_INSERT_SQL, self._mysql_row(andamento))
             
             conn.commit()
             cursor.close()
@@ -995,6 +1314,7 @@ class AndamentosSynchronizer:
                 nro, ano,
                 'Novo andamento sincronizado'
             )
+            return True
         except Exception as e:
             conn.rollback()
             self.logger.log(
@@ -1009,50 +1329,16 @@ class AndamentosSynchronizer:
         BLOQUEIO DE REINSERÇÃO: Registros excluídos nunca voltam.
         """
         try:
-            codstatus = andamento['CodStatus']
-            
             # ===================================================================
             # VERIFICAÇÃO CRÍTICA: Bloquear RESSURREIÇÃO de registros excluídos
             # MAS permitir NOVOS registros legítimos (mesmo CodStatus, conteúdo diferente)
             # ===================================================================
-            if self.is_resurrection(codstatus, andamento):
-                # Throttle de avisos: só logar a cada 5 minutos para o mesmo CodStatus
-                current_time = time.time()
-                last_warning = self._blocked_warnings_cache.get(codstatus, 0)
-                
-                if current_time - last_warning >= self._blocked_warning_interval:
-                    self.logger.logger.warning(
-                        f"[BLOQUEADO] CodStatus {codstatus} é RESSURREIÇÃO de registro excluído. "
-                        f"Inserções bloqueadas continuamente (aviso a cada 5min)."
-                    )
-                    self._blocked_warnings_cache[codstatus] = current_time
-                
-                # Log detalhado sempre (para estatísticas)
-                self.logger.log(
-                    'INSERT_BLOCKED', 'MySQL', destino, codstatus,
-                    andamento.get('NroProtocoloLink'), andamento.get('AnoProtocoloLink'),
-                    'Bloqueado: ressurreição de registro excluído'
-                )
+            if self._block_resurrection(andamento, 'MySQL', destino):
                 return  # NÃO INSERIR
             
             cursor = conn.cursor()
             
-            # Preservar quebras de linha
-            obs = andamento.get('Observaçao', '')
-            if obs:
-                obs = obs.replace('\n', '\r\n')
-            
-            cursor.execute("""
-                INSERT INTO tabandamento
-                (CodStatus, NroProtocoloLink, AnoProtocoloLink, SituacaoLink,
-                 SetorLink, Data, UltimoStatus, Observaçao, Ponto)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                andamento['CodStatus'], andamento['NroProtocoloLink'],
-                andamento['AnoProtocoloLink'], andamento['SituacaoLink'],
-                andamento['SetorLink'], andamento['Data'],
-                andamento['UltimoStatus'], obs, andamento['Ponto']
-            ))
+            cursor.execute(_MDB_INSERT_SQL, self._mdb_row(andamento))
             
             conn.commit()
             cursor.close()
@@ -1062,6 +1348,7 @@ class AndamentosSynchronizer:
                 andamento['NroProtocoloLink'], andamento['AnoProtocoloLink'],
                 'Novo andamento'
             )
+            return True
         except Exception as e:
             conn.rollback()
             error_msg = str(e)
@@ -1078,34 +1365,37 @@ class AndamentosSynchronizer:
                     sucesso=False, erro=error_msg
                 )
     
-    def delete_mysql(self, codstatus: str, andamento: Dict):
+    def delete_mysql(self, codstatus: str, andamento: Dict, backup: bool = True, marcar: bool = True):
         """
         Remove andamento do MySQL E registra na tabela deleted_andamentos.
         
         IMPORTANTE: Registra o hash do conteúdo para prevenir ressurreição.
         Isso garante que exclusões manuais no MySQL também sejam respeitadas.
+        `backup`/`marcar` = False pulam as etapas já feitas (repetição de um lote que falhou).
         """
+        nro = andamento.get('NroProtocoloLink')
+        ano = andamento.get('AnoProtocoloLink')
         try:
             # Backup primeiro
-            self.backup_mgr.backup('MySQL', andamento)
+            if backup:
+                self.backup_mgr.backup('MySQL', andamento)
             
             # ===================================================================
             # CORREÇÃO: Registrar exclusão ANTES de deletar
             # Isso garante que mesmo exclusões manuais no MySQL sejam respeitadas
             # ===================================================================
-            nro = andamento.get('NroProtocoloLink')
-            ano = andamento.get('AnoProtocoloLink')
             origem = 'MySQL'  # Origem da exclusão
             
             # Marcar como excluído com hash (previne ressurreição)
-            self.mark_as_deleted(
-                codstatus, 
-                nro, 
-                ano, 
-                origem, 
-                andamento=andamento,  # Passa andamento para calcular hash
-                motivo='Exclusão manual no MySQL ou detectada por sync'
-            )
+            if marcar:
+                self.mark_as_deleted(
+                    codstatus, 
+                    nro, 
+                    ano, 
+                    origem, 
+                    andamento=andamento,  # Passa andamento para calcular hash
+                    motivo='Exclusão manual no MySQL ou detectada por sync'
+                )
             
             # Agora sim, deletar do MySQL
             conn = self.conn_mgr.get_mysql()
@@ -1118,12 +1408,14 @@ class AndamentosSynchronizer:
             
             conn.commit()
             cursor.close()
+            self._forget_deleted(codstatus)
             
             self.logger.log(
                 'DELETE', 'MDB', 'MySQL', codstatus,
                 nro, ano,
                 'Exclusão propagada e removida de deleted_andamentos'
             )
+            return True
         except Exception as e:
             conn.rollback()
             self.logger.log(
@@ -1154,6 +1446,7 @@ class AndamentosSynchronizer:
                 andamento.get('NroProtocoloLink'), andamento.get('AnoProtocoloLink'),
                 f'Excluído do {origem} para sincronizar com MySQL'
             )
+            return True
         except Exception as e:
             mdb_conn.rollback()
             self.logger.log(
@@ -1162,6 +1455,156 @@ class AndamentosSynchronizer:
                 sucesso=False, erro=str(e)
             )
     
+    # ===================================================================
+    # GRAVAÇÃO EM LOTE
+    # Uma transação por lote de `lote_escrita` andamentos e por destino. Se o lote
+    # falhar, repete linha a linha com os métodos acima para isolar o registro com
+    # problema (e manter o log de erro por CodStatus).
+    # ===================================================================
+
+    def insert_mysql_many(self, itens: List[tuple]) -> List[Dict]:
+        """Insere (andamento, origem) no MySQL com executemany. Retorna os inseridos."""
+        itens = [(a, origem) for a, origem in itens if not self._block_resurrection(a, origem, 'MySQL')]
+        inseridos = []
+        conn = self.conn_mgr.get_mysql()
+        for lote in self._chunks(itens):
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(_MYSQL_INSERT_SQL, [self._mysql_row(a) for a, _ in lote])
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                self.logger.logger.warning(
+                    f"[LOTE] Falha ao inserir {len(lote)} andamentos no MySQL, repetindo um a um: {e}"
+                )
+                inseridos += [a for a, origem in lote if self.insert_mysql(a, origem)]
+                continue
+            finally:
+                cursor.close()
+            for a, origem in lote:
+                self.logger.log(
+                    'INSERT', origem, 'MySQL', a['CodStatus'],
+                    a['NroProtocoloLink'], a['AnoProtocoloLink'],
+                    'Novo andamento sincronizado'
+                )
+            inseridos += [a for a, _ in lote]
+        return inseridos
+
+    def insert_mdb_many(self, andamentos: List[Dict], conn: pyodbc.Connection, destino: str) -> List[Dict]:
+        """Insere andamentos num MDB com executemany. Retorna os inseridos."""
+        andamentos = [a for a in andamentos if not self._block_resurrection(a, 'MySQL', destino)]
+        inseridos = []
+        for lote in self._chunks(andamentos):
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(_MDB_INSERT_SQL, [self._mdb_row(a) for a in lote])
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                self.logger.logger.warning(
+                    f"[LOTE] Falha ao inserir {len(lote)} andamentos no {destino}, repetindo um a um: {e}"
+                )
+                inseridos += [a for a in lote if self.insert_mdb(a, conn, destino)]
+                continue
+            finally:
+                cursor.close()
+            for a in lote:
+                self.logger.log(
+                    'INSERT', 'MySQL', destino, a['CodStatus'],
+                    a['NroProtocoloLink'], a['AnoProtocoloLink'],
+                    'Novo andamento'
+                )
+            inseridos += lote
+        return inseridos
+
+    def delete_mysql_many(self, andamentos: List[Dict]) -> List[Dict]:
+        """
+        delete_mysql em lote: backup e registro em deleted_andamentos (com hash) antes,
+        depois exclusão e limpeza do controle na mesma transação. Retorna os excluídos.
+        Na repetição linha a linha após uma falha, as etapas que já foram gravadas para o
+        lote inteiro não são refeitas (sem backup duplicado).
+        """
+        excluidos = []
+        conn = self.conn_mgr.get_mysql()
+        for lote in self._chunks(andamentos):
+            try:
+                self.backup_mgr.backup_many('MySQL', lote)
+            except Exception as e:
+                # Sem backup não exclui: repete linha a linha
+                conn.rollback()
+                self.logger.logger.warning(f"[LOTE] Falha no backup de {len(lote)} andamentos: {e}")
+                excluidos += [a for a in lote if self.delete_mysql(a['CodStatus'], a)]
+                continue
+            try:
+                self.mark_as_deleted_many(lote, 'MySQL', 'Exclusão manual no MySQL ou detectada por sync')
+            except Exception as e:
+                conn.rollback()
+                self.logger.logger.warning(f"[LOTE] Falha ao registrar exclusão de {len(lote)} andamentos: {e}")
+                excluidos += [a for a in lote if self.delete_mysql(a['CodStatus'], a, backup=False)]
+                continue
+            codes = tuple(a['CodStatus'] for a in lote)
+            marcadores = ", ".join(["%s"] * len(codes))
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"DELETE FROM tabandamento WHERE CodStatus IN ({marcadores})", codes)
+                # Após propagar a exclusão, limpar o registro de controle
+                cursor.execute(f"DELETE FROM deleted_andamentos WHERE codstatus IN ({marcadores})", codes)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                self.logger.logger.warning(
+                    f"[LOTE] Falha ao excluir {len(lote)} andamentos do MySQL, repetindo um a um: {e}"
+                )
+                # Backup e registro do lote já gravados: só exclusão e limpeza por linha
+                excluidos += [
+                    a for a in lote if self.delete_mysql(a['CodStatus'], a, backup=False, marcar=False)
+                ]
+                continue
+            finally:
+                cursor.close()
+            for a in lote:
+                self._forget_deleted(a['CodStatus'])
+                self.logger.log(
+                    'DELETE', 'MDB', 'MySQL', a['CodStatus'],
+                    a.get('NroProtocoloLink'), a.get('AnoProtocoloLink'),
+                    'Exclusão propagada e removida de deleted_andamentos'
+                )
+            excluidos += lote
+        return excluidos
+
+    def delete_mdb_many(self, andamentos: List[Dict], mdb_conn, origem: str) -> List[Dict]:
+        """delete_mdb em lote (DELETE ... IN por lote). Retorna os excluídos."""
+        excluidos = []
+        for lote in self._chunks(andamentos):
+            codes = tuple(a['CodStatus'] for a in lote)
+            cursor = mdb_conn.cursor()
+            try:
+                cursor.execute(
+                    "DELETE FROM tabandamento WHERE CodStatus IN (%s)" % ", ".join(["?"] * len(codes)),
+                    codes,
+                )
+                mdb_conn.commit()
+            except Exception as e:
+                mdb_conn.rollback()
+                self.logger.logger.warning(
+                    f"[LOTE] Falha ao excluir {len(lote)} andamentos do {origem}, repetindo um a um: {e}"
+                )
+                excluidos += [a for a in lote if self.delete_mdb(a['CodStatus'], a, mdb_conn, origem)]
+                continue
+            finally:
+                cursor.close()
+
+            # Após excluir do MDB, remover o controle de exclusão
+            self.remove_from_deleted_many(list(codes))
+            for a in lote:
+                self.logger.log(
+                    'DELETE', 'MySQL', origem, a['CodStatus'],
+                    a.get('NroProtocoloLink'), a.get('AnoProtocoloLink'),
+                    f'Excluído do {origem} para sincronizar com MySQL'
+                )
+            excluidos += lote
+        return excluidos
+    
     def update_ultimo_status(self, nro: int, ano: int):
         """Garante que apenas o último CodStatus tem UltimoStatus=TRUE"""
         try:
@@ -1214,18 +1657,201 @@ class AndamentosSynchronizer:
         except Exception as e:
             self.logger.logger.error(f"[ERRO] Erro ao atualizar UltimoStatus para {nro}/{ano}: {e}")
     
+    def refresh_status_projection(self, pares: set):
+        """Atualiza tab_os_status_atual para as OSs tocadas no ciclo (uma transação por ciclo)"""
+        if not pares:
+            return
+        try:
+            conn = self.conn_mgr.get_mysql()
+            cursor = conn.cursor()
+            ensure_os_status_table(cursor)
+            refresh_os_status(cursor, pares)
+            conn.commit()
+            cursor.close()
+        except Exception as e:
+            self.logger.logger.error(f"[ERRO] Erro ao atualizar tab_os_status_atual ({len(pares)} OSs): {e}")
+            # Não deixar comandos pendentes para o próximo commit desta conexão
+            try:
+                self.conn_mgr.get_mysql().rollback()
+            except Exception:
+                pass
+
     def perform_sync(self):
+        """
+        Ciclo de sincronização. No modo incremental, a maioria dos ciclos lê só os
+        andamentos novos de cada fonte (marca d'água); a reconciliação completa roda no
+        primeiro ciclo e a cada `reconciliacao_segundos`, e é quem detecta exclusões no MDB.
+        """
+        agora = time.monotonic()
+        # Linhas de log_sync_andamentos do ciclo gravadas em lote
+        with self.logger.batch(self.config.lote_escrita):
+            if (not self.config.modo_incremental or self._last_full_sync is None
+                    or agora - self._last_full_sync >= self.config.reconciliacao_segundos):
+                if self.perform_full_sync():
+                    self._last_full_sync = agora
+                else:
+                    self.metrics.cycle_failed()
+            else:
+                self.perform_incremental_sync()
+
+        # Aplicar formatacao aos registros recentes (a cada 10 ciclos, completos ou incrementais)
+        if not hasattr(self, '_format_counter'):
+            self._format_counter = 0
+        
+        self._format_counter += 1
+        if self._format_counter >= 10:
+            self.apply_formatting_to_recent_records()
+            self._format_counter = 0
+
+    def _read_indexes(self, watermarks: Optional[Dict[str, Watermark]] = None) -> Dict[str, AndamentoIndex]:
+        """Lê as três fontes (em paralelo, ver _per_source) e monta os índices (uma vez por leitura)."""
+        watermarks = watermarks or {}
+        dados = self._per_source({
+            'mysql': lambda: self.read_mysql(watermarks.get('mysql')),
+            'mdb_os': lambda: self.read_mdb(self.conn_mgr.get_mdb_os(), watermarks.get('mdb_os')),
+            'mdb_pap': lambda: self.read_mdb(self.conn_mgr.get_mdb_pap(), watermarks.get('mdb_pap')),
+        })
+        mysql_data, mdb_os_data, mdb_pap_data = dados['mysql'], dados['mdb_os'], dados['mdb_pap']
+        self.metrics.rows_read(len(mysql_data), fonte="mysql")
+        self.metrics.rows_read(len(mdb_os_data), fonte="mdb_os_atual")
+        self.metrics.rows_read(len(mdb_pap_data), fonte="mdb_papelaria")
+        return {
+            'mysql': AndamentoIndex('MySQL', mysql_data),
+            'mdb_os': AndamentoIndex('OS_Atual', mdb_os_data),
+            'mdb_pap': AndamentoIndex('Papelaria', mdb_pap_data),
+        }
+
+    def _reset_incremental_state(self, indices: Dict[str, AndamentoIndex]):
+        self._state = indices
+        for fonte, indice in indices.items():
+            watermark = Watermark()
+            watermark.advance(indice)
+            self._watermarks[fonte] = watermark
+
+    def _apply_plan(self, plan: SyncPlan, mysql: AndamentoIndex, mdb_os: AndamentoIndex,
+                    mdb_pap: AndamentoIndex, afetadas: set):
+        """
+        Aplica as inserções do plano em lote, por destino. Metadados da OS e UltimoStatus
+        são acertados uma vez por OS (nro, ano): os metadados antes das inserções, o
+        UltimoStatus depois.
+        """
+        # MDB → MySQL (novos). Verificar se o código está na lista de exclusões ANTES de
+        # tentar reinserir no MySQL (evita ressurreição de registros excluídos no MySQL)
+        para_mysql = [(a, origem) for a, origem in plan.para_mysql if not self.is_deleted(a['CodStatus'])]
+        oss: Dict[tuple, str] = {}
+        for and_, origem in para_mysql:
+            oss.setdefault(os_key(and_), origem)
+        for (nro, ano), origem in oss.items():
+            # Sincronizar metadados da OS apenas para OSs com mudança em tabandamento
+            self.sync_os_data_from_mdb(nro, ano, origem)
+        inseridos = self.insert_mysql_many(para_mysql)
+        self.metrics.rows_written(len(inseridos), destino="mysql")
+        for and_ in inseridos:
+            mysql.add(and_)
+        for nro, ano in oss:
+            # Replica UltimoStatus do MDB (origem) para o MySQL
+            self.ensure_mysql_ultimo_status_from_mdb(nro, ano)
+            afetadas.add((nro, ano))
+
+        # MySQL → MDB (novos), exceto os que estão na lista de exclusões
+        para_mdb = [a for a in plan.para_mdb if not self.is_deleted(a['CodStatus'])]
+        por_destino = {
+            mdb_os: [a for a in para_mdb if a['NroProtocoloLink'] < 5000],
+            mdb_pap: [a for a in para_mdb if a['NroProtocoloLink'] >= 5000],
+        }
+        for indice, alvos in por_destino.items():
+            if not alvos:
+                continue
+            nro = alvos[0]['NroProtocoloLink']
+            inseridos = self.insert_mdb_many(
+                alvos, self.conn_mgr.get_mdb_by_nro(nro), self.conn_mgr.get_mdb_name_by_nro(nro)
+            )
+            self.metrics.rows_written(len(inseridos), destino="mdb")
+            for and_ in inseridos:
+                indice.add(and_)
+            # Já no cache: se o usuário do Access excluir o registro antes da próxima
+            # reconciliação, a exclusão é detectada em vez de o registro voltar
+            self.add_to_cache(inseridos, indice.origem)
+        for nro, ano in sorted({os_key(a) for a in para_mdb}):
+            self.update_ultimo_status(nro, ano)
+            afetadas.add((nro, ano))
+
+    def _replicate_mysql_deletions(self, codes, mdb_os: AndamentoIndex, mdb_pap: AndamentoIndex):
+        """Exclui dos MDBs os `codes` excluídos no MySQL (frontend) que ainda existem lá."""
+        por_indice = {mdb_os: [], mdb_pap: []}
+        for code in codes:
+            and_mdb, indice = find_mdb(code, mdb_os, mdb_pap)
+            if and_mdb is not None:
+                por_indice[indice].append(and_mdb)
+        for indice, alvos in por_indice.items():
+            if not alvos:
+                continue
+            mdb_conn = self.conn_mgr.get_mdb_os() if indice is mdb_os else self.conn_mgr.get_mdb_pap()
+            excluidos = self.delete_mdb_many(alvos, mdb_conn, indice.origem)
+            self.metrics.rows_written(len(excluidos), destino="mdb")
+            for and_mdb in excluidos:
+                indice.remove(and_mdb['CodStatus'])
+
+    def perform_incremental_sync(self):
+        """
+        Ciclo incremental: lê apenas andamentos com Data >= maior Data vista (ou CodStatus
+        acima do maior visto) e aplica as inserções nos dois sentidos para esses códigos,
+        além das exclusões feitas pelo frontend (deleted_andamentos novos). Exclusões feitas
+        direto no MDB ficam para a reconciliação completa.
+        """
+        afetadas = set()
         try:
-            # Ler todos os dados
-            mysql_data = self.read_mysql()
-            mdb_os_data = self.read_mdb(self.conn_mgr.get_mdb_os())
-            mdb_pap_data = self.read_mdb(self.conn_mgr.get_mdb_pap())
+            # Marcas novas entram no conjunto em memória antes das verificações do ciclo
+            tombstones = self.read_new_tombstones()
+            deltas = self._read_indexes(self._watermarks)
+            mysql, mdb_os, mdb_pap = self._state['mysql'], self._state['mdb_os'], self._state['mdb_pap']
+
+            # Só interessam os códigos ainda não vistos (a janela Data >= marca repete o último segundo)
+            novos = {
+                fonte: AndamentoIndex(delta.origem, (a for a in delta if a['CodStatus'] not in self._state[fonte]))
+                for fonte, delta in deltas.items()
+            }
+            for fonte, delta in deltas.items():
+                for and_ in delta:
+                    self._state[fonte].add(and_)
+                self._watermarks[fonte].advance(delta)
+
+            self.add_to_cache(list(novos['mdb_os']), 'OS_Atual')
+            self.add_to_cache(list(novos['mdb_pap']), 'Papelaria')
+
+            # Os novos de cada lado contra o estado completo do outro
+            plan = SyncPlan(
+                para_mysql=diff_sources(mysql, novos['mdb_os'], novos['mdb_pap']).para_mysql,
+                para_mdb=diff_sources(novos['mysql'], mdb_os, mdb_pap).para_mdb,
+            )
+            self._apply_plan(plan, mysql, mdb_os, mdb_pap, afetadas)
+
+            # Exclusões feitas no MySQL (frontend) desde o último ciclo -> MDB
+            self._replicate_mysql_deletions(tombstones, mdb_os, mdb_pap)
+        except Exception as e:
+            self.logger.logger.error(f"[ERRO] Erro no ciclo incremental: {e}")
+            self.logger.logger.error(traceback.format_exc())
+            self.metrics.cycle_failed()
+            # Estado possivelmente incompleto: força reconciliação no próximo ciclo
+            self._last_full_sync = None
+        finally:
+            self.refresh_status_projection(afetadas)
+
+    def perform_full_sync(self) -> bool:
+        """Reconciliação completa da janela monitorada. Retorna True se o ciclo terminou sem erro."""
+        # OSs (nro, ano) alteradas no MySQL neste ciclo, para atualizar a projeção ao final
+        afetadas = set()
+        try:
+            # Exclusões definitivas: uma consulta por reconciliação em vez de uma por código
+            self.load_deleted()
+            
+            # Ler todos os dados e indexar por CodStatus / OS
+            indices = self._read_indexes()
+            mysql, mdb_os, mdb_pap = indices['mysql'], indices['mdb_os'], indices['mdb_pap']
             
             # Criar sets de CodStatus
-            mysql_codes = {a['CodStatus'] for a in mysql_data}
-            mdb_os_codes = {a['CodStatus'] for a in mdb_os_data}
-            mdb_pap_codes = {a['CodStatus'] for a in mdb_pap_data}
-            mdb_all_codes = mdb_os_codes | mdb_pap_codes
+            mysql_codes = mysql.codes()
+            mdb_all_codes = mdb_os.codes() | mdb_pap.codes()
             
             # ===================================================================
             # PASSO 1: DETECTAR E REGISTRAR EXCLUSÕES
@@ -1235,61 +1861,12 @@ class AndamentosSynchronizer:
             excluidos = self.detect_and_register_deletions(mysql_codes, mdb_all_codes)
             
             # Atualizar cache APÓS detectar exclusões
-            self.update_cache(mdb_os_data, mdb_pap_data)
-            
-            # MDB → MySQL (novos)
-            novos_no_mdb = mdb_all_codes - mysql_codes
-            for code in novos_no_mdb:
-                # ===================================================================
-                # CORREÇÃO: Verificar se o código está na lista de exclusões
-                # ANTES de tentar reinserir no MySQL.
-                # Isso evita ressurreição de registros excluídos no MySQL.
-                # ===================================================================
-                if self.is_deleted(code):
-                    # Log throttled (já implementado em insert_mysql via is_resurrection)
-                    continue
-                
-                and_ = None
-                origem = None
-                
-                for a in mdb_os_data:
-                    if a['CodStatus'] == code:
-                        and_ = a
-                        origem = 'OS_Atual'
-                        break
-                
-                if not and_:
-                    for a in mdb_pap_data:
-                        if a['CodStatus'] == code:
-                            and_ = a
-                            origem = 'Papelaria'
-                            break
-                
-                if and_:
-                    # Sincronizar metadados da OS apenas para OSs com mudança em tabandamento
-                    self.sync_os_data_from_mdb(and_['NroProtocoloLink'], and_['AnoProtocoloLink'], origem)
-
-                    self.insert_mysql(and_, origem)
-                    # Replica UltimoStatus do MDB (origem) para o MySQL
-                    self.ensure_mysql_ultimo_status_from_mdb(and_['NroProtocoloLink'], and_['AnoProtocoloLink'])
-            
-            # MySQL → MDB (novos)
-            # Inserir no MDB apenas registros que não estão na lista de exclusões
-            novos_no_mysql = mysql_codes - mdb_all_codes
-            for code in novos_no_mysql:
-                # Pular se está na lista de excluídos
-                if self.is_deleted(code):
-                    continue
-                    
-                and_ = next((a for a in mysql_data if a['CodStatus'] == code), None)
-                
-                if and_:
-                    nro = and_['NroProtocoloLink']
-                    mdb_conn = self.conn_mgr.get_mdb_by_nro(nro)
-                    destino = self.conn_mgr.get_mdb_name_by_nro(nro)
-                    
-                    self.insert_mdb(and_, mdb_conn, destino)
-                    self.update_ultimo_status(nro, and_['AnoProtocoloLink'])
+            self.update_cache(list(mdb_os), list(mdb_pap))
+            
+            # ===================================================================
+            # PASSO 2: NOVOS EM CADA LADO (MDB → MySQL e MySQL → MDB)
+            # ===================================================================
+            self._apply_plan(diff_sources(mysql, mdb_os, mdb_pap), mysql, mdb_os, mdb_pap, afetadas)
             
             # ===================================================================
             # PASSO 3: EXECUTAR EXCLUSÕES NO MYSQL
@@ -1297,41 +1874,25 @@ class AndamentosSynchronizer:
             # do MySQL para manter consistência
             # ===================================================================
             if excluidos:
-                for code in excluidos:
-                    and_ = next((a for a in mysql_data if a['CodStatus'] == code), None)
-                    if and_:
-                        self.delete_mysql(code, and_)
-                        # Após exclusão, alinhar UltimoStatus conforme o MDB de origem
-                        self.ensure_mysql_ultimo_status_from_mdb(
-                            and_['NroProtocoloLink'],
-                            and_['AnoProtocoloLink']
-                        )
+                alvos = [mysql.get(code) for code in sorted(excluidos) if code in mysql]
+                removidos = self.delete_mysql_many(alvos)
+                self.metrics.rows_written(len(removidos), destino="mysql")
+                for and_ in removidos:
+                    mysql.remove(and_['CodStatus'])
+                # Após exclusão, alinhar UltimoStatus conforme o MDB de origem (uma vez por OS)
+                for nro, ano in sorted({os_key(a) for a in alvos}):
+                    self.ensure_mysql_ultimo_status_from_mdb(nro, ano)
+                    afetadas.add((nro, ano))
             
             # ===================================================================
             # PASSO 3.5: REPLICAR EXCLUSÕES DO MYSQL PARA O MDB
             # Se um registro foi excluído do MySQL (via frontend), replicar no MDB
             # ===================================================================
-            for code in list(mdb_all_codes):
-                if self.is_deleted(code) and code in mdb_all_codes:
-                    # Buscar andamento no MDB para excluir
-                    and_mdb = None
-                    for a in mdb_os_data:
-                        if a['CodStatus'] == code:
-                            and_mdb = a
-                            mdb_conn = self.conn_mgr.get_mdb_os()
-                            origem = 'OS_Atual'
-                            break
-                    
-                    if not and_mdb:
-                        for a in mdb_pap_data:
-                            if a['CodStatus'] == code:
-                                and_mdb = a
-                                mdb_conn = self.conn_mgr.get_mdb_pap()
-                                origem = 'Papelaria'
-                                break
-                    
-                    if and_mdb:
-                        self.delete_mdb(code, and_mdb, mdb_conn, origem)
+            if self._deleted is not None:
+                marcados = sorted(mdb_all_codes & self._deleted.keys())
+            else:
+                marcados = [code for code in mdb_all_codes if self.is_deleted(code)]
+            self._replicate_mysql_deletions(marcados, mdb_os, mdb_pap)
             
             # ===================================================================
             # PASSO 4: DETECTAR EXCLUSÕES MANUAIS NO MYSQL
@@ -1339,31 +1900,36 @@ class AndamentosSynchronizer:
             # Ver: detect_and_register_deletions() que usa cache_andamentos_mdb
             # ===================================================================
             
-            # Aplicar formatacao aos registros recentes (a cada 10 ciclos)
-            if not hasattr(self, '_format_counter'):
-                self._format_counter = 0
-            
-            self._format_counter += 1
-            if self._format_counter >= 10:
-                self.apply_formatting_to_recent_records()
-                self._format_counter = 0
+            # Ponto de partida dos próximos ciclos incrementais
+            self._reset_incremental_state(indices)
+            return True
             
         except Exception as e:
             self.logger.logger.error(f"[ERRO] Erro no ciclo de sincronizacao: {e}")
             self.logger.logger.error(traceback.format_exc())
+            return False
+        finally:
+            self.refresh_status_projection(afetadas)
     
     def run_continuous(self):
         self.logger.logger.info("="*70)
         self.logger.logger.info("[INICIO] SINCRONIZACAO BIDIRECIONAL INICIADA")
         self.logger.logger.info(f"[INFO] Monitorando ultimos {self.config.dias_monitoramento} dias")
         self.logger.logger.info(f"[INFO] Intervalo: {self.config.intervalo_segundos}s")
+        if self.config.modo_incremental:
+            self.logger.logger.info(
+                f"[INFO] Modo incremental; reconciliacao completa a cada {self.config.reconciliacao_segundos}s"
+            )
+        if self.config.leituras_paralelas:
+            self.logger.logger.info("[INFO] Leituras de MySQL, OS_Atual e Papelaria em paralelo")
         self.logger.logger.info("="*70)
         
         try:
             while True:
                 inicio = time.time()
                 
-                self.perform_sync()
+                with self.metrics.cycle():
+                    self.perform_sync()
                 
                 tempo_decorrido = time.time() - inicio
                 if tempo_decorrido < self.config.intervalo_segundos:
@@ -1375,6 +1941,9 @@ class AndamentosSynchronizer:
             self.logger.logger.error(f"[ERRO] Erro fatal: {e}")
             self.logger.logger.error(traceback.format_exc())
         finally:
+            if self._pool is not None:
+                for executor in self._pool.values():
+                    executor.shutdown(wait=True)
             self.conn_mgr.close_all()
             self.logger.logger.info("[FIM] Conexoes fechadas")
 
@@ -4,6 +4,7 @@ import sys
 import logging
 from tqdm import tqdm
 from config_manager import config_manager
+from os_status_service import ensure_os_status_table, rebuild_os_status
 import warnings
 
 warnings.filterwarnings("ignore")
@@ -60,23 +61,29 @@ def get_access_conn(db_path):
     conn_str = r"DRIVER={Microsoft Access Driver (*.mdb, *.accdb)};DBQ=" + db_path + ";"
     return pyodbc.connect(conn_str)
 
-def get_existing_keys(mysql_conn, table_name):
+KEY_QUERIES = {
+    'tabAndamento': "SELECT CodStatus FROM tabAndamento",
+    'tabProtocolos': "SELECT NroProtocolo, AnoProtocolo FROM tabProtocolos",
+    'tabDetalhesServico': "SELECT NroProtocoloLinkDet, AnoProtocoloLinkDet FROM tabDetalhesServico",
+}
+
+def get_existing_keys(mysql_conn, table_name, batch_size=5000):
     # Returns a SET of keys for fast lookup
+    # SSCursor (sem buffer) + tuplas: não materializa a tabela inteira como lista de dicts
     keys = set()
-    with mysql_conn.cursor() as cursor:
-        if table_name == 'tabAndamento':
-            cursor.execute("SELECT CodStatus FROM tabAndamento")
-            for row in cursor.fetchall():
-                keys.add(row['CodStatus'])
-        elif table_name in ['tabProtocolos', 'tabDetalhesServico']:
-            if table_name == 'tabProtocolos':
-                cursor.execute("SELECT NroProtocolo, AnoProtocolo FROM tabProtocolos")
-                for row in cursor.fetchall():
-                    keys.add((row['NroProtocolo'], row['AnoProtocolo']))
+    query = KEY_QUERIES.get(table_name)
+    if not query:
+        return keys
+    with mysql_conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if table_name == 'tabAndamento':
+                keys.update(row[0] for row in rows)
             else:
-                cursor.execute("SELECT NroProtocoloLinkDet, AnoProtocoloLinkDet FROM tabDetalhesServico")
-                for row in cursor.fetchall():
-                    keys.add((row['NroProtocoloLinkDet'], row['AnoProtocoloLinkDet']))
+                keys.update(rows)
     return keys
 
 def sync_table(access_cursor, mysql_conn, table_name, source_name):
@@ -201,6 +208,7 @@ def main():
         
         # Recalculate UltimoStatus to ensure only one TRUE per OS
         recalculate_ultimo_status(mysql_conn)
+        rebuild_status_projection(mysql_conn)
 
     except Exception as e:
         logging.critical(f"Critical Error: {e}")
@@ -241,5 +249,15 @@ def recalculate_ultimo_status(conn):
     except Exception as e:
         logging.error(f"Error recalculating UltimoStatus: {e}")
 
+def rebuild_status_projection(conn):
+    """Recarrega tab_os_status_atual depois do recálculo em massa do UltimoStatus."""
+    try:
+        logging.info("Rebuilding tab_os_status_atual...")
+        with conn.cursor() as cursor:
+            ensure_os_status_table(cursor)
+            rebuild_os_status(cursor)
+    except Exception as e:
+        logging.error(f"Error rebuilding tab_os_status_atual: {e}")
+
 if __name__ == "__main__":
     main()
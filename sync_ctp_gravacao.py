@@ -18,6 +18,7 @@ import xml.etree.ElementTree as ET
 from typing import Any, Dict, List, Optional, Tuple
 
 from database import db
+from metrics_service import SyncMetrics
 
 logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
@@ -38,6 +39,8 @@ JOBTICKET_BASE = os.getenv(
 
 POLL_SECONDS = int(os.getenv("SAGRA_CTP_POLL", "8"))
 
+metrics = SyncMetrics("sync_ctp_gravacao")
+
 
 # --- Helpers ---------------------------------------------------------------
 
@@ -602,6 +605,7 @@ def sync_once():
     except Exception as exc:
         logger.error("Erro lendo PrintedJobs XML: %s", exc)
 
+    metrics.rows_read(len(jobs_all), fonte="xml")
     inserted = updated = skipped = 0
     event_candidates: List[Tuple[int, Dict[str, Any]]] = []
 
@@ -641,15 +645,18 @@ def sync_once():
             eventos = parse_jobticket_events(job.get("template"), job.get("name"))
             if eventos:
                 upsert_eventos(job_id, eventos)
+                metrics.rows_written(len(eventos), destino="ct_gravacao_eventos")
         except Exception as exc:
             logger.error("Erro processando eventos de %s: %s", job.get("name"), exc)
 
+    metrics.rows_written(inserted + updated, destino="ct_gravacao_jobs")
     logger.info("Sync tick: %s jobs (inserted=%s, updated=%s, skipped=%s)", len(jobs_all), inserted, updated, skipped)
 
 
 def main():
     while True:
-        sync_once()
+        with metrics.cycle():
+            sync_once()
         time.sleep(POLL_SECONDS)
 
 
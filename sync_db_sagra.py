@@ -6,6 +6,7 @@ import time
 import datetime
 import json
 from config_manager import config_manager
+from os_status_service import ensure_os_status_table, refresh_os_status
 import warnings
 
 # --- CONFIGURAÇÃO E CONSTANTES ---
@@ -294,6 +295,7 @@ def sync_os_data(os_id, os_ano):
         # Recalcular UltimoStatus em ambos os bancos para garantir consistência
         recalculate_ultimo_status(mysql_conn, os_id, os_ano, "MySQL")
         recalculate_ultimo_status(access_conn, os_id, os_ano, "Access")
+        refresh_status_projection(mysql_conn, os_id, os_ano)
 
     except Exception as e:
         tool_logging_prefix = f"    x Error syncing OS {os_id}/{os_ano}:"
@@ -303,6 +305,15 @@ def sync_os_data(os_id, os_ano):
         if mysql_conn: mysql_conn.close()
         if access_conn: access_conn.close()
 
+def refresh_status_projection(conn, os_id, os_ano):
+    """Atualiza a linha da OS em tab_os_status_atual (conexão MySQL em autocommit)."""
+    try:
+        with conn.cursor() as cursor:
+            ensure_os_status_table(cursor)
+            refresh_os_status(cursor, [(os_id, os_ano)])
+    except Exception as e:
+        logging.error(f"      x Error refreshing tab_os_status_atual for OS {os_id}/{os_ano}: {e}")
+
 def recalculate_ultimo_status(conn, os_id, os_ano, db_type):
     """Garante que apenas o maior CodStatus tenha UltimoStatus=Tmure/1."""
     try:
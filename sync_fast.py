@@ -3,6 +3,7 @@ import pymysql
 import sys
 import logging
 from config_manager import config_manager
+from os_status_service import ensure_os_status_table, rebuild_os_status
 import warnings
 import json
 import datetime
@@ -296,6 +297,7 @@ def sync_fast_logic():
 
         # 3. Recalculate UltimoStatus (Always safe)
         recalculate_ultimo_status(mysql_conn)
+        rebuild_status_projection(mysql_conn)
         
         logging.info("Fast Update Completed Successfully.")
 
@@ -328,5 +330,15 @@ def recalculate_ultimo_status(conn):
     except Exception as e:
         logging.error(f"Error recalculating UltimoStatus: {e}")
 
+def rebuild_status_projection(conn):
+    """Recarrega tab_os_status_atual depois do recálculo em massa do UltimoStatus."""
+    try:
+        logging.info("Rebuilding tab_os_status_atual...")
+        with conn.cursor() as cursor:
+            ensure_os_status_table(cursor)
+            rebuild_os_status(cursor)
+    except Exception as e:
+        logging.error(f"Error rebuilding tab_os_status_atual: {e}")
+
 if __name__ == "__main__":
     sync_fast_logic()